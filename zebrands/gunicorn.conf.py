@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration of the API.
+
+By default the ASGI application is served by uvicorn workers:
+
+    gunicorn zebrands.asgi:application
+
+The WSGI application can be served by threaded workers for comparison:
+
+    WEB_WORKER_CLASS=gthread WEB_THREADS=32 gunicorn zebrands.wsgi:application
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("WEB_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+threads = int(os.environ.get("WEB_THREADS", 1))
+# Connections queued while every worker is busy, enough for 1k concurrent clients.
+backlog = int(os.environ.get("WEB_BACKLOG", 2048))
+worker_connections = int(os.environ.get("WEB_WORKER_CONNECTIONS", 1000))
+keepalive = 5
+timeout = 30
+
+# Every worker writes its metrics to this directory, /metrics aggregates them, see
+# zebrands.metrics. It must be set before the workers import prometheus_client.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "zebrands-metrics")
+)
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to the new ones.
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # The requests recorded since the last flush would be lost with the worker.
+    from zebrands.metrics import flush_requests
+
+    flush_requests()
@@ -4,4 +4,34 @@ set -o errexit
 set -o pipefail
 set -o nounset
 
-celery -A zebrands worker -l info -n default
+# Brings up one worker per queue (see CELERY_TASK_ROUTES), with the pool suited to its
+# tasks: counters and reports are CPU and database bound and run on prefork processes,
+# notifications mostly wait on SendGrid and run on threads (or gevent, when installed).
+
+worker() {
+    local queue=$1 pool=$2 concurrency=$3
+    shift 3
+    celery -A zebrands worker -l info -n "${queue}@%h" -Q "$queue" \
+        -P "$pool" -c "$concurrency" "$@" &
+}
+
+stop() {
+    kill -TERM $(jobs -p) 2>/dev/null || true
+    wait
+}
+
+trap 'stop; exit 0' TERM INT
+
+worker celery prefork "${CELERY_DEFAULT_CONCURRENCY:-1}"
+worker counters "${CELERY_COUNTERS_POOL:-prefork}" "${CELERY_COUNTERS_CONCURRENCY:-2}"
+# Prefetching a single message per thread lets the priorities of the queue apply.
+worker notifications "${CELERY_NOTIFICATIONS_POOL:-threads}" \
+    "${CELERY_NOTIFICATIONS_CONCURRENCY:-16}" --prefetch-multiplier 1
+worker reports "${CELERY_REPORTS_POOL:-prefork}" "${CELERY_REPORTS_CONCURRENCY:-1}"
+
+# Stops the whole topology as soon as one worker exits, so the container is restarted.
+set +o errexit
+wait -n
+status=$?
+stop
+exit $status
@@ -1,6 +1,12 @@
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
 
 from store.models import Product, ProductStats
+from store.uniques import days_between, product_uniques
+
+UNIQUE_VISITORS_DAYS = 30
 
 
 @admin.register(Product)
@@ -18,4 +24,29 @@ class ProductStatsAdmin(admin.ModelAdmin):
     Define the ProductStatsAdmin view to handle the product stats model in the django admin.
     """
 
-    list_display = ["product", "view_count"]
+    list_display = ["product", "view_count", "unique_visitors"]
+
+    @staticmethod
+    def _days():
+        today = timezone.now().date()
+        return days_between(today - timedelta(days=UNIQUE_VISITORS_DAYS - 1), today)
+
+    def get_changelist_instance(self, request):
+        """
+        Estimates the unique visitors of the whole page in a single Redis round trip.
+        """
+        changelist = super().get_changelist_instance(request)
+        stats = list(changelist.result_list)
+        uniques = product_uniques([obj.product_id for obj in stats], self._days())
+        for obj in stats:
+            obj.unique_visitors = uniques[obj.product_id]
+        return changelist
+
+    @admin.display(description=f"Unique visitors ({UNIQUE_VISITORS_DAYS} days)")
+    def unique_visitors(self, obj):
+        """
+        Returns the estimated unique visitors of the product over the last days.
+        """
+        if hasattr(obj, "unique_visitors"):
+            return obj.unique_visitors
+        return product_uniques([obj.product_id], self._days())[obj.product_id]
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+
+from django.http import HttpResponse
+
+from asgiref.sync import sync_to_async
+from rest_framework.request import Request
+from store.cache import product_cache, product_entry
+from store.conditional import (
+    catalog_validators,
+    not_modified,
+    product_validators,
+    set_validators,
+)
+from store.counters import arecord_view
+from store.models import Product
+from store.pagination import ProductCursorPagination, ProductOffsetPagination
+from store.serializers import (
+    ProductFilterSerializer,
+    ProductListSerializer,
+    ProductSerializer,
+)
+from store.uniques import fingerprint
+
+from zebrands.db import primary_reads, replica_may_lag, replica_reads
+from zebrands.renderers import FastJSONRenderer
+
+log = logging.getLogger()
+
+renderer = FastJSONRenderer()
+
+# Keeps a reference to the background tasks until they finish, see dispatch.
+_background = set()
+
+
+def dispatch(coroutine):
+    """
+    Runs a coroutine in the background, without delaying the response.
+
+    @param coroutine: The coroutine to run, its exceptions are logged.
+
+    @return: The asyncio task.
+    """
+    task = asyncio.ensure_future(coroutine)
+    _background.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+
+def _finished(task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.exception(task.exception())
+
+
+def anonymous_json_read(request, kwargs):
+    """
+    Returns True if the request is an anonymous GET or HEAD negotiated to plain JSON.
+
+    Authenticated requests, the browsable API and explicit format overrides are left to the
+    DRF views.
+    """
+    accept = request.headers.get("Accept") or "*/*"
+    media_type = accept.split(",")[0].split(";")[0].strip()
+    return (
+        request.method in ("GET", "HEAD")
+        and "HTTP_AUTHORIZATION" not in request.META
+        and kwargs.get("format") is None
+        and "format" not in request.GET
+        and media_type in ("*/*", "application/*", renderer.media_type)
+    )
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        renderer.render(data), content_type=renderer.media_type, status=status
+    )
+
+
+def async_read_path(sync_view, read, allow, serves=anonymous_json_read):
+    """
+    Wraps a DRF view, serving its anonymous JSON reads with an async view.
+
+    Every other request, e.g. writes, authenticated requests or the browsable API, is
+    handed to the DRF view, which runs in the thread Django uses for sync views.
+
+    @param sync_view: The DRF view, e.g. ProductViewSet.as_view(...).
+    @param read: The coroutine function serving anonymous reads.
+    @param allow: The methods allowed by the DRF view, sent in the Allow header like DRF.
+    @param serves: A callable telling, from the request and the URL kwargs, whether read
+    serves the request.
+
+    @return: An async view.
+    """
+    fallback = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if not serves(request, kwargs):
+            return await fallback(request, *args, **kwargs)
+        # Anonymous clients never write, their reads always go to a replica.
+        with replica_reads():
+            response = await read(request, *args, **kwargs)
+        response["Allow"] = allow
+        response["Vary"] = "Accept"
+        return response
+
+    # DRF views are exempt, csrf_exempt itself cannot wrap async views in Django 4.2.
+    view.csrf_exempt = True
+    return view
+
+
+def cursor_page_read(request, kwargs):
+    """
+    Returns True for the anonymous JSON reads of the product list using cursors, pages with
+    limit/offset pagination are left to ProductViewSet.list.
+    """
+    params = request.GET
+    return anonymous_json_read(request, kwargs) and not (
+        ProductOffsetPagination.limit_query_param in params
+        or ProductOffsetPagination.offset_query_param in params
+    )
+
+
+async def list_products(request):
+    """
+    Async counterpart of ProductViewSet.list, for cursor-paginated pages.
+    """
+    request = Request(request)
+    request.accepted_renderer = renderer
+    state = await product_cache.acatalog_state()
+    etag, last_modified = catalog_validators(state, request)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    filters = ProductFilterSerializer(data=request.query_params)
+    if not filters.is_valid():
+        return json_response(filters.errors, status=400)
+    queryset = filters.filter_queryset(Product.objects.order_by("sku"))
+    paginator = ProductCursorPagination()
+    page = await paginator.apaginate_queryset(
+        ProductListSerializer.values(queryset), request
+    )
+    data = paginator.get_paginated_response(ProductListSerializer.represent(page)).data
+    response = json_response(data)
+    # A lagging replica would pair the new catalog version with stale products.
+    if not replica_may_lag(state["modified"]):
+        set_validators(response, etag, last_modified)
+    return response
+
+
+async def retrieve_product(request, sku):
+    """
+    Async counterpart of ProductViewSet.retrieve for anonymous clients.
+
+    The product is served from the product cache, loaded from the primary with the async
+    ORM on a miss, and its view is recorded in the background.
+    """
+
+    async def load():
+        with primary_reads():
+            instance = await Product.objects.aget(sku=sku)
+        return product_entry(instance, ProductSerializer(instance).data)
+
+    try:
+        entry = await product_cache.aget_or_load(sku, load)
+    except Product.DoesNotExist:
+        return json_response({"detail": "Not found."}, status=404)
+    dispatch(
+        arecord_view(
+            entry["pk"], brand=entry["data"]["brand"], visitor=fingerprint(request)
+        )
+    )
+    etag, last_modified = product_validators(entry, renderer.format)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = set_validators(json_response(entry["data"]), etag, last_modified)
+    return response
+
+
+def product_list_view(sync_view):
+    """
+    Returns the async view of the product list, falling back to sync_view.
+    """
+    return async_read_path(
+        sync_view, list_products, "GET, POST, HEAD, OPTIONS", serves=cursor_page_read
+    )
+
+
+def product_detail_view(sync_view):
+    """
+    Returns the async view of a product, falling back to sync_view.
+    """
+    return async_read_path(
+        sync_view, retrieve_product, "GET, PUT, PATCH, DELETE, HEAD, OPTIONS"
+    )
@@ -0,0 +1,224 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from store.cache import product_cache
+from store.facets import apply_deltas, change_deltas
+from store.importers import ProductImportSerializer
+from store.models import Product
+from store.outbox import record_product_changes
+
+from zebrands.bulk import (
+    BulkReport,
+    chunks,
+    drop_existing,
+    index_items,
+    insert_new,
+    validate_items,
+)
+
+SKU_REPEATED = {"sku": ["This SKU is repeated in the batch."]}
+SKU_EXISTS = {"sku": ["product with this sku already exists."]}
+SKU_NOT_FOUND = {"sku": ["Not found."]}
+
+
+class BatchReport(BulkReport):
+    """
+    Totals and per-item results of a batch write, the results are in the order of the items.
+    """
+
+    key = "sku"
+
+    def as_dict(self):
+        counts = self.counts()
+        return {
+            "created": counts["created"],
+            "updated": counts["updated"],
+            "unchanged": counts["unchanged"],
+            "deleted": counts["deleted"],
+            "failed": counts["error"],
+            "results": self.results,
+        }
+
+
+def _chunks(values):
+    return chunks(values, settings.PRODUCT_BATCH_CHUNK_SIZE)
+
+
+def _drop_existing(products, report):
+    """
+    Fails the products whose SKU exists, and removes them from 'products'.
+
+    @return: The number of products removed.
+    """
+    return drop_existing(
+        products,
+        report,
+        Product.objects.all(),
+        SKU_EXISTS,
+        settings.PRODUCT_BATCH_CHUNK_SIZE,
+    )
+
+
+def create_products(items):
+    """
+    Creates products in bulk.
+
+    The items are validated in one pass, and the valid ones whose SKU does not exist yet are
+    inserted with bulk_create in a single transaction, which records the new products in a
+    single outbox event. Products created concurrently in the meantime are reported and the
+    others inserted again. Items that fail are reported and skipped.
+
+    @param items: A list of dictionaries with the 'sku', 'name', 'price' and 'brand' of the
+    new products.
+
+    @return: A BatchReport.
+    """
+    report = BatchReport.for_items(items)
+    products = validate_items(items, report, ProductImportSerializer(), SKU_REPEATED)
+    with transaction.atomic():
+        _drop_existing(products, report)
+        insert_new(
+            lambda: Product.objects.bulk_create(
+                [Product(**validated) for _, validated in products.values()],
+                batch_size=settings.PRODUCT_BATCH_CHUNK_SIZE,
+            ),
+            lambda: _drop_existing(products, report),
+        )
+        # bulk_create sends no signals, the facets are moved here.
+        deltas = Counter()
+        for _, validated in products.values():
+            deltas.update(change_deltas(None, (validated["brand"], validated["price"])))
+        apply_deltas(deltas)
+        if products:
+            record_product_changes(
+                {sku: sorted(validated) for sku, (_, validated) in products.items()}
+            )
+        skus = list(products)
+        transaction.on_commit(lambda: product_cache.invalidate(*skus))
+    for sku, (index, _) in products.items():
+        report.set(index, sku, "created")
+    return report
+
+
+def update_products(items):
+    """
+    Partially updates products in bulk, by SKU.
+
+    The products are locked and loaded in chunks, and saved with bulk_update in a single
+    transaction, which records the changed fields of every product in a single outbox event.
+    Products whose values are all unchanged are reported as such and left alone, they are
+    neither written nor notified. Items that fail validation or whose SKU does not exist are
+    reported and skipped.
+
+    @param items: A list of dictionaries with the 'sku' of a product and the fields to change.
+
+    @return: A BatchReport.
+    """
+    report = BatchReport.for_items(items)
+    changes = validate_items(
+        items, report, ProductImportSerializer(partial=True), SKU_REPEATED
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        products = {}
+        for chunk in _chunks(list(changes)):
+            products.update(
+                (product.sku, product)
+                for product in Product.objects.select_for_update().filter(sku__in=chunk)
+            )
+        fields = set()
+        deltas = Counter()
+        changed = {}
+        for sku, (index, validated) in changes.items():
+            product = products.get(sku)
+            if product is None:
+                report.add_error(index, sku, SKU_NOT_FOUND)
+                continue
+            changed_fields = [
+                name
+                for name, value in validated.items()
+                if getattr(product, name) != value
+            ]
+            if not changed_fields:
+                report.set(index, sku, "unchanged", changed_fields=[])
+                continue
+            old = (product.brand, product.price)
+            changed[sku] = changed_fields
+            for name in changed_fields:
+                setattr(product, name, validated[name])
+            product.modified = now
+            fields.update(changed_fields)
+            deltas.update(change_deltas(old, (product.brand, product.price)))
+            report.set(index, sku, "updated", changed_fields=changed[sku])
+        if changed:
+            Product.objects.bulk_update(
+                [products[sku] for sku in changed],
+                [*sorted(fields), "modified"],
+                batch_size=settings.PRODUCT_BATCH_CHUNK_SIZE,
+            )
+            # bulk_update sends no signals, the facets are moved here.
+            apply_deltas(deltas)
+            record_product_changes(changed)
+            skus = list(changed)
+            transaction.on_commit(lambda: product_cache.invalidate(*skus))
+    return report
+
+
+def _delete_chunk(pks):
+    """
+    Deletes a chunk of products, after the rows of every model referencing them.
+
+    Every relation to Product cascades. Going through the collector would load and signal
+    every product, their signal receivers' work is done in bulk by delete_products instead.
+    """
+    for relation in Product._meta.related_objects:
+        relation.related_model._base_manager.filter(
+            **{f"{relation.field.name}__in": pks}
+        ).delete()
+    Product._base_manager.filter(pk__in=pks)._raw_delete(Product.objects.db)
+
+
+def delete_products(items):
+    """
+    Deletes products in bulk, by SKU.
+
+    The products and the rows cascading from them, like their ProductStats, are deleted in
+    chunks of PRODUCT_BATCH_CHUNK_SIZE, in a single transaction, which locks them first so
+    no concurrent update moves them between facets meanwhile, and records the deleted
+    products in a single outbox event, without changed fields: the digest tells deleted
+    products apart since they no longer exist. SKUs that do not exist are reported.
+
+    @param items: A list of dictionaries with the 'sku' of the products to delete.
+
+    @return: A BatchReport.
+    """
+    report = BatchReport.for_items(items)
+    indexes = index_items(items, report, SKU_REPEATED)
+    with transaction.atomic():
+        found = {}
+        for chunk in _chunks(list(indexes)):
+            found.update(
+                (sku, (pk, brand, price))
+                for pk, sku, brand, price in Product.objects.select_for_update()
+                .filter(sku__in=chunk)
+                .values_list("pk", "sku", "brand", "price")
+            )
+        for chunk in _chunks([pk for pk, _, _ in found.values()]):
+            _delete_chunk(chunk)
+        deltas = Counter()
+        for _, brand, price in found.values():
+            deltas.update(change_deltas((brand, price), None))
+        apply_deltas(deltas)
+        if found:
+            record_product_changes({sku: [] for sku in found})
+        skus = list(found)
+        transaction.on_commit(lambda: product_cache.invalidate(*skus))
+    for sku, index in indexes.items():
+        if sku in found:
+            report.set(index, sku, "deleted")
+        else:
+            report.add_error(index, sku, SKU_NOT_FOUND)
+    return report
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Runs the enclosed block against a throwaway test database.
+
+    Benchmarks seed and mutate data freely, so they never touch the configured database.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer():
+    """
+    Measures the wall-clock time spent in the enclosed block.
+
+    Yields a dictionary whose 'seconds' key is filled in when the block exits.
+    """
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def rate(count, seconds):
+    """
+    Returns the number of operations per second, guarding against empty measurements.
+    """
+    return count / seconds if seconds else float("inf")
+
+
+def percentile(samples, percent):
+    """
+    Returns the given percentile of a list of measurements, using the nearest rank.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+async def _read_response(reader):
+    status_line = await reader.readuntil(b"\r\n")
+    status = int(status_line.split()[1])
+    length, close = 0, False
+    while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection":
+            close = value == "close"
+    await reader.readexactly(length)
+    return status, close
+
+
+async def _http_client(host, port, paths, deadline, rng, latencies, errors):
+    request = "GET {} HTTP/1.1\r\nHost: {}\r\nAccept: application/json\r\n\r\n"
+    writer = None
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request.format(rng.choice(paths), host).encode())
+            await writer.drain()
+            status, close = await _read_response(reader)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            errors["connection"] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors[status] += 1
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def http_load(host, port, paths, concurrency, seconds, seed=0):
+    """
+    Sends GET requests from concurrent keep-alive clients for a number of seconds.
+
+    Every client sends its next request as soon as it receives the previous response.
+
+    @param host: The host of the server.
+    @param port: The port of the server.
+    @param paths: The paths to request, picked at random.
+    @param concurrency: The number of concurrent clients, each with its own connection.
+    @param seconds: The duration of the load.
+    @param seed: The seed of the random path picks.
+
+    @return: A tuple with the list of response latencies in seconds and a Counter of the
+    errors, by status code or 'connection'.
+    """
+    latencies, errors = [], Counter()
+    deadline = time.monotonic() + seconds
+    rng = random.Random(seed)
+    await asyncio.gather(
+        *(
+            _http_client(host, port, paths, deadline, rng, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    return latencies, errors
@@ -0,0 +1,264 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from zebrands.metrics import CacheCounters
+
+
+class LocalLRUCache:
+    """
+    Bounded, thread-safe in-process LRU cache whose entries expire after a time-to-live.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the value cached under the key, or None if it is missing or expired.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Caches the value under the key, evicting the least recently used entry when full.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ProductCache:
+    """
+    Two-tier read-through cache of serialized products, keyed by SKU.
+
+    The first tier is a small LocalLRUCache in every process, the second one is the shared
+    Django cache (Redis). Entries are stored under a per-SKU version kept in the shared cache,
+    and every write bumps that version, so no process can serve an entry cached before the
+    write, whichever tier it comes from.
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache(
+            settings.PRODUCT_CACHE_LOCAL_MAXSIZE, settings.PRODUCT_CACHE_LOCAL_TTL
+        )
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.counters = CacheCounters("product")
+
+    @property
+    def shared(self):
+        return caches[settings.PRODUCT_CACHE_ALIAS]
+
+    @staticmethod
+    def _version_key(sku):
+        return f"product:version:{sku}"
+
+    @staticmethod
+    def _entry_key(sku, version):
+        return f"product:{sku}:{version}"
+
+    @staticmethod
+    def _new_version():
+        # Versions restart from the clock, never from a value used before.
+        return time.time_ns()
+
+    @staticmethod
+    def _catalog_key():
+        return "product:catalog"
+
+    def _count(self, event):
+        with self._stats_lock:
+            self.stats[event] += 1
+        self.counters.inc(event)
+
+    def versions(self, skus):
+        """
+        Returns the current cache version of each SKU, initializing the missing ones.
+
+        Versions expire like the entries stored under them, so the versions of SKUs that
+        are requested but do not exist never pile up. An expired version simply starts a
+        new clock-based one.
+
+        @param skus: An iterable of product SKUs.
+
+        @return: A dictionary mapping each SKU to its version.
+        """
+        keys = {self._version_key(sku): sku for sku in skus}
+        found = self.shared.get_many(keys)
+        versions = {keys[key]: version for key, version in found.items()}
+        for key, sku in keys.items():
+            if sku not in versions:
+                self.shared.add(
+                    key, self._new_version(), settings.PRODUCT_CACHE_TIMEOUT
+                )
+                versions[sku] = self.shared.get(key)
+        return versions
+
+    def get_or_load(self, sku, loader):
+        """
+        Returns the cached entry of a product, loading and caching it on a miss.
+
+        The version is read before loading, so an entry loaded concurrently with a write is
+        stored under the version that write has already superseded.
+
+        @param sku: The SKU of the product.
+        @param loader: A callable returning the entry to cache for the product.
+
+        @return: The cached or freshly loaded entry.
+        """
+        version = self.versions([sku])[sku]
+        key = self._entry_key(sku, version)
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count("local_hits")
+            return entry
+        entry = self.shared.get(key)
+        if entry is not None:
+            self._count("shared_hits")
+        else:
+            self._count("misses")
+            entry = loader()
+            self.shared.set(key, entry, settings.PRODUCT_CACHE_TIMEOUT)
+        self.local.set(key, entry)
+        return entry
+
+    async def aversions(self, skus):
+        """
+        Async counterpart of versions.
+        """
+        keys = {self._version_key(sku): sku for sku in skus}
+        found = await self.shared.aget_many(keys)
+        versions = {keys[key]: version for key, version in found.items()}
+        for key, sku in keys.items():
+            if sku not in versions:
+                await self.shared.aadd(
+                    key, self._new_version(), settings.PRODUCT_CACHE_TIMEOUT
+                )
+                versions[sku] = await self.shared.aget(key)
+        return versions
+
+    async def aget_or_load(self, sku, loader):
+        """
+        Async counterpart of get_or_load.
+
+        @param sku: The SKU of the product.
+        @param loader: A coroutine function returning the entry to cache for the product.
+
+        @return: The cached or freshly loaded entry.
+        """
+        version = (await self.aversions([sku]))[sku]
+        key = self._entry_key(sku, version)
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count("local_hits")
+            return entry
+        entry = await self.shared.aget(key)
+        if entry is not None:
+            self._count("shared_hits")
+        else:
+            self._count("misses")
+            entry = await loader()
+            await self.shared.aset(key, entry, settings.PRODUCT_CACHE_TIMEOUT)
+        self.local.set(key, entry)
+        return entry
+
+    def set_many(self, entries):
+        """
+        Stores entries in the shared tier under the current version of their SKUs.
+
+        @param entries: A dictionary mapping product SKUs to their entries.
+
+        @return None
+        """
+        versions = self.versions(entries)
+        self.shared.set_many(
+            {
+                self._entry_key(sku, versions[sku]): entry
+                for sku, entry in entries.items()
+            },
+            settings.PRODUCT_CACHE_TIMEOUT,
+        )
+
+    def catalog_state(self):
+        """
+        Returns the catalog-wide version and the time of the last catalog write.
+
+        If the state was evicted, a new version is started and the current time is used as
+        last modification, which makes clients download the catalog again once instead of
+        trusting validators that may predate a write.
+
+        @return: A dictionary with the 'version' and 'modified' keys.
+        """
+        state = self.shared.get(self._catalog_key())
+        if state is None:
+            self.shared.add(self._catalog_key(), self._new_catalog_state(), None)
+            state = self.shared.get(self._catalog_key())
+        return state
+
+    async def acatalog_state(self):
+        """
+        Async counterpart of catalog_state.
+        """
+        state = await self.shared.aget(self._catalog_key())
+        if state is None:
+            await self.shared.aadd(self._catalog_key(), self._new_catalog_state(), None)
+            state = await self.shared.aget(self._catalog_key())
+        return state
+
+    def _new_catalog_state(self):
+        return {"version": self._new_version(), "modified": timezone.now()}
+
+    def invalidate(self, *skus):
+        """
+        Bumps the version of the given SKUs, making every cached copy unreachable, and the
+        catalog-wide version.
+
+        The version keys are deleted, so the next read starts a new clock-based version. This
+        takes a single round-trip however many SKUs changed, e.g. during a bulk import.
+
+        @param skus: The SKUs of the products that changed.
+
+        @return None
+        """
+        self.shared.set(self._catalog_key(), self._new_catalog_state(), None)
+        self.shared.delete_many([self._version_key(sku) for sku in skus])
+
+
+product_cache = ProductCache()
+
+
+def product_entry(instance, data):
+    """
+    Builds the cache entry of a product from its instance and serialized data.
+    """
+    return {"pk": instance.pk, "modified": instance.modified, "data": dict(data)}
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def product_validators(entry, renderer_format):
+    """
+    Returns the ETag and Last-Modified validators of a cached product entry.
+
+    The ETag is derived from the product's 'modified' timestamp, so it is computed without
+    serializing the product. It includes the renderer format because each format is a
+    different representation of the product.
+
+    @param entry: A product cache entry, see store.cache.product_entry.
+    @param renderer_format: The format of the negotiated renderer, e.g. 'json'.
+
+    @return: A tuple with the ETag and the Last-Modified timestamp.
+    """
+    modified = entry["modified"]
+    etag = quote_etag(f"{entry['pk']}-{modified.timestamp():.6f}-{renderer_format}")
+    return etag, int(modified.timestamp())
+
+
+def catalog_validators(state, request):
+    """
+    Returns the ETag and Last-Modified validators of a product list response.
+
+    The ETag is derived from the catalog-wide version and the query string, which selects
+    the page, so it is computed without querying nor serializing products.
+
+    @param state: The catalog state, see store.cache.ProductCache.catalog_state.
+    @param request: The DRF request object.
+
+    @return: A tuple with the ETag and the Last-Modified timestamp.
+    """
+    digest = hashlib.sha1(
+        f"{state['version']}:{request.accepted_renderer.format}:"
+        f"{request.META.get('QUERY_STRING', '')}".encode()
+    ).hexdigest()
+    return quote_etag(digest), int(state["modified"].timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """
+    Evaluates the request preconditions against the given validators.
+
+    @param request: The HTTP request object.
+    @param etag: The current ETag of the resource.
+    @param last_modified: The current Last-Modified timestamp of the resource.
+
+    @return: A 304 (or 412) response if the client's copy is current, None otherwise.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Sets the ETag and Last-Modified headers on a response.
+    """
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
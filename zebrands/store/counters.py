@@ -0,0 +1,204 @@
+import logging
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from asgiref.sync import sync_to_async
+from redis.exceptions import NoScriptError
+from store import trending, uniques
+from store.models import Product, ProductStats, ViewCounterBatch
+from store.rollups import apply_hourly_deltas, current_hour
+
+from zebrands.redis import HAND_OFF_MARKER, get_redis, hand_off_hash
+
+log = logging.getLogger()
+
+
+def _key(name):
+    return f"{settings.VIEW_COUNTER_KEY_PREFIX}:{name}"
+
+
+def _batch_key(batch_id):
+    return _key(f"batch:{batch_id}")
+
+
+def _field(product_id, hour):
+    return f"{product_id}:{hour}"
+
+
+def record_view(product_id, brand=None, visitor=None):
+    """
+    Buffers one view of a product.
+
+    The increment is accumulated in a Redis hash, in a field per product and hour, and applied
+    to ProductStats and the hourly rollups later by flush_view_counters. The view is also
+    counted in the trending sketch of the current minute and, when the visitor is known, in
+    the unique visitors sketches of the day, all in a single round trip.
+
+    @param product_id: The primary key of the viewed product.
+    @param brand: The brand of the viewed product, required with the visitor.
+    @param visitor: Optionally, the visitor fingerprint, see store.uniques.fingerprint.
+
+    @return None
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hincrby(_key("pending"), _field(product_id, current_hour()), 1)
+    trending.track(pipe, product_id)
+    if visitor is not None:
+        uniques.track(pipe, product_id, brand, visitor)
+    try:
+        pipe.execute()
+    except NoScriptError:
+        # Redis lost its scripts, e.g. on a restart. Only the trending script failed, the
+        # other commands of the pipeline ran.
+        trending.record(product_id)
+
+
+async def arecord_view(product_id, brand=None, visitor=None):
+    """
+    Async counterpart of record_view.
+
+    The round trip runs in a worker thread, outside of the thread shared by the ORM, so the
+    event loop never waits on Redis.
+    """
+    await sync_to_async(record_view, thread_sensitive=False)(
+        product_id, brand=brand, visitor=visitor
+    )
+
+
+def hand_off():
+    """
+    Moves the pending increments into a new batch and registers it for flushing.
+
+    Everything happens in one MULTI/EXEC, so increments recorded while the batch is being
+    applied land in a fresh pending hash and are never lost nor counted twice.
+
+    @return: The id of the new batch.
+    """
+    batch_id = uuid4().hex
+    pipe = get_redis().pipeline(transaction=True)
+    hand_off_hash(pipe, _key("pending"), _batch_key(batch_id), batch_id)
+    pipe.sadd(_key("batches"), batch_id)
+    pipe.execute()
+    return batch_id
+
+
+def apply_view_deltas(deltas):
+    """
+    Adds view increments to ProductStats using set-based queries.
+
+    Existing rows are updated with a single UPDATE ... SET view_count = view_count + CASE
+    per chunk, and missing rows are created with bulk_create. Deltas for products that no
+    longer exist are dropped.
+
+    @param deltas: A dictionary mapping product ids to the number of views to add.
+
+    @return None
+    """
+    chunk_size = settings.VIEW_COUNTER_FLUSH_CHUNK_SIZE
+    product_ids = sorted(deltas)
+    now = timezone.now()
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = product_ids[start : start + chunk_size]
+        existing = set(
+            ProductStats.objects.filter(product_id__in=chunk).values_list(
+                "product_id", flat=True
+            )
+        )
+        if existing:
+            increment = Case(
+                *[When(product_id=pk, then=Value(deltas[pk])) for pk in existing],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            ProductStats.objects.filter(product_id__in=existing).update(
+                view_count=F("view_count") + increment, modified=now
+            )
+        missing = Product.objects.filter(
+            pk__in=[pk for pk in chunk if pk not in existing]
+        ).values_list("pk", flat=True)
+        ProductStats.objects.bulk_create(
+            [ProductStats(product_id=pk, view_count=deltas[pk]) for pk in missing]
+        )
+
+
+def read_batch(batch_id):
+    """
+    Returns the increments of a handed-off batch.
+
+    Fields buffered before views were bucketed by hour only carry the product id, they are
+    counted in the current hour.
+
+    @param batch_id: The id of a batch created by hand_off.
+
+    @return: A dictionary mapping (product id, hour bucket) pairs to their number of views.
+    """
+    deltas = {}
+    for field, count in get_redis().hgetall(_batch_key(batch_id)).items():
+        if field == HAND_OFF_MARKER:
+            continue
+        product_id, _, hour = field.decode().partition(":")
+        key = (int(product_id), int(hour) if hour else current_hour())
+        deltas[key] = deltas.get(key, 0) + int(count)
+    return deltas
+
+
+def apply_batch(batch_id):
+    """
+    Applies a handed-off batch to ProductStats and the hourly rollups exactly once and
+    discards it from Redis.
+
+    The batch is recorded as a ViewCounterBatch in the same transaction as the update. If a
+    previous flush committed the batch but died before cleaning Redis up, the unique
+    constraint rejects the second attempt and the batch is only discarded.
+
+    @param batch_id: The id of a batch created by hand_off.
+
+    @return: The number of views applied.
+    """
+    hourly = read_batch(batch_id)
+    totals = {}
+    for (product_id, _), count in hourly.items():
+        totals[product_id] = totals.get(product_id, 0) + count
+    views = sum(totals.values())
+    if totals:
+        try:
+            with transaction.atomic():
+                ViewCounterBatch.objects.create(batch_id=batch_id)
+                apply_view_deltas(totals)
+                apply_hourly_deltas(hourly)
+        except IntegrityError:
+            if not ViewCounterBatch.objects.filter(batch_id=batch_id).exists():
+                raise
+            log.warning(f"View counter batch {batch_id} was already applied")
+            views = 0
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.delete(_batch_key(batch_id))
+    pipe.srem(_key("batches"), batch_id)
+    pipe.execute()
+    return views
+
+
+def flush():
+    """
+    Hands off the pending increments and applies every outstanding batch.
+
+    Batches left behind by an interrupted flush are picked up again here.
+
+    @return: The number of views applied.
+    """
+    hand_off()
+    views = 0
+    for batch_id in get_redis().smembers(_key("batches")):
+        try:
+            views += apply_batch(batch_id.decode())
+        except Exception as error:
+            # Keep the batch registered, the next flush will retry it.
+            log.exception(error)
+    retention = timedelta(days=settings.VIEW_COUNTER_BATCH_RETENTION_DAYS)
+    ViewCounterBatch.objects.filter(created__lt=timezone.now() - retention).delete()
+    return views
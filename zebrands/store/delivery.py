@@ -0,0 +1,261 @@
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from zebrands.metrics import WORKER_METRICS
+from zebrands.redis import TokenBucket
+
+log = logging.getLogger()
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class TransportResponse:
+    status: int
+    headers: dict
+    body: bytes
+
+
+@dataclass
+class DeliveryResult:
+    """
+    Outcome of delivering one message, after retries.
+    """
+
+    status: int = None
+    attempts: int = 0
+    body: bytes = b""
+    error: str = None
+
+    @property
+    def ok(self):
+        return self.status == 202
+
+
+class SendGridTransport:
+    """
+    Posts messages to the SendGrid v3 mail send API over persistent HTTP connections.
+
+    Every thread reuses its own keep-alive connection, so a pool of N sending threads keeps N
+    warm connections instead of paying a TCP and TLS handshake per message. The base URL can
+    point to a local fake server (see store.fake_sendgrid) for tests and load runs.
+    """
+
+    path = "/v3/mail/send"
+
+    def __init__(self, base_url=None, api_key=None, timeout=None):
+        url = urlsplit(base_url or settings.SENDGRID_API_URL)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.host = url.hostname
+        self.port = url.port
+        self.api_key = api_key or settings.SENDGRID_API_KEY
+        self.timeout = timeout or settings.NOTIFICATION_TIMEOUT
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self.connection_class(
+                self.host, self.port, timeout=self.timeout
+            )
+            self._local.connection = connection
+        return connection
+
+    def _discard_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def send(self, payload):
+        """
+        Posts a message payload.
+
+        @param payload: The JSON-serializable message, e.g. sendgrid's Mail.get().
+
+        @return: A TransportResponse.
+        """
+        body = json.dumps(payload).encode()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        connection = self._connection()
+        start = time.perf_counter()
+        try:
+            connection.request("POST", self.path, body, headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            WORKER_METRICS.observe(
+                "sendgrid_request_duration_seconds",
+                ("error",),
+                time.perf_counter() - start,
+            )
+            # The connection may be half-closed, the next attempt opens a new one.
+            self._discard_connection()
+            raise
+        WORKER_METRICS.observe(
+            "sendgrid_request_duration_seconds",
+            (str(response.status),),
+            time.perf_counter() - start,
+        )
+        if response.will_close:
+            self._discard_connection()
+        return TransportResponse(response.status, dict(response.getheaders()), data)
+
+
+def parse_retry_after(value):
+    """
+    Returns the seconds to wait given by a Retry-After header, in seconds or as an HTTP
+    date, or None if the header is malformed.
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return seconds if math.isfinite(seconds) else None
+
+
+class DeliveryEngine:
+    """
+    Delivers messages through a transport with bounded concurrency and retries.
+
+    Messages are sent by a per-process thread pool, so a slow provider response only blocks
+    one sending thread instead of the whole fan-out. Rate limited (429) and server error
+    responses, as well as connection errors, are retried with exponential backoff and
+    jitter, honoring the provider's Retry-After header.
+
+    With a rate limiter, every attempt takes a token first, so the requests of all the
+    workers sharing the limiter stay under the provider's rate limit.
+    """
+
+    def __init__(
+        self,
+        transport,
+        max_concurrency=None,
+        max_retries=None,
+        backoff=None,
+        max_backoff=None,
+        rate_limiter=None,
+    ):
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency or settings.NOTIFICATION_MAX_CONCURRENCY
+        self.max_retries = (
+            settings.NOTIFICATION_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.backoff = (
+            settings.NOTIFICATION_RETRY_BACKOFF if backoff is None else backoff
+        )
+        self.max_backoff = max_backoff or settings.NOTIFICATION_MAX_BACKOFF
+        self._executor = None
+        self._pid = None
+
+    @property
+    def executor(self):
+        # Threads do not survive a fork, prefork workers build their own pool.
+        if self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="delivery"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def delay(self, attempt, response=None):
+        """
+        Returns the seconds to wait before retrying after the given attempt.
+        """
+        retry_after = response and response.headers.get("Retry-After")
+        if retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(max(seconds, 0.0), self.max_backoff)
+        exponential = self.backoff * 2 ** (attempt - 1)
+        return min(exponential * random.uniform(0.5, 1.5), self.max_backoff)
+
+    def send(self, payload):
+        """
+        Delivers a single message, retrying transient failures.
+
+        @param payload: The JSON-serializable message.
+
+        @return: A DeliveryResult.
+        """
+        result = DeliveryResult()
+        while True:
+            result.attempts += 1
+            response = None
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                response = self.transport.send(payload)
+            except Exception as error:
+                result.status, result.error = None, repr(error)
+            else:
+                result.status, result.body = response.status, response.body
+                result.error = None
+                if response.status not in RETRY_STATUSES:
+                    return result
+            if result.attempts > self.max_retries:
+                return result
+            wait = self.delay(result.attempts, response)
+            log.info(
+                f"Delivery attempt {result.attempts} failed "
+                f"({result.status or result.error}), retrying in {wait:.2f}s"
+            )
+            time.sleep(wait)
+
+    def send_many(self, payloads):
+        """
+        Delivers messages concurrently, at most max_concurrency at a time.
+
+        @param payloads: An iterable of JSON-serializable messages.
+
+        @return: A list of DeliveryResult, in the order of the payloads.
+        """
+        return list(self.executor.map(self.send, payloads))
+
+
+_engine = None
+
+
+def get_delivery_engine():
+    """
+    Returns the delivery engine of the current process, using NOTIFICATION_TRANSPORT.
+
+    The requests are limited to NOTIFICATION_RATE_LIMIT per second across every worker.
+    """
+    global _engine
+    if _engine is None:
+        rate_limiter = None
+        if settings.NOTIFICATION_RATE_LIMIT:
+            rate_limiter = TokenBucket(
+                settings.NOTIFICATION_RATE_LIMIT_KEY,
+                settings.NOTIFICATION_RATE_LIMIT,
+                settings.NOTIFICATION_RATE_BURST,
+            )
+        _engine = DeliveryEngine(
+            import_string(settings.NOTIFICATION_TRANSPORT)(), rate_limiter=rate_limiter
+        )
+    return _engine
@@ -0,0 +1,247 @@
+import random
+import tracemalloc
+from dataclasses import dataclass
+from itertools import count, islice
+from pathlib import Path
+from typing import Callable
+
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from store.benchmarks import percentile, rate, timer
+from store.cache import product_cache
+from store.models import PRODUCT_ADMIN_GROUP, Product, ProductStats
+from store.tests.factories import ProductFactory, ProductStatsFactory, UserFactory
+from users.models import USER_ADMIN_GROUP
+
+# Budgets of every endpoint, checked by `benchmark_endpoints --compare` and the test suite.
+BUDGETS_PATH = Path(__file__).resolve().parent / "endpoint_budgets.json"
+# Metrics a run must stay under, but for requests_per_second which it must reach.
+MINIMUM_METRICS = ("requests_per_second",)
+
+
+@dataclass
+class Endpoint:
+    """
+    An endpoint driven by the benchmark.
+
+    'request' sends one request with the given client and returns the response, it gets the
+    number of the request so every request can target a different object.
+    """
+
+    name: str
+    client: str
+    request: Callable
+
+
+def seed_catalog(products, stats=100, batch_size=10000):
+    """
+    Seeds a catalog of products built by ProductFactory, the first ones with ProductStats.
+
+    The SKUs are prefixed with 'BENCH-', so the entries the benchmark caches in the shared
+    product cache never collide with real products.
+
+    @param products: The number of products.
+    @param stats: The number of products with ProductStats.
+    @param batch_size: The number of products inserted per query.
+
+    @return: The SKUs of the products.
+    """
+    skus = []
+    built = (ProductFactory.build(sku=f"BENCH-{i:08d}") for i in range(products))
+    while batch := list(islice(built, batch_size)):
+        Product.objects.bulk_create(batch)
+        skus.extend(product.sku for product in batch)
+    product_cache.invalidate(*skus)
+    ProductStats.objects.bulk_create(
+        ProductStatsFactory.build(product=product)
+        for product in Product.objects.order_by("pk")[:stats]
+    )
+    return skus
+
+
+def build_clients():
+    """
+    Returns the clients of the benchmark: an anonymous one, an admin authenticated by API
+    token and a superuser logged into the Django admin.
+    """
+    admin = UserFactory()
+    admin.groups.add(
+        *(
+            Group.objects.get_or_create(name=name)[0]
+            for name in (PRODUCT_ADMIN_GROUP, USER_ADMIN_GROUP)
+        )
+    )
+    api_admin = APIClient()
+    api_admin.credentials(
+        HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=admin).key}"
+    )
+    site_admin = Client()
+    site_admin.force_login(UserFactory(is_staff=True, is_superuser=True))
+    return {"anonymous": APIClient(), "api_admin": api_admin, "site_admin": site_admin}
+
+
+def build_endpoints(skus, seed=0):
+    """
+    Returns the endpoints driven by the benchmark, over a seeded catalog.
+
+    @param skus: The SKUs of the catalog, see seed_catalog.
+    @param seed: The seed of the random product picks.
+    """
+    rng = random.Random(seed)
+    usernames = count()
+    return [
+        Endpoint(
+            "product-list",
+            "anonymous",
+            lambda client, _: client.get(reverse("products-list")),
+        ),
+        Endpoint(
+            "product-retrieve",
+            "anonymous",
+            lambda client, _: client.get(
+                reverse("products-detail", args=[rng.choice(skus)])
+            ),
+        ),
+        Endpoint(
+            "product-update",
+            "api_admin",
+            lambda client, number: client.patch(
+                reverse("products-detail", args=[rng.choice(skus)]),
+                {"name": f"Updated {number}"},
+            ),
+        ),
+        Endpoint(
+            "user-create",
+            "api_admin",
+            lambda client, _: client.post(
+                reverse("users-list"),
+                {
+                    "username": f"bench-{next(usernames)}",
+                    "email": "bench@example.com",
+                    "password": "bench-password",
+                },
+            ),
+        ),
+        Endpoint(
+            "admin-product-stats",
+            "site_admin",
+            lambda client, _: client.get(
+                reverse("admin:store_productstats_changelist")
+            ),
+        ),
+    ]
+
+
+def _send(endpoint, client, number):
+    response = endpoint.request(client, number)
+    return 200 <= response.status_code < 300
+
+
+def measure(endpoint, client, requests, profiled=10, warmup=10):
+    """
+    Drives an endpoint through the full Django and DRF stack.
+
+    The requests are timed without instrumentation first, then a few more are sent while
+    counting their queries and tracing their memory allocations.
+
+    @param endpoint: The Endpoint.
+    @param client: The Django test client sending the requests.
+    @param requests: The number of timed requests.
+    @param profiled: The number of requests whose queries and memory are measured.
+    @param warmup: The number of requests sent before measuring, to fill the caches.
+
+    @return: A dictionary with the throughput, the p50/p95/p99 latencies in milliseconds,
+    the maximum queries and peak allocated KiB of a request, and the number of responses
+    that were not successful.
+    """
+    numbers = count()
+    for _ in range(warmup):
+        _send(endpoint, client, next(numbers))
+
+    errors = 0
+    latencies = []
+    with timer() as total:
+        for _ in range(requests):
+            with timer() as elapsed:
+                errors += not _send(endpoint, client, next(numbers))
+            latencies.append(elapsed["seconds"] * 1000)
+
+    queries = memory = 0
+    for _ in range(profiled):
+        with CaptureQueriesContext(connection) as captured:
+            tracemalloc.start()
+            try:
+                errors += not _send(endpoint, client, next(numbers))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        queries = max(queries, len(captured))
+        memory = max(memory, peak / 1024)
+
+    return {
+        "requests_per_second": round(rate(requests, total["seconds"]), 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries": queries,
+        "memory_kib": round(memory, 1),
+        "errors": errors,
+    }
+
+
+def run(products, requests, profiled=10, warmup=10, names=None):
+    """
+    Seeds a catalog and measures every endpoint, see measure.
+
+    Runs against the current database, wrap it in store.benchmarks.benchmark_database.
+
+    @param products: The number of products of the catalog.
+    @param requests: The number of timed requests per endpoint.
+    @param profiled: The number of requests whose queries and memory are measured.
+    @param warmup: The number of requests sent before measuring.
+    @param names: The names of the endpoints to measure, all of them by default.
+
+    @return: A dictionary with the parameters of the run and the metrics of every endpoint.
+    """
+    skus = seed_catalog(products)
+    clients = build_clients()
+    results = {}
+    for endpoint in build_endpoints(skus):
+        if names is None or endpoint.name in names:
+            results[endpoint.name] = measure(
+                endpoint, clients[endpoint.client], requests, profiled, warmup
+            )
+    return {"products": products, "requests": requests, "endpoints": results}
+
+
+def compare(results, budgets, metrics=None):
+    """
+    Compares the results of a run with the budgets of its endpoints.
+
+    @param results: The results of a run, see run.
+    @param budgets: A dictionary mapping endpoint names to their budget of every metric.
+    @param metrics: The metrics to compare, all of the budgeted ones by default.
+
+    @return: A list with a message for every metric over its budget.
+    """
+    violations = []
+    for name, budget in budgets.items():
+        measured = results["endpoints"].get(name)
+        if measured is None:
+            continue
+        for metric, limit in budget.items():
+            if metrics is not None and metric not in metrics:
+                continue
+            value = measured[metric]
+            if metric in MINIMUM_METRICS:
+                if value < limit:
+                    violations.append(f"{name}: {metric} {value} below {limit}")
+            elif value > limit:
+                violations.append(f"{name}: {metric} {value} over {limit}")
+    return violations
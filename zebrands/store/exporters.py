@@ -0,0 +1,104 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+
+from rest_framework.utils.encoders import JSONEncoder
+from store.importers import FIELDS
+from store.models import Product
+
+from zebrands.renderers import FastJSONRenderer
+
+# The import fields, so exports can be imported back, plus the last modification time.
+EXPORT_FIELDS = (*FIELDS, "modified")
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+class _Line:
+    """
+    File-like object handing back what csv.writer writes, instead of buffering it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Returns whether an Accept-Encoding header accepts gzip.
+
+    gzip is accepted when it is listed, or covered by '*', with a non-zero quality value,
+    so 'gzip;q=0' refuses it and codings that merely contain the word are ignored.
+
+    @param accept_encoding: The value of the Accept-Encoding header.
+    """
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    for name in ("gzip", "x-gzip", "*"):
+        if name in qualities:
+            return qualities[name] > 0
+    return False
+
+
+def export_queryset(since=None):
+    """
+    Returns the products to export, in primary key order.
+
+    @param since: Optionally, only export products modified at or after this time.
+
+    @return: A queryset of tuples with the EXPORT_FIELDS.
+    """
+    queryset = Product.objects.order_by("pk")
+    if since is not None:
+        queryset = queryset.filter(modified__gte=since)
+    return queryset.values_list(*EXPORT_FIELDS)
+
+
+def export_products(file_format, since=None, chunk_size=None):
+    """
+    Lazily encodes the catalog as CSV or JSON Lines.
+
+    Products are read with a server-side cursor, chunk_size rows at a time, and every chunk
+    is encoded and yielded before the next one is read, so memory stays flat whatever the
+    size of the catalog. Prices are written as decimal strings and modification times in
+    ISO 8601, like the API does.
+
+    @param file_format: Either 'csv' or 'jsonl'.
+    @param since: Optionally, only export products modified at or after this time.
+    @param chunk_size: The number of rows read and encoded together.
+
+    @return: An iterator of UTF-8 encoded chunks.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    rows = export_queryset(since).iterator(chunk_size=chunk_size)
+    if file_format == "csv":
+        timestamp = JSONEncoder().default
+        writer = csv.writer(_Line())
+        yield writer.writerow(EXPORT_FIELDS).encode()
+        while chunk := list(islice(rows, chunk_size)):
+            yield "".join(
+                writer.writerow((*row[:-1], timestamp(row[-1]))) for row in chunk
+            ).encode()
+        return
+    renderer = FastJSONRenderer()
+    while chunk := list(islice(rows, chunk_size)):
+        yield b"".join(
+            renderer.render(
+                {
+                    field: str(value) if field == "price" else value
+                    for field, value in zip(EXPORT_FIELDS, row)
+                }
+            )
+            + b"\n"
+            for row in chunk
+        )
@@ -0,0 +1,118 @@
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from store.models import Product, ProductFacet
+
+
+def price_bucket(price):
+    """
+    Returns the lower bound of the price bucket of a price, see PRODUCT_PRICE_BUCKETS.
+    """
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    return Decimal(bounds[max(bisect_right(bounds, price) - 1, 0)])
+
+
+def facet_key(brand, price):
+    return brand, price_bucket(price)
+
+
+def change_deltas(old, new):
+    """
+    Returns the facet count changes of a product moving from one brand and price to another.
+
+    @param old: A (brand, price) tuple, or None for a created product.
+    @param new: A (brand, price) tuple, or None for a deleted product.
+
+    @return: A Counter mapping facet keys to their count change.
+    """
+    deltas = Counter()
+    if old is not None:
+        deltas[facet_key(*old)] -= 1
+    if new is not None:
+        deltas[facet_key(*new)] += 1
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Adds count changes to the facet rows, creating the missing ones.
+
+    Rows are updated with UPDATE ... SET count = count + n, so concurrent writers never
+    overwrite each other, and should run in the transaction of the product change.
+
+    @param deltas: A mapping of (brand, price bucket) keys to their count change.
+
+    @return None
+    """
+    for (brand, price_from), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        facet = ProductFacet.objects.filter(brand=brand, price_from=price_from)
+        if facet.update(count=F("count") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                ProductFacet.objects.create(
+                    brand=brand, price_from=price_from, count=delta
+                )
+        except IntegrityError:
+            # Created concurrently, the row exists now.
+            facet.update(count=F("count") + delta)
+
+
+def rebuild():
+    """
+    Recounts every facet from the catalog, e.g. after changing PRODUCT_PRICE_BUCKETS.
+
+    @return: The number of facet rows.
+    """
+    counts = Counter(
+        facet_key(brand, price)
+        for brand, price in Product.objects.values_list("brand", "price").iterator()
+    )
+    with transaction.atomic():
+        ProductFacet.objects.all().delete()
+        ProductFacet.objects.bulk_create(
+            ProductFacet(brand=brand, price_from=price_from, count=count)
+            for (brand, price_from), count in counts.items()
+        )
+    return len(counts)
+
+
+def facet_summary(brands=None):
+    """
+    Returns the brand facet and the price histogram of the catalog.
+
+    @param brands: Optionally, the brands the price histogram is restricted to.
+
+    @return: A dictionary with the 'brands' list of brands and product counts, and the
+    'prices' histogram with the bounds and product count of every bucket.
+    """
+    facets = ProductFacet.objects.filter(count__gt=0)
+    brand_counts = facets.values("brand").annotate(count=Sum("count")).order_by("brand")
+    if brands:
+        facets = facets.filter(brand__in=brands)
+    bucket_counts = dict(
+        facets.values("price_from")
+        .annotate(total=Sum("count"))
+        .values_list("price_from", "total")
+    )
+    bounds = [Decimal(bound) for bound in settings.PRODUCT_PRICE_BUCKETS]
+    return {
+        "brands": [
+            {"brand": row["brand"], "count": row["count"]} for row in brand_counts
+        ],
+        "prices": [
+            {
+                "price_min": bound,
+                "price_max": bounds[index + 1] if index + 1 < len(bounds) else None,
+                "count": bucket_counts.get(bound, 0),
+            }
+            for index, bound in enumerate(bounds)
+        ],
+    }
@@ -0,0 +1,97 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeSendGridHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so connection reuse can be measured.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        status = self.server.handle_message(payload)
+        headers = {"Content-Length": "0"}
+        if status == 429:
+            headers["Retry-After"] = str(self.server.retry_after)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSendGridServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the SendGrid mail send API, used by tests and load runs.
+
+    Every request waits 'latency' seconds and is then accepted (202), rate limited (429 with
+    a Retry-After header) or failed (500) at the configured rates. Tests can also queue exact
+    statuses in 'outcomes', which are used before falling back to the rates.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=1,
+        seed=None,
+    ):
+        super().__init__(address, FakeSendGridHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.outcomes = deque()
+        self.requests = 0
+        self.accepted = []
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_request(self):
+        with self._lock:
+            self.connections += 1
+        return super().get_request()
+
+    def handle_message(self, payload):
+        """
+        Decides the status of a received message and records the accepted ones.
+        """
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if self.outcomes:
+                status = self.outcomes.popleft()
+            else:
+                draw = self._random.random()
+                if draw < self.error_rate:
+                    status = 500
+                elif draw < self.error_rate + self.rate_limit_rate:
+                    status = 429
+                else:
+                    status = 202
+            if status == 202:
+                self.accepted.append(payload)
+        return status
+
+    def start(self):
+        """
+        Serves requests from a daemon thread, returns the server.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
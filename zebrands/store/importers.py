@@ -0,0 +1,240 @@
+import csv
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework import serializers
+from store.cache import product_cache
+from store.facets import apply_deltas, change_deltas
+from store.models import Product
+from store.outbox import record_import_summary
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ("sku", "name", "price", "brand")
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    """
+    Serializer class used to validate imported product rows.
+
+    The unique SKU validator is disabled, existing SKUs are updated instead.
+    """
+
+    price = serializers.DecimalField(
+        required=True, allow_null=False, max_digits=16, decimal_places=2
+    )
+
+    class Meta:
+        model = Product
+        fields = FIELDS
+        extra_kwargs = {"sku": {"validators": []}}
+
+
+class UnreadableImportFile(ValueError):
+    """
+    Raised when the rows of an import file cannot be read, e.g. because it is not UTF-8
+    text or not valid CSV. The chunks read before the error are imported.
+    """
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+@dataclass
+class ImportReport:
+    """
+    Totals and per-row errors of a catalog import.
+    """
+
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < settings.PRODUCT_IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def summary(self):
+        """
+        Returns the totals of the import, without the per-row errors.
+        """
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+    def as_dict(self):
+        return {**self.summary(), "errors": self.errors}
+
+
+def detect_format(filename):
+    """
+    Returns the import format matching the extension of a file name, or None.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(extension)
+
+
+def read_rows(stream, file_format):
+    """
+    Lazily parses the rows of a CSV or JSON Lines text stream.
+
+    Yields a tuple with the row number and either the parsed row or, for a JSON line that
+    cannot be parsed, the parsing error.
+
+    @param stream: A text stream.
+    @param file_format: Either 'csv' or 'jsonl'.
+    """
+    if file_format == "csv":
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as error:
+            yield number, error
+
+
+def import_products(stream, file_format, chunk_size=None, notify=True):
+    """
+    Streams a CSV or JSON Lines file into the catalog, upserting products by SKU.
+
+    The rows are read and validated one chunk at a time, and every chunk is written in its
+    own transaction, see _upsert_chunk, so memory stays bounded and a bad row never aborts
+    the rest of the import. Invalid rows are reported with their row number. A single
+    summary notification is sent at the end, through the outbox.
+
+    A file whose rows cannot be read stops the import with an UnreadableImportFile error,
+    the chunks written before it are notified all the same.
+
+    @param stream: A text stream with the rows to import.
+    @param file_format: Either 'csv' or 'jsonl'.
+    @param chunk_size: The number of rows validated and written together.
+    @param notify: Whether to send the import summary to the product admins.
+
+    @return: An ImportReport.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_IMPORT_CHUNK_SIZE
+    report = ImportReport()
+    start = time.perf_counter()
+    rows = read_rows(stream, file_format)
+    unreadable = None
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            report.rows += len(chunk)
+            products = _validate_chunk(chunk, report)
+            if products:
+                _upsert_chunk(products, report)
+    except (UnicodeDecodeError, csv.Error) as error:
+        unreadable = error
+    report.seconds = time.perf_counter() - start
+
+    if notify and (report.created or report.updated):
+        with transaction.atomic():
+            record_import_summary(report.summary())
+    if unreadable is not None:
+        raise UnreadableImportFile(
+            f"Cannot read the rows after row {report.rows}: {unreadable}", report
+        ) from unreadable
+    return report
+
+
+def _validate_chunk(chunk, report):
+    """
+    Validates a chunk of rows and returns the valid ones as unsaved products, keyed by SKU.
+
+    A single serializer instance validates the whole chunk, so the field machinery is built
+    once per chunk instead of once per row. When a SKU is repeated within the chunk, its last
+    row wins.
+    """
+    validator = ProductImportSerializer()
+    now = timezone.now()
+    products = {}
+    for number, row in chunk:
+        if isinstance(row, Exception):
+            report.add_error(number, {"non_field_errors": [str(row)]})
+            continue
+        try:
+            validated = validator.run_validation(row)
+        except serializers.ValidationError as error:
+            report.add_error(number, error.detail)
+            continue
+        products[validated["sku"]] = Product(**validated, created=now, modified=now)
+    return products
+
+
+def _lock_existing(skus):
+    """
+    Locks the products with the given SKUs and returns their brand and price, by SKU.
+    """
+    return {
+        sku: (brand, price)
+        for sku, brand, price in Product.objects.filter(sku__in=skus)
+        .select_for_update()
+        .values_list("sku", "brand", "price")
+    }
+
+
+def _upsert_chunk(products, report):
+    """
+    Inserts or updates a chunk of validated products.
+
+    The existing products are locked before their facet changes are computed, so concurrent
+    imports of the same SKUs update them one after the other. The new products are inserted
+    in a savepoint, and those created concurrently in the meantime are locked and updated
+    instead. The existing ones are then written with a single INSERT ... ON CONFLICT (sku)
+    DO UPDATE.
+    """
+    with transaction.atomic():
+        existing = _lock_existing(products)
+        while True:
+            created = [sku for sku in products if sku not in existing]
+            try:
+                with transaction.atomic():
+                    Product.objects.bulk_create([products[sku] for sku in created])
+            except IntegrityError:
+                # Only retry once the conflicting products are locked, other errors are raised.
+                concurrent = _lock_existing(created)
+                if not concurrent:
+                    raise
+                existing.update(concurrent)
+            else:
+                break
+        Product.objects.bulk_create(
+            [products[sku] for sku in existing],
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=["name", "price", "brand", "modified"],
+        )
+        # bulk_create sends no signals, the facets are moved here.
+        deltas = Counter()
+        for sku, product in products.items():
+            deltas.update(
+                change_deltas(existing.get(sku), (product.brand, product.price))
+            )
+        apply_deltas(deltas)
+        transaction.on_commit(lambda: product_cache.invalidate(*products))
+    report.updated += len(existing)
+    report.created += len(products) - len(existing)
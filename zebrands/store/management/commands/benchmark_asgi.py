@@ -0,0 +1,112 @@
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from store.benchmarks import benchmark_database, http_load, percentile, rate
+from store.models import Product
+
+HOST = "127.0.0.1"
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"The server did not listen on port {port}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares requests/sec and p50/p99 latency of the anonymous product list and "
+        "detail served over WSGI (gunicorn threads) and ASGI (gunicorn with uvicorn "
+        "workers, async views), with 1k concurrent clients. Runs on a throwaway test "
+        "database, which must be PostgreSQL to be shared with the servers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--concurrency", type=int, default=1000)
+        parser.add_argument("--seconds", type=int, default=30)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        # Every client holds a socket, and so does the server for each of them.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < options["concurrency"] * 2 + 100:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+        with benchmark_database():
+            if connection.vendor == "sqlite":
+                raise CommandError("The servers cannot share an SQLite test database.")
+            self.seed(options["products"])
+            paths = [
+                reverse("products-detail", args=[sku])
+                for sku in Product.objects.values_list("sku", flat=True)[:1000]
+            ] + [reverse("products-list")]
+            env = {
+                **os.environ,
+                "DB_NAME": connection.settings_dict["NAME"],
+                "WEB_BIND": f"{HOST}:{options['port']}",
+                "WEB_WORKERS": str(options["workers"]),
+            }
+            servers = (
+                (
+                    "wsgi",
+                    "zebrands.wsgi:application",
+                    {
+                        "WEB_WORKER_CLASS": "gthread",
+                        "WEB_THREADS": str(options["threads"]),
+                    },
+                ),
+                ("asgi", "zebrands.asgi:application", {}),
+            )
+            for name, application, server_env in servers:
+                server = subprocess.Popen(
+                    ["gunicorn", application],
+                    cwd=settings.BASE_DIR.parent,
+                    env={**env, **server_env},
+                )
+                try:
+                    wait_for_port(options["port"])
+                    latencies, errors = asyncio.run(
+                        http_load(
+                            HOST,
+                            options["port"],
+                            paths,
+                            options["concurrency"],
+                            options["seconds"],
+                        )
+                    )
+                finally:
+                    server.terminate()
+                    server.wait()
+                latencies = [latency * 1000 for latency in latencies]
+                self.stdout.write(
+                    f"{name}  {rate(len(latencies), options['seconds']):8.0f} req/sec   "
+                    f"p50 {percentile(latencies, 50):8.2f} ms   "
+                    f"p99 {percentile(latencies, 99):8.2f} ms   "
+                    f"errors {dict(errors)}"
+                )
+
+    def seed(self, count):
+        products = (
+            Product(sku=f"BENCH-{i:08d}", name=f"Bench product {i}", price=1, brand="B")
+            for i in range(count)
+        )
+        while batch := list(islice(products, 10000)):
+            Product.objects.bulk_create(batch)
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from store.benchmarks import rate, timer
+from store.delivery import DeliveryEngine, SendGridTransport
+from store.fake_sendgrid import FakeSendGridServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures notification delivery throughput against a local fake SendGrid with "
+        "simulated latency and errors, for several concurrency levels."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=100)
+        parser.add_argument("--latency", type=float, default=0.2)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--concurrency", type=int, nargs="+", default=[1, 8, 32, 64]
+        )
+
+    def handle(self, *args, **options):
+        server = FakeSendGridServer(
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            rate_limit_rate=options["rate_limit_rate"],
+            retry_after=0,
+            seed=0,
+        ).start()
+        payload = {"personalizations": [{"to": [{"email": "admin@example.com"}]}]}
+        try:
+            for concurrency in options["concurrency"]:
+                engine = DeliveryEngine(
+                    SendGridTransport(server.url, api_key="benchmark"),
+                    max_concurrency=concurrency,
+                    backoff=0.01,
+                )
+                server.requests = server.connections = 0
+                with timer() as elapsed:
+                    results = engine.send_many([payload] * options["messages"])
+                engine.executor.shutdown()
+                delivered = sum(result.ok for result in results)
+                self.stdout.write(
+                    f"concurrency {concurrency:3d}: "
+                    f"{rate(delivered, elapsed['seconds']):8.1f} messages/sec, "
+                    f"{delivered}/{len(results)} delivered, "
+                    f"{server.requests} requests over {server.connections} connections"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
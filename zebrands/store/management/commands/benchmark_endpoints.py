@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store import endpoint_benchmarks
+from store.benchmarks import benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures requests/sec, p50/p95/p99 latency, queries and allocated memory per "
+        "request of the product list, retrieve and update, user creation and the admin, "
+        "through the full Django and DRF stack. Runs on a throwaway test database seeded "
+        "with a catalog of the given size. With --compare, fails when a metric exceeds "
+        "its budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--profiled", type=int, default=10)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--endpoint", action="append", dest="endpoints")
+        parser.add_argument("--output", help="Writes the results to this JSON file.")
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Fails when the run exceeds the budgets.",
+        )
+        parser.add_argument("--budgets", default=str(endpoint_benchmarks.BUDGETS_PATH))
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            results = endpoint_benchmarks.run(
+                options["products"],
+                options["requests"],
+                profiled=options["profiled"],
+                warmup=options["warmup"],
+                names=options["endpoints"],
+            )
+
+        for name, metrics in results["endpoints"].items():
+            self.stdout.write(
+                f"{name:20s} {metrics['requests_per_second']:8.1f} req/sec   "
+                f"p50 {metrics['p50_ms']:7.2f} ms   p95 {metrics['p95_ms']:7.2f} ms   "
+                f"p99 {metrics['p99_ms']:7.2f} ms   {metrics['queries']:3d} queries   "
+                f"{metrics['memory_kib']:8.1f} KiB   {metrics['errors']} errors"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+        if options["compare"]:
+            with open(options["budgets"]) as budgets:
+                violations = endpoint_benchmarks.compare(results, json.load(budgets))
+            if violations:
+                raise CommandError(
+                    "Over budget:\n" + "\n".join(f"  {line}" for line in violations)
+                )
+            self.stdout.write("Every endpoint is within its budget.")
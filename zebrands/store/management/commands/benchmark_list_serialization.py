@@ -0,0 +1,79 @@
+import tracemalloc
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+from store.benchmarks import benchmark_database, rate, timer
+from store.models import Product
+from store.serializers import ProductListSerializer
+
+from zebrands.renderers import FastJSONRenderer
+
+
+def serializer_page(queryset):
+    """
+    The list page as rendered before the fast path: model instances, the serializer's
+    per-row to_representation and the stdlib JSON encoder.
+    """
+    return JSONRenderer().render(ProductListSerializer(queryset, many=True).data)
+
+
+def fast_page(queryset):
+    """
+    The list page as rendered by ProductViewSet.list.
+    """
+    rows = ProductListSerializer.values(queryset)
+    return FastJSONRenderer().render(ProductListSerializer.represent(rows))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares rows/sec and peak memory of serializing product list pages with "
+        "ProductListSerializer(many=True) against the values_list fast path. Runs on a "
+        "throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options["products"])
+            queryset = Product.objects.order_by("sku")
+            page_size = options["page_size"]
+            pages = [
+                queryset[start : start + page_size]
+                for start in range(0, options["products"], page_size)
+            ]
+            if serializer_page(pages[0]) != fast_page(pages[0]):
+                self.stderr.write("The fast path output differs from the serializer's")
+
+            for name, render in (("serializer", serializer_page), ("fast", fast_page)):
+                best = None
+                for _ in range(options["rounds"]):
+                    with timer() as elapsed:
+                        for page in pages:
+                            render(page)
+                    if best is None or elapsed["seconds"] < best:
+                        best = elapsed["seconds"]
+                tracemalloc.start()
+                render(pages[0])
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.stdout.write(
+                    f"{name:10s} {rate(options['products'], best):10.0f} rows/sec   "
+                    f"peak {peak / 1024:8.1f} KiB per {page_size} rows page"
+                )
+
+    def seed(self, count):
+        products = (
+            Product(sku=f"BENCH-{i:08d}", name=f"Bench product {i}", price=1, brand="B")
+            for i in range(count)
+        )
+        with timer() as elapsed:
+            while batch := list(islice(products, 10000)):
+                Product.objects.bulk_create(batch)
+        self.stdout.write(f"seeded {count} products in {elapsed['seconds']:.1f}s")
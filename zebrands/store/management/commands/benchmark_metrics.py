@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from store.benchmarks import timer
+
+from zebrands.middleware import MetricsMiddleware
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the overhead per request of MetricsMiddleware, against a view returning "
+        "a prepared response. Set PROMETHEUS_MULTIPROC_DIR to an empty directory to "
+        "measure the multiprocess mode used under gunicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100_000)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get(reverse("products-list"))
+        request.resolver_match = resolve(request.path)
+        response = HttpResponse(b"x" * 4096)
+
+        def view(request):
+            return response
+
+        mode = "multiprocess" if "PROMETHEUS_MULTIPROC_DIR" in os.environ else "single"
+        results = {}
+        for name, handler in (("bare", view), ("metrics", MetricsMiddleware(view))):
+            best = None
+            for _ in range(options["rounds"]):
+                with timer() as elapsed:
+                    for _ in range(options["requests"]):
+                        handler(request)
+                if best is None or elapsed["seconds"] < best:
+                    best = elapsed["seconds"]
+            results[name] = best / options["requests"] * 1e6
+            self.stdout.write(f"{name:8s} {results[name]:8.3f} us/request")
+        self.stdout.write(
+            f"overhead {results['metrics'] - results['bare']:8.3f} us/request ({mode} mode)"
+        )
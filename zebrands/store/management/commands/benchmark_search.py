@@ -0,0 +1,81 @@
+import random
+import string
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from store.benchmarks import benchmark_database, percentile, timer
+from store.models import Product
+
+WORDS = (
+    "running hiking classic leather canvas wool cotton linen denim slim wide "
+    "sneaker boot sandal loafer jacket shirt hoodie sweater trouser short sock "
+    "black white navy olive sand coral ivory indigo crimson charcoal"
+).split()
+BRANDS = [f"{word.title()} Co" for word in WORDS[:12]] + ["Zapato", "Taza", "Nube"]
+
+
+def typo(word, rng):
+    index = rng.randrange(len(word))
+    return word[:index] + word[index + 1 :]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the p50/p95/p99 latency of GET /products/search/ for prefix, substring, "
+        "typo and SKU queries on a synthetic catalog. Runs on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with benchmark_database():
+            self.seed(options["products"], rng)
+            client = APIClient()
+            url = reverse("products-search")
+            names = list(
+                Product.objects.values_list("sku", "name", "brand")[
+                    : options["queries"]
+                ]
+            )
+            kinds = {
+                "prefix": lambda sku, name, brand: name.split()[0][:4],
+                "substring": lambda sku, name, brand: name.split()[-1][1:5],
+                "typo": lambda sku, name, brand: " ".join(
+                    typo(word, rng) for word in name.split()
+                ),
+                "sku": lambda sku, name, brand: sku,
+            }
+            client.get(url, {"q": "warm up"})
+            for kind, make_query in kinds.items():
+                latencies = []
+                for row in names:
+                    with timer() as elapsed:
+                        client.get(url, {"q": make_query(*row)})
+                    latencies.append(elapsed["seconds"] * 1000)
+                self.stdout.write(
+                    f"{kind:10s} p50 {percentile(latencies, 50):8.2f} ms   "
+                    f"p95 {percentile(latencies, 95):8.2f} ms   "
+                    f"p99 {percentile(latencies, 99):8.2f} ms"
+                )
+
+    def seed(self, count, rng):
+        products = (
+            Product(
+                sku=f"{rng.choice(string.ascii_uppercase)}{i:09d}",
+                name=" ".join(rng.sample(WORDS, 3)).title(),
+                price=rng.randint(100, 100000) / 100,
+                brand=rng.choice(BRANDS),
+            )
+            for i in range(count)
+        )
+        with timer() as elapsed:
+            while batch := list(islice(products, 10000)):
+                Product.objects.bulk_create(batch)
+        self.stdout.write(f"seeded {count} products in {elapsed['seconds']:.1f}s")
@@ -0,0 +1,68 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from store import counters
+from store.benchmarks import benchmark_database, rate, timer
+from store.models import Product, ProductStats
+
+
+def legacy_update_counter(sku):
+    """
+    The per-view read-modify-write performed by product_update_counter before buffering.
+    """
+    product = Product.objects.get(sku=sku)
+    if hasattr(product, "stats"):
+        stat = product.stats
+    else:
+        stat = ProductStats(product=product)
+    stat.view_count += 1
+    stat.save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares views/sec of the legacy per-view counter update against the buffered "
+        "Redis counters plus bulk flush. Runs on a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--views", type=int, default=10000)
+        parser.add_argument("--products", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(
+            VIEW_COUNTER_KEY_PREFIX="benchmark:views"
+        ):
+            products = Product.objects.bulk_create(
+                Product(sku=f"BENCH-{i:08d}", name="Bench", price=1, brand="Bench")
+                for i in range(options["products"])
+            )
+            views = random.Random(options["seed"]).choices(products, k=options["views"])
+
+            with timer() as legacy:
+                for product in views:
+                    legacy_update_counter(product.sku)
+            ProductStats.objects.all().delete()
+
+            with timer() as buffered:
+                for product in views:
+                    counters.record_view(product.pk)
+                counters.flush()
+
+            total = sum(ProductStats.objects.values_list("view_count", flat=True))
+            if total != len(views):
+                self.stderr.write(
+                    f"Buffered flush counted {total} of {len(views)} views"
+                )
+
+        self.stdout.write(
+            f"legacy:   {rate(len(views), legacy['seconds']):10.0f} views/sec "
+            f"(excludes the broker round-trip each view used to cost)"
+        )
+        self.stdout.write(
+            f"buffered: {rate(len(views), buffered['seconds']):10.0f} views/sec "
+            f"(includes the flush)"
+        )
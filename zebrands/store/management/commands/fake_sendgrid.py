@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from store.fake_sendgrid import FakeSendGridServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a local stand-in for the SendGrid mail send API, point SENDGRID_API_URL "
+        "to it to exercise notifications without sending emails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8025)
+        parser.add_argument("--latency", type=float, default=0.2)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+        parser.add_argument("--retry-after", type=int, default=1)
+
+    def handle(self, *args, **options):
+        server = FakeSendGridServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            rate_limit_rate=options["rate_limit_rate"],
+            retry_after=options["retry_after"],
+        )
+        self.stdout.write(f"Fake SendGrid listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(
+                f"{server.requests} requests, {len(server.accepted)} accepted"
+            )
+        finally:
+            server.server_close()
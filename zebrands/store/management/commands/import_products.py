@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importers import (
+    FORMATS,
+    UnreadableImportFile,
+    detect_format,
+    import_products,
+)
+
+
+class Command(BaseCommand):
+    help = "Imports a CSV or JSON Lines catalog file, upserting products by SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="The file format, detected from the extension by default.",
+        )
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument(
+            "--no-notify",
+            action="store_true",
+            help="Do not send the import summary to the product admins.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot detect the file format, use --format.")
+
+        with open(options["path"], newline="", encoding="utf-8") as stream:
+            try:
+                report = import_products(
+                    stream,
+                    file_format,
+                    chunk_size=options["chunk_size"],
+                    notify=not options["no_notify"],
+                )
+            except UnreadableImportFile as error:
+                raise CommandError(str(error))
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(
+            f"{report.rows} rows in {report.seconds:.2f}s "
+            f"({report.rows_per_second:.0f} rows/sec): {report.created} created, "
+            f"{report.updated} updated, {report.failed} failed"
+        )
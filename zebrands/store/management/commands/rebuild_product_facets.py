@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from store.facets import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts the brand and price facets from the catalog, needed only after changing "
+        "PRODUCT_PRICE_BUCKETS."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Rebuilt {rebuild()} product facets")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from store.cache import product_cache, product_entry
+from store.models import Product
+from store.serializers import ProductSerializer
+
+
+class Command(BaseCommand):
+    help = "Loads serialized products into the shared tier of the product cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "skus", nargs="*", help="SKUs to warm, the whole catalog by default."
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.order_by("pk")
+        if options["skus"]:
+            queryset = queryset.filter(sku__in=options["skus"])
+
+        warmed = 0
+        entries = {}
+        for product in queryset.iterator(chunk_size=options["chunk_size"]):
+            entries[product.sku] = product_entry(
+                product, ProductSerializer(product).data
+            )
+            if len(entries) >= options["chunk_size"]:
+                product_cache.set_many(entries)
+                warmed += len(entries)
+                entries = {}
+        if entries:
+            product_cache.set_many(entries)
+            warmed += len(entries)
+
+        self.stdout.write(f"Warmed {warmed} products")
@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 11:01
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0003_alter_productstats_product"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ViewCounterBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("batch_id", models.CharField(max_length=32, unique=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="productstats",
+            options={"verbose_name_plural": "Product Stats"},
+        ),
+    ]
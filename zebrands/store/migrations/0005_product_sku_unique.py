@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0004_viewcounterbatch"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="product",
+            name="sku",
+            field=models.CharField(max_length=32, unique=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 11:14
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0005_product_sku_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductChangeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("sku", models.CharField(max_length=32)),
+                ("changed_fields", models.JSONField(default=list)),
+                ("delivered", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="productchangeevent",
+            index=models.Index(
+                condition=models.Q(("delivered__isnull", True)),
+                fields=["id"],
+                name="store_event_pending_idx",
+            ),
+        ),
+    ]
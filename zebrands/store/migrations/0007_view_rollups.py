@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-18 11:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0006_productchangeevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductViewsHourly",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hourly_views",
+                        to="store.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Product views hourly",
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductViewsDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("views", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_views",
+                        to="store.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Product views daily",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="productviewshourly",
+            index=models.Index(fields=["hour"], name="store_views_hourly_hour_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="productviewshourly",
+            constraint=models.UniqueConstraint(
+                fields=("product", "hour"), name="store_views_hourly_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productviewsdaily",
+            index=models.Index(fields=["day"], name="store_views_daily_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="productviewsdaily",
+            constraint=models.UniqueConstraint(
+                fields=("product", "day"), name="store_views_daily_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+FIELDS = ("sku", "name", "brand")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm only exists on Postgres, other databases use the in-process search index.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS store_product_{field}_trgm "
+            f"ON store_product USING gin (UPPER({field}) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS store_product_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0007_view_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
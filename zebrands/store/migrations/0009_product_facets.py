@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-18 11:27
+
+from bisect import bisect_right
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_facets(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductFacet = apps.get_model("store", "ProductFacet")
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    counts = Counter(
+        (brand, Decimal(bounds[max(bisect_right(bounds, price) - 1, 0)]))
+        for brand, price in Product.objects.values_list("brand", "price").iterator()
+    )
+    ProductFacet.objects.bulk_create(
+        ProductFacet(brand=brand, price_from=price_from, count=count)
+        for (brand, price_from), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0008_product_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductFacet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("brand", models.CharField(max_length=128)),
+                ("price_from", models.DecimalField(decimal_places=2, max_digits=16)),
+                ("count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["brand", "price"], name="store_product_brand_price"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="productfacet",
+            constraint=models.UniqueConstraint(
+                fields=("brand", "price_from"), name="store_facet_unique"
+            ),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
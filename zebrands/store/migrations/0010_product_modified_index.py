@@ -0,0 +1,16 @@
+# Generated by Django 4.2 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0009_product_facets"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["modified"], name="store_product_modified"),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    ProductChangeEvent = apps.get_model("store", "ProductChangeEvent")
+    for event in ProductChangeEvent.objects.filter(delivered__isnull=True):
+        event.changes = {event.sku: event.changed_fields}
+        event.save(update_fields=["changes"])
+
+
+def backwards(apps, schema_editor):
+    ProductChangeEvent = apps.get_model("store", "ProductChangeEvent")
+    for event in ProductChangeEvent.objects.filter(delivered__isnull=True):
+        for sku, changed_fields in event.changes.items():
+            ProductChangeEvent.objects.create(sku=sku, changed_fields=changed_fields)
+        event.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0010_product_modified_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productchangeevent",
+            name="changes",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name="productchangeevent",
+            name="sku",
+            field=models.CharField(default="", max_length=32),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name="productchangeevent",
+            name="sku",
+        ),
+        migrations.RemoveField(
+            model_name="productchangeevent",
+            name="changed_fields",
+        ),
+    ]
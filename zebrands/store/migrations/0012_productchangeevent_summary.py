@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0011_productchangeevent_changes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productchangeevent",
+            name="summary",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0012_productchangeevent_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productchangeevent",
+            name="claimed",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,19 +1,28 @@
 from django.db import models
 
+from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel
 
 PRODUCT_ADMIN_GROUP = "ProductAdmin"
 
 
 class Product(TimeStampedModel):
-    sku = models.CharField(max_length=32, null=False)
+    sku = models.CharField(max_length=32, null=False, unique=True)
     name = models.CharField(max_length=256, null=False)
     price = models.DecimalField(max_digits=16, decimal_places=2, null=False)
     brand = models.CharField(max_length=128, null=False)
 
+    tracker = FieldTracker(fields=["sku", "brand", "price"])
+
     def __str__(self):
         return f"{self.sku} - {self.brand} - {self.name}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["brand", "price"], name="store_product_brand_price"),
+            models.Index(fields=["modified"], name="store_product_modified"),
+        ]
+
 
 class ProductStats(TimeStampedModel):
     product = models.OneToOneField(
@@ -26,3 +35,125 @@ class ProductStats(TimeStampedModel):
 
     class Meta:
         verbose_name_plural = "Product Stats"
+
+
+class ViewCounterBatch(TimeStampedModel):
+    """
+    Marks a buffered view counter batch as applied to ProductStats.
+
+    The row is written in the same transaction as the counter update, so a batch that is
+    handed to the flush more than once is only ever counted a single time.
+    """
+
+    batch_id = models.CharField(max_length=32, unique=True)
+
+    def __str__(self):
+        return self.batch_id
+
+
+class ProductViewsHourly(models.Model):
+    """
+    Anonymous views of a product during one hour, maintained by the view counter flush.
+
+    Hours older than VIEW_ROLLUP_HOURLY_RETENTION_DAYS are folded into ProductViewsDaily.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="hourly_views"
+    )
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id} - {self.hour:%Y-%m-%d %H:00} - {self.views}"
+
+    class Meta:
+        verbose_name_plural = "Product views hourly"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "hour"], name="store_views_hourly_unique"
+            ),
+        ]
+        indexes = [models.Index(fields=["hour"], name="store_views_hourly_hour_idx")]
+
+
+class ProductViewsDaily(models.Model):
+    """
+    Anonymous views of a product during one day, compacted from ProductViewsHourly.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="daily_views"
+    )
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id} - {self.day} - {self.views}"
+
+    class Meta:
+        verbose_name_plural = "Product views daily"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "day"], name="store_views_daily_unique"
+            ),
+        ]
+        indexes = [models.Index(fields=["day"], name="store_views_daily_day_idx")]
+
+
+class ProductFacet(models.Model):
+    """
+    Number of products of a brand within a price bucket, see PRODUCT_PRICE_BUCKETS.
+
+    Kept up to date on every product create, update and delete, so brand and price facets
+    are read from this small table instead of grouping the catalog.
+    """
+
+    brand = models.CharField(max_length=128)
+    price_from = models.DecimalField(max_digits=16, decimal_places=2)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.brand} - {self.price_from} - {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["brand", "price_from"], name="store_facet_unique"
+            ),
+        ]
+
+
+class ProductChangeEvent(TimeStampedModel):
+    """
+    Outbox entry for the product changes of a transaction, written in that transaction.
+
+    A single event maps the SKUs of every product changed together, e.g. by a batch update,
+    to the names of their changed fields. Pending events are published in batches by
+    relay_product_change_events, which claims them first and marks them delivered once
+    published, so a rolled-back change is never notified and a committed one always is.
+
+    A catalog import records its summary instead, and is notified as a whole rather than
+    product by product.
+    """
+
+    changes = models.JSONField(default=dict)
+    summary = models.JSONField(null=True, blank=True)
+    claimed = models.DateTimeField(null=True, blank=True)
+    delivered = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        if self.summary is not None:
+            return f"import - {self.summary}"
+        return ", ".join(
+            f"{sku} - {', '.join(fields)}" for sku, fields in self.changes.items()
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="store_event_pending_idx",
+                condition=models.Q(delivered__isnull=True),
+            ),
+        ]
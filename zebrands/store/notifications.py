@@ -0,0 +1,98 @@
+from uuid import uuid4
+
+from django.conf import settings
+
+from zebrands.redis import HAND_OFF_MARKER, get_redis, hand_off_hash
+
+# Separates the SKU from the field name in the pending hash, field names never contain it.
+SEPARATOR = "|"
+
+
+def _key(name):
+    return f"{settings.PRODUCT_NOTIFICATION_KEY_PREFIX}:{name}"
+
+
+def _batch_key(batch_id):
+    return _key(f"batch:{batch_id}")
+
+
+def record_changes(changes):
+    """
+    Adds product changes to the current coalescing window.
+
+    Changes are kept in a Redis hash shared by every web and worker process, with one field
+    per product and one per changed field, so repeated changes of the same product collapse.
+    The window is opened by the first change recorded after the previous window was handed
+    off.
+
+    @param changes: A dictionary mapping product SKUs to the names of their changed fields.
+
+    @return: True if these changes opened a new window, the caller must then schedule its
+    flush.
+    """
+    window = settings.PRODUCT_NOTIFICATION_WINDOW
+    pipe = get_redis().pipeline(transaction=True)
+    for sku, fields in changes.items():
+        pipe.hset(
+            _key("pending"),
+            mapping={f"{sku}{SEPARATOR}{field}": 1 for field in ("", *fields)},
+        )
+    # The expiry only matters if the scheduled flush is lost, it lets a later change reopen
+    # a window that will then include the stranded changes.
+    pipe.set(_key("window"), 1, nx=True, ex=window * 2)
+    return pipe.execute()[-1] is True
+
+
+def hand_off():
+    """
+    Closes the current window, moving its changes into a new batch.
+
+    The window flag is cleared in the same transaction, so the next change opens a new window
+    and schedules its own flush.
+
+    @return: The id of the new batch.
+    """
+    batch_id = uuid4().hex
+    pipe = get_redis().pipeline(transaction=True)
+    hand_off_hash(pipe, _key("pending"), _batch_key(batch_id), batch_id)
+    pipe.delete(_key("window"))
+    pipe.sadd(_key("batches"), batch_id)
+    pipe.execute()
+    return batch_id
+
+
+def pending_batches():
+    """
+    Returns the ids of the batches waiting to be notified, including batches left behind by
+    an interrupted flush.
+    """
+    return [batch_id.decode() for batch_id in get_redis().smembers(_key("batches"))]
+
+
+def read_batch(batch_id):
+    """
+    Returns the changes collected in a batch.
+
+    @param batch_id: The id of a batch created by hand_off.
+
+    @return: A dictionary mapping product SKUs to the set of their changed fields.
+    """
+    changes = {}
+    for key in get_redis().hkeys(_batch_key(batch_id)):
+        if key == HAND_OFF_MARKER:
+            continue
+        sku, _, field = key.decode().rpartition(SEPARATOR)
+        fields = changes.setdefault(sku, set())
+        if field:
+            fields.add(field)
+    return changes
+
+
+def discard_batch(batch_id):
+    """
+    Deletes a notified batch.
+    """
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.delete(_batch_key(batch_id))
+    pipe.srem(_key("batches"), batch_id)
+    pipe.execute()
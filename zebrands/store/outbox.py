@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from store.models import ProductChangeEvent
+
+
+def record_product_change(sku, changed_fields):
+    """
+    Writes a product change to the outbox.
+
+    Must be called in the transaction that saves the change, the event then exists if and
+    only if the change was committed.
+
+    @param sku: The SKU of the changed product.
+    @param changed_fields: The names of the changed fields.
+
+    @return: The new ProductChangeEvent.
+    """
+    return record_product_changes({sku: changed_fields})
+
+
+def record_product_changes(changes):
+    """
+    Writes the changes of many products to the outbox as a single event.
+
+    Like record_product_change, must be called in the transaction that saves the changes.
+
+    @param changes: A dictionary mapping product SKUs to the names of their changed fields.
+
+    @return: The new ProductChangeEvent.
+    """
+    return ProductChangeEvent.objects.create(
+        changes={sku: list(fields) for sku, fields in changes.items()}
+    )
+
+
+def record_import_summary(summary):
+    """
+    Writes the summary of a catalog import to the outbox.
+
+    @param summary: The totals of the import, see ImportReport.summary.
+
+    @return: The new ProductChangeEvent.
+    """
+    return ProductChangeEvent.objects.create(summary=summary)
+
+
+def _claim_batch(batch_size):
+    """
+    Claims one batch of pending events, skipping the events claimed by another relay until
+    their claim expires, see PRODUCT_EVENT_CLAIM_SECONDS.
+
+    @return: A list of (pk, changes, summary) tuples.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.PRODUCT_EVENT_CLAIM_SECONDS)
+    with transaction.atomic():
+        events = list(
+            ProductChangeEvent.objects.filter(delivered__isnull=True)
+            .filter(Q(claimed__isnull=True) | Q(claimed__lt=expired))
+            .order_by("pk")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", "changes", "summary")[:batch_size]
+        )
+        if events:
+            ProductChangeEvent.objects.filter(pk__in=[pk for pk, *_ in events]).update(
+                claimed=now
+            )
+    return events
+
+
+def relay_batch(publish, publish_summary, batch_size):
+    """
+    Publishes one batch of pending events and marks them delivered.
+
+    The events are locked with SKIP LOCKED and claimed with a single UPDATE in the same
+    transaction, which commits before they are published, so overlapping relays never
+    publish the same batch and no lock is held while publishing. Once published, they are
+    marked delivered with a single UPDATE. If publishing fails the claim is released and the
+    events are relayed again later, as they are when the relay dies before marking them.
+
+    @param publish: A callable taking a dictionary mapping SKUs to their changed fields.
+    @param publish_summary: A callable taking the summary of a catalog import.
+    @param batch_size: The maximum number of events to relay.
+
+    @return: The number of events relayed.
+    """
+    events = _claim_batch(batch_size)
+    if not events:
+        return 0
+    claimed = ProductChangeEvent.objects.filter(pk__in=[pk for pk, *_ in events])
+    try:
+        changes = {}
+        for _, event_changes, summary in events:
+            for sku, changed_fields in event_changes.items():
+                changes.setdefault(sku, set()).update(changed_fields)
+            if summary is not None:
+                publish_summary(summary)
+        if changes:
+            publish({sku: sorted(fields) for sku, fields in changes.items()})
+    except Exception:
+        claimed.update(claimed=None)
+        raise
+    claimed.update(delivered=timezone.now())
+    return len(events)
+
+
+def relay(publish, publish_summary, batch_size=None):
+    """
+    Relays every pending event, batch by batch, and purges old delivered events.
+
+    @param publish: A callable taking a dictionary mapping SKUs to their changed fields.
+    @param publish_summary: A callable taking the summary of a catalog import.
+    @param batch_size: The maximum number of events published together.
+
+    @return: The number of events relayed.
+    """
+    batch_size = batch_size or settings.PRODUCT_EVENT_RELAY_BATCH_SIZE
+    relayed = 0
+    while count := relay_batch(publish, publish_summary, batch_size):
+        relayed += count
+        if count < batch_size:
+            break
+    retention = timedelta(days=settings.PRODUCT_EVENT_RETENTION_DAYS)
+    ProductChangeEvent.objects.filter(delivered__lt=timezone.now() - retention).delete()
+    return relayed
@@ -0,0 +1,122 @@
+from django.conf import settings
+
+from rest_framework.pagination import (
+    CursorPagination,
+    LimitOffsetPagination,
+    _reverse_ordering,
+)
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the unique product SKU.
+
+    Every page is fetched with 'WHERE sku > <position> ORDER BY sku LIMIT n' on the SKU
+    index, so deep pages cost the same as the first one. Cursors are opaque and stay valid
+    while products are added or removed.
+    """
+
+    ordering = "sku"
+    page_size = settings.PRODUCT_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.PRODUCT_MAX_PAGE_SIZE
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of paginate_queryset, fetching the page with the async ORM.
+
+        Follows CursorPagination.paginate_queryset step by step, so the links and the
+        following positions are the same.
+
+        @param queryset: The queryset to paginate.
+        @param request: The DRF request object.
+        @param view: The view, if any.
+
+        @return: The list of items of the page.
+        """
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip("-")
+            if self.cursor.reverse != order.startswith("-"):
+                queryset = queryset.filter(**{f"{order_attr}__lt": current_position})
+            else:
+                queryset = queryset.filter(**{f"{order_attr}__gt": current_position})
+
+        # One extra item tells whether a page follows this one.
+        results = [
+            item async for item in queryset[offset : offset + self.page_size + 1]
+        ]
+        self.page = results[: self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        return self.page
+
+
+class ProductOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination, used only when the client opts in by sending 'limit' or 'offset'.
+
+    Deep offsets make the database skip every preceding row, prefer the default cursors.
+    """
+
+    default_limit = settings.PRODUCT_PAGE_SIZE
+    max_limit = settings.PRODUCT_MAX_PAGE_SIZE
+
+    @classmethod
+    def requested(cls, request):
+        """
+        Returns True if the request asks for offset pagination.
+
+        @param request: The HTTP request object.
+
+        @return: True if the 'limit' or 'offset' query parameters are present.
+        """
+        params = request.query_params
+        return cls.limit_query_param in params or cls.offset_query_param in params
+
+
+class ProductSearchPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination of relevance-ranked search results.
+    """
+
+    default_limit = settings.PRODUCT_SEARCH_PAGE_SIZE
+    max_limit = settings.PRODUCT_MAX_PAGE_SIZE
@@ -0,0 +1,208 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from store.models import Product, ProductViewsDaily, ProductViewsHourly
+
+GRANULARITIES = ("hour", "day")
+GROUPS = {"product": "product__sku", "brand": "product__brand"}
+
+
+def current_hour():
+    """
+    Returns the number of hours since the epoch, the compact hour bucket of a buffered view.
+    """
+    return int(time.time()) // 3600
+
+
+def hour_start(hour):
+    """
+    Returns the aware UTC datetime at which an hour bucket starts.
+    """
+    return datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+
+
+def increment_rollups(model, bucket, deltas):
+    """
+    Adds view increments to rollup rows using set-based queries.
+
+    Existing rows are updated with a single UPDATE ... SET views = views + CASE per chunk,
+    and missing rows are created with bulk_create. Deltas for products that no longer exist
+    are dropped.
+
+    @param model: ProductViewsHourly or ProductViewsDaily.
+    @param bucket: The name of the model's bucket field, 'hour' or 'day'.
+    @param deltas: A dictionary mapping (product id, bucket) pairs to the views to add.
+
+    @return None
+    """
+    chunk_size = settings.VIEW_COUNTER_FLUSH_CHUNK_SIZE
+    keys = sorted(deltas)
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start : start + chunk_size]
+        product_ids = {product_id for product_id, _ in chunk}
+        rows = model.objects.filter(
+            product_id__in=product_ids, **{f"{bucket}__in": {key[1] for key in chunk}}
+        ).values_list("pk", "product_id", bucket)
+        existing = {
+            (product_id, value): pk
+            for pk, product_id, value in rows
+            if (product_id, value) in deltas
+        }
+        if existing:
+            increment = Case(
+                *[When(pk=pk, then=Value(deltas[key])) for key, pk in existing.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            model.objects.filter(pk__in=existing.values()).update(
+                views=F("views") + increment
+            )
+        missing = [key for key in chunk if key not in existing]
+        live = set(
+            Product.objects.filter(
+                pk__in={product_id for product_id, _ in missing}
+            ).values_list("pk", flat=True)
+        )
+        model.objects.bulk_create(
+            [
+                model(product_id=key[0], views=deltas[key], **{bucket: key[1]})
+                for key in missing
+                if key[0] in live
+            ]
+        )
+
+
+def apply_hourly_deltas(deltas):
+    """
+    Adds buffered views to the hourly rollups.
+
+    @param deltas: A dictionary mapping (product id, hour bucket) pairs to the views to add,
+    see current_hour.
+
+    @return None
+    """
+    increment_rollups(
+        ProductViewsHourly,
+        "hour",
+        {
+            (product_id, hour_start(hour)): views
+            for (product_id, hour), views in deltas.items()
+        },
+    )
+
+
+def compact(now=None):
+    """
+    Folds the hourly rollups older than VIEW_ROLLUP_HOURLY_RETENTION_DAYS into daily ones.
+
+    Whole days are folded, one transaction per day, and the folded hourly rows are deleted
+    by primary key, so hours written while a day is being folded are kept for the next run.
+
+    @param now: The reference time, defaults to the current time.
+
+    @return: The number of hourly rows folded.
+    """
+    now = now or timezone.now()
+    retention = timedelta(days=settings.VIEW_ROLLUP_HOURLY_RETENTION_DAYS)
+    cutoff = (now - retention).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = (
+        ProductViewsHourly.objects.filter(hour__lt=cutoff)
+        .annotate(day=TruncDate("hour", tzinfo=dt_timezone.utc))
+        .values_list("day", flat=True)
+        .order_by("day")
+        .distinct()
+    )
+    folded = 0
+    for day in list(days):
+        start = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc)
+        with transaction.atomic():
+            rows = list(
+                ProductViewsHourly.objects.filter(
+                    hour__gte=start, hour__lt=start + timedelta(days=1)
+                )
+                .select_for_update()
+                .values_list("pk", "product_id", "views")
+            )
+            deltas = defaultdict(int)
+            for _, product_id, views in rows:
+                deltas[(product_id, day)] += views
+            increment_rollups(ProductViewsDaily, "day", deltas)
+            ProductViewsHourly.objects.filter(pk__in=[pk for pk, *_ in rows]).delete()
+        folded += len(rows)
+    return folded
+
+
+def view_series(
+    start, end, granularity="day", group_by="product", skus=None, brands=None
+):
+    """
+    Returns the anonymous views time series of products or brands, from the rollups only.
+
+    Daily series combine the compacted daily rows with the hourly rows not compacted yet,
+    and their range is widened to whole days. Hourly series are only available for the
+    hours kept by VIEW_ROLLUP_HOURLY_RETENTION_DAYS. Buckets without views are omitted.
+
+    @param start: The aware datetime at which the range starts, inclusive.
+    @param end: The aware datetime at which the range ends, exclusive.
+    @param granularity: Either 'hour' or 'day'.
+    @param group_by: Either 'product', to key the series by SKU, or 'brand'.
+    @param skus: Optionally, the SKUs of the products to include.
+    @param brands: Optionally, the brands of the products to include.
+
+    @return: A list of dictionaries with the 'key', 'total' and 'points' of every series,
+    points being dictionaries with the 'bucket' and its 'views'.
+    """
+    filters = {}
+    if skus:
+        filters["product__sku__in"] = skus
+    if brands:
+        filters["product__brand__in"] = brands
+    group = F(GROUPS[group_by])
+
+    if granularity == "day":
+        start = start.astimezone(dt_timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        end = end.astimezone(dt_timezone.utc)
+        if end.time() != datetime.min.time():
+            end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(
+                days=1
+            )
+    hourly = ProductViewsHourly.objects.filter(hour__gte=start, hour__lt=end, **filters)
+    querysets = [
+        hourly.values(
+            group=group,
+            bucket=F("hour")
+            if granularity == "hour"
+            else TruncDate("hour", tzinfo=dt_timezone.utc),
+        )
+    ]
+    if granularity == "day":
+        daily = ProductViewsDaily.objects.filter(
+            day__gte=start.date(), day__lt=end.date(), **filters
+        )
+        querysets.append(daily.values(group=group, bucket=F("day")))
+
+    series = defaultdict(lambda: defaultdict(int))
+    for queryset in querysets:
+        for row in queryset.annotate(total=Sum("views")).order_by():
+            series[row["group"]][row["bucket"]] += row["total"]
+    return [
+        {
+            "key": key,
+            "total": sum(points.values()),
+            "points": [
+                {"bucket": bucket, "views": views}
+                for bucket, views in sorted(points.items())
+            ],
+        }
+        for key, points in sorted(series.items())
+    ]
@@ -0,0 +1,224 @@
+import math
+import re
+import threading
+from collections import Counter
+
+from django.db import connection
+from django.db.models import BooleanField, Case, F, FloatField, Func, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from store.cache import product_cache
+from store.models import Product
+
+FIELDS = ("sku", "name", "brand")
+# pg_trgm's default word_similarity_threshold, also used by the in-process index.
+WORD_SIMILARITY_THRESHOLD = 0.6
+# Added to the similarity so exact, prefix and substring matches rank first.
+EXACT_SKU_BOOST = 3.0
+PREFIX_BOOST = 2.0
+SUBSTRING_BOOST = 1.0
+
+
+class WordSimilar(Func):
+    """
+    pg_trgm's 'query <% field' operator, which can use a trigram GIN index on the field.
+    """
+
+    arg_joiner = " <%% "
+    template = "%(expressions)s"
+    output_field = BooleanField()
+
+
+class WordSimilarity(Func):
+    function = "WORD_SIMILARITY"
+    output_field = FloatField()
+
+
+def ordered_trigrams(text):
+    """
+    Returns the trigrams of a text the way pg_trgm extracts them, in order of appearance.
+
+    Every alphanumeric word is lowercased and padded with two spaces in front and one behind.
+    """
+    grams = []
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        grams.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigrams(text):
+    """
+    Returns the set of pg_trgm trigrams of a text.
+    """
+    return set(ordered_trigrams(text))
+
+
+def word_similarity(query, text):
+    """
+    Computes pg_trgm's word_similarity: the best trigram similarity between the query and any
+    continuous extent of the trigrams of the text.
+    """
+    query_grams = trigrams(query)
+    grams = ordered_trigrams(text)
+    best = 0.0
+    # The best extents start and end with trigrams of the query.
+    bounds = [index for index, gram in enumerate(grams) if gram in query_grams]
+    for first, start in enumerate(bounds):
+        for end in bounds[first:]:
+            extent = set(grams[start : end + 1])
+            common = len(extent & query_grams)
+            best = max(best, common / (len(query_grams) + len(extent) - common))
+    return best
+
+
+def boost(query, values):
+    """
+    Returns the ranking boost of a product for exact, prefix and substring matches.
+    """
+    query = query.lower()
+    values = {name: value.lower() for name, value in values.items()}
+    if values["sku"] == query:
+        return EXACT_SKU_BOOST
+    if any(value.startswith(query) for value in values.values()):
+        return PREFIX_BOOST
+    if any(query in value for value in values.values()):
+        return SUBSTRING_BOOST
+    return 0.0
+
+
+class ProductSearchIndex:
+    """
+    In-process trigram inverted index over the product SKUs, names and brands.
+
+    Used where pg_trgm is not available, e.g. with the SQLite test settings. The index maps
+    every trigram to the products containing it, so a query only scores the products sharing
+    at least one trigram with it. It is rebuilt when the catalog-wide version changes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.products = {}
+        self.postings = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        version = product_cache.catalog_state()["version"]
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            products, postings = {}, {}
+            for pk, *values in Product.objects.values_list("pk", *FIELDS).iterator():
+                products[pk] = dict(zip(FIELDS, values))
+                text = " ".join(values).lower()
+                grams = trigrams(text) | {text[i : i + 3] for i in range(len(text) - 2)}
+                for gram in grams:
+                    postings.setdefault(gram, []).append(pk)
+            self.products, self.postings, self.version = products, postings, version
+
+    def search(self, query):
+        """
+        Returns the matching products, best first.
+
+        A product can only reach the similarity threshold if it shares that fraction of the
+        query's word trigrams, and only contain the query if it has all its raw trigrams, so
+        every other product is skipped before scoring.
+
+        @param query: The search terms.
+
+        @return: A list of dictionaries with the product 'sku', 'name', 'brand' and 'score'.
+        """
+        self.refresh()
+        text = query.lower()
+        word_grams = trigrams(text)
+        raw_grams = {text[i : i + 3] for i in range(len(text) - 2)}
+        word_hits, raw_hits = Counter(), Counter()
+        for gram in word_grams:
+            word_hits.update(self.postings.get(gram, ()))
+        for gram in raw_grams:
+            raw_hits.update(self.postings.get(gram, ()))
+        if raw_grams:
+            required = math.ceil(WORD_SIMILARITY_THRESHOLD * len(word_grams))
+            candidates = {pk for pk, hits in word_hits.items() if hits >= required}
+            candidates.update(
+                pk for pk, hits in raw_hits.items() if hits == len(raw_grams)
+            )
+        else:
+            # Too short for trigrams, only prefixes and substrings can match.
+            candidates = self.products
+
+        similarities = {}
+        results = []
+        for pk in candidates:
+            values = self.products[pk]
+            for value in values.values():
+                if value not in similarities:
+                    similarities[value] = word_similarity(query, value)
+            similarity = max(similarities[value] for value in values.values())
+            bonus = boost(query, values)
+            if bonus or similarity >= WORD_SIMILARITY_THRESHOLD:
+                results.append({**values, "score": round(similarity + bonus, 4)})
+        results.sort(key=lambda result: (-result["score"], result["sku"]))
+        return results
+
+
+search_index = ProductSearchIndex()
+
+
+def search_queryset(query):
+    """
+    Builds the Postgres search query, served by the pg_trgm GIN indexes on UPPER(field).
+
+    @param query: The search terms.
+
+    @return: A queryset of dictionaries with the product 'sku', 'name', 'brand' and 'score'.
+    """
+    matches = Q()
+    for name in FIELDS:
+        matches |= Q(WordSimilar(Value(query), Upper(name))) | Q(
+            **{f"{name}__icontains": query}
+        )
+    score = Greatest(
+        *[WordSimilarity(Value(query), F(name)) for name in FIELDS]
+    ) + Case(
+        When(sku__iexact=query, then=Value(EXACT_SKU_BOOST)),
+        When(
+            Q(sku__istartswith=query)
+            | Q(name__istartswith=query)
+            | Q(brand__istartswith=query),
+            then=Value(PREFIX_BOOST),
+        ),
+        When(
+            Q(sku__icontains=query)
+            | Q(name__icontains=query)
+            | Q(brand__icontains=query),
+            then=Value(SUBSTRING_BOOST),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    return (
+        Product.objects.filter(matches)
+        .annotate(score=score)
+        .order_by("-score", "sku")
+        .values("sku", "name", "brand", "score")
+    )
+
+
+def search_products(query):
+    """
+    Searches products by SKU, name and brand, with prefix, substring and typo-tolerant
+    matching, ranked by relevance.
+
+    Postgres answers from trigram GIN indexes, other databases from the in-process index.
+
+    @param query: The search terms.
+
+    @return: A queryset or list of dictionaries with the product 'sku', 'name', 'brand' and
+    'score', best first.
+    """
+    if connection.vendor == "postgresql":
+        return search_queryset(query)
+    return search_index.search(query)
@@ -1,26 +1,60 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
 from rest_framework import serializers
+from store.importers import FORMATS
 from store.models import Product
-from store.tasks import product_change_notification
+from store.outbox import record_product_change
+from store.rollups import GRANULARITIES, GROUPS
 
 
 class ProductListSerializer(serializers.ModelSerializer):
     """
     Serializer class for the list of products.
 
-    Includes only the 'sku' and 'name' fields.
+    Includes only the 'sku' and 'name' fields. Both are plain strings, so pages are
+    represented straight from database rows by the values and represent class methods,
+    without the per-row field machinery of to_representation.
     """
 
     class Meta:
         model = Product
         fields = ("sku", "name")
 
+    @classmethod
+    def values(cls, queryset):
+        """
+        Returns the queryset of the rows to represent, see represent.
+
+        @param queryset: A product queryset.
+
+        @return: A queryset of named tuples with the serializer fields.
+        """
+        return queryset.values_list(*cls.Meta.fields, named=True)
+
+    @classmethod
+    def represent(cls, rows):
+        """
+        Returns the same representation as ProductListSerializer(many=True).data.
+
+        @param rows: Rows of the queryset returned by values.
+
+        @return: A list of dictionaries.
+        """
+        fields = cls.Meta.fields
+        return [dict(zip(fields, row)) for row in rows]
+
 
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer class for individual products.
 
     Includes the 'sku', 'name', 'price', and 'brand' fields.
-    Performs a Celery task to notify users of product changes upon update.
+    Records the product changes in the outbox upon update, they are relayed to the admins'
+    next digest once committed.
     """
 
     price = serializers.DecimalField(
@@ -33,7 +67,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         """
-        Performs an update on a product instance, and schedules a Celery task to notify users of changes.
+        Performs an update on a product instance, and records its changed fields in the outbox
+        in the same transaction.
 
         Args:
         @param instance: The existing product instance to be updated.
@@ -41,5 +76,138 @@ class ProductSerializer(serializers.ModelSerializer):
 
         @return: The updated product instance.
         """
-        product_change_notification.delay(instance.sku)
-        return super(ProductSerializer, self).update(instance, validated_data)
+        changed_fields = [
+            name
+            for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        with transaction.atomic():
+            instance = super(ProductSerializer, self).update(instance, validated_data)
+            record_product_change(instance.sku, changed_fields)
+        return instance
+
+
+class ProductImportUploadSerializer(serializers.Serializer):
+    """
+    Serializer class for catalog file uploads.
+
+    The format is detected from the file extension when it is not given.
+    """
+
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+
+class ProductBatchSerializer(serializers.Serializer):
+    """
+    Serializer class for the items of a batch write.
+
+    The items are validated by store.batches, in one pass.
+    """
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.PRODUCT_BATCH_MAX_SIZE,
+    )
+
+
+class ProductExportQuerySerializer(serializers.Serializer):
+    """
+    Serializer class for the query parameters of the catalog export.
+
+    'since' restricts the export to the products modified at or after it, for incremental
+    exports.
+    """
+
+    file_format = serializers.ChoiceField(choices=FORMATS, default="jsonl")
+    since = serializers.DateTimeField(required=False)
+
+
+class ViewReportQuerySerializer(serializers.Serializer):
+    """
+    Serializer class for the query parameters of the product views report.
+
+    The range defaults to the last 30 days, products can be filtered by repeating the 'sku'
+    and 'brand' parameters.
+    """
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default="day")
+    group_by = serializers.ChoiceField(choices=list(GROUPS), default="product")
+    sku = serializers.ListField(child=serializers.CharField(), required=False)
+    brand = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate(self, attrs):
+        """
+        Fills in the default range and checks that it is not empty.
+        """
+        attrs.setdefault("end", timezone.now())
+        attrs.setdefault("start", attrs["end"] - timedelta(days=30))
+        if attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"end": ["Must be after start."]})
+        return attrs
+
+
+class TrendingQuerySerializer(serializers.Serializer):
+    """
+    Serializer class for the query parameters of the trending products.
+    """
+
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.TRENDING_MAX_LIMIT, default=50
+    )
+    minutes = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.TRENDING_WINDOW_MINUTES,
+        default=settings.TRENDING_WINDOW_MINUTES,
+    )
+
+
+class ProductSearchQuerySerializer(serializers.Serializer):
+    """
+    Serializer class for the query parameters of the product search.
+    """
+
+    q = serializers.CharField(max_length=128)
+
+
+class ProductSearchResultSerializer(serializers.Serializer):
+    """
+    Serializer class for product search results, with their relevance score.
+    """
+
+    sku = serializers.CharField()
+    name = serializers.CharField()
+    brand = serializers.CharField()
+    score = serializers.FloatField()
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Serializer class for the product list filters, brands can be repeated.
+    """
+
+    brand = serializers.ListField(child=serializers.CharField(), required=False)
+    price_min = serializers.DecimalField(
+        max_digits=16, decimal_places=2, required=False
+    )
+    price_max = serializers.DecimalField(
+        max_digits=16, decimal_places=2, required=False
+    )
+
+    def filter_queryset(self, queryset):
+        """
+        Applies the validated filters to a product queryset.
+
+        The filters are answered from the (brand, price) index.
+        """
+        filters = self.validated_data
+        if filters.get("brand"):
+            queryset = queryset.filter(brand__in=filters["brand"])
+        if "price_min" in filters:
+            queryset = queryset.filter(price__gte=filters["price_min"])
+        if "price_max" in filters:
+            queryset = queryset.filter(price__lte=filters["price_max"])
+        return queryset
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from store.cache import product_cache
+from store.facets import apply_deltas, change_deltas
+from store.models import Product
+
+
+@receiver(post_save, sender=Product)
+def invalidate_saved_product(sender, instance, created, **kwargs):
+    """
+    Invalidates the cached copies of a product, under its old and new SKU, once the save is
+    committed.
+
+    Invalidating after the commit guarantees that a concurrent read can only cache the old
+    data under a version that has already been superseded.
+    """
+    skus = {instance.sku, instance.tracker.previous("sku") or instance.sku}
+    transaction.on_commit(lambda: product_cache.invalidate(*skus))
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_deleted_product(sender, instance, **kwargs):
+    """
+    Invalidates the cached copies of a product once its deletion is committed.
+    """
+    transaction.on_commit(lambda: product_cache.invalidate(instance.sku))
+
+
+@receiver(post_save, sender=Product)
+def count_saved_product(sender, instance, created, **kwargs):
+    """
+    Moves a created product, or a product whose brand or price changed, between facets.
+    """
+    tracker = instance.tracker
+    if created:
+        old = None
+    elif tracker.has_changed("brand") or tracker.has_changed("price"):
+        old = (tracker.previous("brand"), tracker.previous("price"))
+    else:
+        return
+    apply_deltas(change_deltas(old, (instance.brand, instance.price)))
+
+
+@receiver(post_delete, sender=Product)
+def count_deleted_product(sender, instance, **kwargs):
+    """
+    Removes a deleted product from its facet.
+    """
+    tracker = instance.tracker
+    brand = tracker.previous("brand") or instance.brand
+    price = tracker.previous("price")
+    apply_deltas(
+        change_deltas((brand, instance.price if price is None else price), None)
+    )
@@ -1,100 +1,311 @@
 import logging
+from itertools import islice
 
 from django.conf import settings
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
 
-from rest_framework import status
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import *
-from store.models import PRODUCT_ADMIN_GROUP, Product, ProductStats
+from sendgrid.helpers.mail import Mail, Personalization, To
+from store import notifications, outbox, rollups
+from store.counters import flush, record_view
+from store.delivery import get_delivery_engine
+from store.models import PRODUCT_ADMIN_GROUP, Product
 
 from zebrands import celery_app
+from zebrands.db import reads_from_replicas
 
 log = logging.getLogger()
 
 
-def send_emails(sg, user, product):
+def admin_recipients():
     """
-    Sends an email to the given user about the updated product.
+    Lazily fetches the recipients of product notifications.
 
-    Constructs an email message with the updated product information and sends it to the user's email address.
+    Only the columns needed to address and personalize an email are loaded, and users
+    without an email are skipped since a single invalid address makes SendGrid reject the
+    whole request.
 
-    @param sg: (SendGridAPIClient) The SendGrid client to use for sending the email.
-    @param user: The user to send the email to.
-    @param product: The updated product.
-
-    @return:
-    - bool: True if the email was sent successfully, False otherwise.
+    @return: An iterator of dictionaries with the 'email', 'first_name' and 'last_name' keys.
     """
-    kwargs = {
-        "username": f"{user.first_name} {user.last_name}",
-        "name": product.name,
-        "brand": product.brand,
-        "sku": product.sku,
-    }
-    message = Mail(
-        from_email=(settings.SENDGRID_FROM_EMAIL, "Zebrands"), to_emails=user.email
+    return (
+        User.objects.filter(groups__name=PRODUCT_ADMIN_GROUP)
+        .exclude(email="")
+        .order_by("pk")
+        .values("email", "first_name", "last_name")
+        .iterator(chunk_size=settings.SENDGRID_MAX_PERSONALIZATIONS)
     )
-    message.dynamic_template_data = kwargs
-    message.template_id = settings.PRODUCT_UPDATE_EMAIL_ID
-    try:
-        response = sg.send(message)
-    except Exception as error:
-        log.exception(error)
-        return False
-
-    if response.status_code == status.HTTP_202_ACCEPTED:
-        log.info(f"Message successfully sent to {user.email}")
-        return True
-    else:
-        message = (
-            f"An error occurred while trying to send the message "
-            f"to {user.email} \n "
-            f"Response status: {response.status_code} \n"
-            f"Response status: {response.status_code} \n"
-            f"Response body: {response.body} \n"
-            f"Response headers: {response.headers}"
+
+
+def chunked(iterable, size):
+    """
+    Splits an iterable into lists of at most 'size' items.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def build_message(recipients, template_id, template_data):
+    """
+    Builds a SendGrid dynamic template email for many recipients.
+
+    Every recipient gets its own personalization, carrying its own dynamic template data, so
+    recipients do not see each other's address.
+
+    @param recipients: A list of recipients, see admin_recipients.
+    @param template_id: The id of the SendGrid dynamic template.
+    @param template_data: The dynamic data shared by all recipients.
+
+    @return: The JSON payload of the mail send request.
+    """
+    message = Mail(from_email=(settings.SENDGRID_FROM_EMAIL, "Zebrands"))
+    message.template_id = template_id
+    for recipient in recipients:
+        personalization = Personalization()
+        personalization.add_to(To(recipient["email"]))
+        personalization.dynamic_template_data = {
+            "username": f"{recipient['first_name']} {recipient['last_name']}",
+            **template_data,
+        }
+        message.add_personalization(
+            personalization, index=len(message.personalizations)
         )
-        log.warning(message)
-        return False
+    return message.get()
+
+
+def send_batches(chunks, template_id, template_data):
+    """
+    Sends a template email to chunks of recipients, one SendGrid request per chunk.
+
+    The requests are sent concurrently by the delivery engine, which retries rate limited and
+    failed requests, see store.delivery.
+
+    @param chunks: A list of recipient lists, see admin_recipients.
+    @param template_id: The id of the SendGrid dynamic template.
+    @param template_data: The dynamic data shared by all recipients.
+
+    @return:
+    - dict: Maps every recipient's email to True if it was sent successfully, False otherwise.
+    """
+    payloads = [build_message(chunk, template_id, template_data) for chunk in chunks]
+    results = {}
+    for chunk, result in zip(chunks, get_delivery_engine().send_many(payloads)):
+        emails = [recipient["email"] for recipient in chunk]
+        if result.ok:
+            for email in emails:
+                log.info(f"Message successfully sent to {email}")
+        else:
+            log.warning(
+                f"An error occurred while trying to send the message "
+                f"to {', '.join(emails)} \n "
+                f"Response status: {result.status} \n"
+                f"Response body: {result.body} \n"
+                f"Error: {result.error} after {result.attempts} attempts"
+            )
+        results.update(dict.fromkeys(emails, result.ok))
+    return results
+
+
+@celery_app.task
+def send_admin_batch(template_id, template_data, recipients):
+    """
+    Sends a template email to a chunk of product admins.
+
+    @param template_id: The id of the SendGrid dynamic template.
+    @param template_data: The dynamic data shared by all recipients.
+    @param recipients: A list of recipients, see admin_recipients.
+
+    @return: A dictionary mapping every recipient's email to whether it was sent.
+    """
+    return send_batches([recipients], template_id, template_data)
+
+
+def notify_product_admins(template_id, template_data):
+    """
+    Sends a template email to every user in the 'Product Admin' group.
+
+    Recipients are grouped into requests of up to SENDGRID_MAX_PERSONALIZATIONS. Up to
+    NOTIFICATION_MAX_CONCURRENCY chunks are sent right away and concurrently, and the
+    remaining ones, for very large groups, are sent in parallel by send_admin_batch subtasks.
+
+    @param template_id: The id of the SendGrid dynamic template.
+    @param template_data: The dynamic data shared by all recipients.
+
+    @return: A dictionary mapping the email of every recipient sent inline to whether it was
+    sent, the subtasks report the other chunks.
+    """
+    chunks = chunked(admin_recipients(), settings.SENDGRID_MAX_PERSONALIZATIONS)
+    inline = list(islice(chunks, settings.NOTIFICATION_MAX_CONCURRENCY))
+    if not inline:
+        return {}
+    for chunk in chunks:
+        send_admin_batch.delay(template_id, template_data, chunk)
+    return send_batches(inline, template_id, template_data)
 
 
 @celery_app.task
 def product_change_notification(sku):
     """
-    Sends an email notification to all users in the 'Product Admin' group about a product update.
+    Notifies the product admins about a product update.
 
-    Retrieves the product with the given SKU from the database, and sends an email notification to all users
-    in the 'Product Admin' group with information about the updated product.
+    Product changes are now written to the outbox in the transaction that saves them, see
+    store.outbox. This task is kept so messages enqueued before that change are still
+    notified once drained, through the outbox, and will be removed in a later release.
 
     @param sku: The SKU of the updated product.
 
     @return None
     """
-    product = Product.objects.get(sku=sku)
-    sg = SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-    admins = Group.objects.get(name=PRODUCT_ADMIN_GROUP)
-    users = admins.user_set.all()
-    for user in users:
-        send_emails(sg, user, product)
+    outbox.record_product_change(sku, [])
+
+
+def notify_product_changes(changes):
+    """
+    Queues product changes for the next digest notification of the product admins.
+
+    Changes are coalesced per SKU during PRODUCT_NOTIFICATION_WINDOW seconds, the change that
+    opens a window schedules its flush.
+
+    @param changes: A dictionary mapping product SKUs to the names of their changed fields.
+
+    @return None
+    """
+    if notifications.record_changes(changes):
+        flush_product_notifications.apply_async(
+            countdown=settings.PRODUCT_NOTIFICATION_WINDOW
+        )
+
+
+def send_product_digest(changes):
+    """
+    Notifies the product admins of the changes collected during a window.
+
+    A single changed product is notified with the regular product update template. Several
+    products are listed, with their final state and changed fields, in a single digest
+    email. Without a digest template, each product is notified with the update template.
+
+    @param changes: A dictionary mapping product SKUs to the set of their changed fields.
+
+    @return: A dictionary mapping recipients' emails to whether they were sent.
+    """
+    products = {
+        product["sku"]: product
+        for product in Product.objects.filter(sku__in=changes).values(
+            "sku", "name", "brand", "price"
+        )
+    }
+    if len(changes) > 1 and settings.PRODUCT_DIGEST_EMAIL_ID:
+        digest = [
+            {
+                "sku": sku,
+                "name": products.get(sku, {}).get("name"),
+                "brand": products.get(sku, {}).get("brand"),
+                "price": str(products[sku]["price"]) if sku in products else None,
+                "changed_fields": sorted(changes[sku]),
+                "deleted": sku not in products,
+            }
+            for sku in sorted(changes)
+        ]
+        template_data = {"products": digest, "count": len(digest)}
+        return notify_product_admins(settings.PRODUCT_DIGEST_EMAIL_ID, template_data)
+
+    results = {}
+    for sku in sorted(products):
+        template_data = {
+            "name": products[sku]["name"],
+            "brand": products[sku]["brand"],
+            "sku": sku,
+        }
+        results.update(
+            notify_product_admins(settings.PRODUCT_UPDATE_EMAIL_ID, template_data)
+        )
+    return results
+
+
+@celery_app.task
+@reads_from_replicas
+def flush_product_notifications():
+    """
+    Closes the current notification window and sends its digest.
+
+    Batches left behind by an interrupted flush are notified again here.
+
+    @return: A dictionary mapping recipients' emails to whether they were sent.
+    """
+    notifications.hand_off()
+    results = {}
+    for batch_id in notifications.pending_batches():
+        changes = notifications.read_batch(batch_id)
+        if changes:
+            results.update(send_product_digest(changes))
+        notifications.discard_batch(batch_id)
+    return results
+
+
+@celery_app.task
+def relay_product_change_events():
+    """
+    Publishes the pending product change events of the outbox to the notification digest,
+    and queues the notification of the catalog imports.
+
+    Scheduled periodically by Celery beat (see CELERY_BEAT_SCHEDULE).
+
+    @return: The number of events relayed.
+    """
+    return outbox.relay(notify_product_changes, product_import_notification.delay)
+
+
+@celery_app.task
+@reads_from_replicas
+def product_import_notification(summary):
+    """
+    Sends a single email per 'Product Admin' user summarizing a catalog import.
+
+    @param summary: A dictionary with the import totals, see store.importers.ImportReport.
+
+    @return: A dictionary mapping recipients' emails to whether they were sent.
+    """
+    if not settings.PRODUCT_IMPORT_EMAIL_ID:
+        log.warning("PRODUCT_IMPORT_EMAIL_ID is not set, skipping import notification")
+        return {}
+    return notify_product_admins(settings.PRODUCT_IMPORT_EMAIL_ID, summary)
 
 
 @celery_app.task
 def product_update_counter(sku):
     """
-    Updates the view count for a product.
+    Buffers a view for a product.
 
-    Retrieves the product with the given SKU from the database, and increments its view count by 1.
-    If the product does not yet have a ProductStats object associated with it, one is created.
+    Views are now buffered directly from the request path with store.counters.record_view.
+    This task is kept so messages enqueued before that change still count once drained.
 
-    @param sku: The SKU of the product to update.
+    @param sku: The SKU of the viewed product.
 
     @return None
     """
-    product = Product.objects.get(sku=sku)
-    if hasattr(product, "stats"):
-        stat = product.stats
-    else:
-        stat = ProductStats(product=product)
-    stat.view_count += 1
-    stat.save()
+    product_id = Product.objects.filter(sku=sku).values_list("pk", flat=True).first()
+    if product_id is not None:
+        record_view(product_id)
+
+
+@celery_app.task
+def flush_view_counters():
+    """
+    Applies the buffered product views to ProductStats.
+
+    Scheduled periodically by Celery beat (see CELERY_BEAT_SCHEDULE).
+
+    @return: The number of views applied.
+    """
+    return flush()
+
+
+@celery_app.task
+def compact_view_rollups():
+    """
+    Folds the old hourly view rollups into daily ones.
+
+    Scheduled periodically by Celery beat (see CELERY_BEAT_SCHEDULE).
+
+    @return: The number of hourly rows folded.
+    """
+    return rollups.compact()
@@ -1,10 +1,34 @@
 from django.conf import settings
+from django.core.cache import caches
 
+import fakeredis
 import pytest
 from rest_framework.test import APIClient
+from store.cache import product_cache
+from store.models import ProductFacet
 from store.tests.factories import ProductFactory, ProductStatsFactory, UserFactory
 
 
+@pytest.fixture(autouse=True)
+def redis(monkeypatch):
+    """
+    Fixture to replace the shared Redis connection with an isolated in-memory server.
+    """
+    connection = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr("zebrands.redis._connection", connection)
+    return connection
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Fixture to start every test with empty caches.
+    """
+    caches[settings.PRODUCT_CACHE_ALIAS].clear()
+    product_cache.local.clear()
+    product_cache.stats.clear()
+
+
 @pytest.fixture()
 def product():
     """
@@ -37,3 +61,27 @@ def client(user):
     client = APIClient()
     client.force_authenticate(user=user)
     return client
+
+
+@pytest.fixture()
+def admin(mocker):
+    """
+    Fixture to let the test clients through the product admin permission.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+
+
+@pytest.fixture()
+def facet_counts():
+    """
+    Fixture returning a function that reads the non-empty facet counts, by brand and price
+    bucket.
+    """
+
+    def counts():
+        return {
+            (facet.brand, facet.price_from): facet.count
+            for facet in ProductFacet.objects.filter(count__gt=0)
+        }
+
+    return counts
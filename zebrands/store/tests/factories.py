@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
 
-from factory import Faker, SubFactory
+from factory import Faker, Sequence, SubFactory
 from factory.django import DjangoModelFactory
 from store.models import Product, ProductStats
 
@@ -10,7 +10,7 @@ class ProductFactory(DjangoModelFactory):
     Define a factory for the `Product` model
     """
 
-    sku = Faker("bothify")
+    sku = Sequence(lambda n: f"SKU-{n:06d}")
     name = Faker("color_name")
     price = Faker("pydecimal", left_digits=4, right_digits=2, positive=True)
     brand = Faker("company")
@@ -5,7 +5,7 @@ from django.urls import reverse
 import pytest
 from rest_framework import status
 from rest_framework.test import APIClient
-from store.models import Product
+from store.models import Product, ProductChangeEvent
 from store.serializers import ProductListSerializer, ProductSerializer
 from store.tests.factories import ProductFactory
 
@@ -27,9 +27,9 @@ def test_list_products(user):
     # Create a batch of products using the ProductFactory.
     _ = ProductFactory.create_batch(page_size)
 
-    # Retrieve the queryset of all products and create a request factory to be used
-    # by the serializer context.
-    query = Product.objects.all()
+    # Retrieve the queryset of all products in cursor order and create a request factory to
+    # be used by the serializer context.
+    query = Product.objects.order_by("sku")
     request_factory = RequestFactory()
     expected_results = ProductListSerializer(
         query, many=True, context={"request": request_factory.get(path="/")}
@@ -37,9 +37,9 @@ def test_list_products(user):
 
     expected = [status.HTTP_200_OK, expected_results]
     # Send a GET request to the products-list endpoint using the test client, and retrieve
-    # the received response as a list containing the HTTP status code and received data.
+    # the received response as a list containing the HTTP status code and received page.
     response = client.get(reverse("products-list"))
-    received = [response.status_code, response.data]
+    received = [response.status_code, response.data["results"]]
 
     # Assert that the received response matches the expected response.
     assert expected == received
@@ -48,8 +48,8 @@ def test_list_products(user):
 def test_retrieve_product_no_auth(product, mocker):
     """
     Test the retrieve_product view function without authenticating the client, by checking
-    that its response status code and data match the expected values, and that the product's
-    update_counter task is called.
+    that its response status code and data match the expected values, and that a view of the
+    product is recorded.
 
     @param product: The product to retrieve.
     @type product: store.models.Product
@@ -61,8 +61,8 @@ def test_retrieve_product_no_auth(product, mocker):
 
     expected = [status.HTTP_200_OK, expected_results]
 
-    # Mock the product_update_counter task using the pytest-mock mocker fixture.
-    product_update_counter = mocker.patch("store.views.product_update_counter.delay")
+    # Mock the record_view function using the pytest-mock mocker fixture.
+    record_view = mocker.patch("store.views.record_view")
 
     # Send a GET request to the products-detail endpoint for the given product using the test
     # client, and retrieve the received response as a list containing the HTTP status code
@@ -70,18 +70,17 @@ def test_retrieve_product_no_auth(product, mocker):
     response = client.get(reverse("products-detail", args=(product.sku,)))
     received = [response.status_code, response.data]
 
-    # Assert that the product_update_counter task was called with the given product's SKU,
-    # and that the received response matches the expected response
-    assert product_update_counter.called
-    product_update_counter.assert_called_with(product.sku)
+    # Assert that a view was recorded for the given product, and that the received response
+    # matches the expected response
+    assert record_view.called
+    record_view.assert_called_with(product.pk, brand=product.brand, visitor=mocker.ANY)
     assert expected == received
 
 
 def test_retrieve_product_auth(client, product, mocker):
     """
     Test the retrieve_product view function with an authenticated client, by checking that its
-    response status code and data match the expected values, and that the product's update_counter
-    task is not called.
+    response status code and data match the expected values, and that no view is recorded.
 
     @param client: The test client authenticated with a user.
     @type client: rest_framework.test.APIClient
@@ -93,8 +92,8 @@ def test_retrieve_product_auth(client, product, mocker):
     expected_results = ProductSerializer(product).data
     expected = [status.HTTP_200_OK, expected_results]
 
-    # Mock the product_update_counter task using the pytest-mock mocker fixture.
-    product_update_counter = mocker.patch("store.views.product_update_counter.delay")
+    # Mock the record_view function using the pytest-mock mocker fixture.
+    record_view = mocker.patch("store.views.record_view")
 
     # Send a GET request to the products-detail endpoint for the given product using the
     # authenticated test client, and retrieve the received response as a list containing the
@@ -102,9 +101,9 @@ def test_retrieve_product_auth(client, product, mocker):
     response = client.get(reverse("products-detail", args=(product.sku,)))
     received = [response.status_code, response.data]
 
-    # Assert that the product_update_counter task was not called, and that the received response
-    # matches the expected response.
-    assert not product_update_counter.called
+    # Assert that no view was recorded, and that the received response matches the expected
+    # response.
+    assert not record_view.called
     assert expected == received
 
 
@@ -134,18 +133,19 @@ def test_create_product_no_group_permission(client, product):
     assert response.status_code == expected
 
 
-def test_create_product(user, product, mocker):
+def test_create_product(user, mocker):
     """
     Test function to create a product using an authenticated user.
 
     @param user: The User object that will be authenticated.
-    @param product: The Product object to be created.
     @param mocker: The mocker object to patch the ProductAdminOnly permission class.
     @return: None
     """
     # Create a test client and authenticate the user
     client = APIClient()
     client.force_authenticate(user=user)
+    # Build an unsaved product, SKUs are unique
+    product = ProductFactory.build()
 
     data = {
         "sku": product.sku,
@@ -171,7 +171,7 @@ def test_update_product(client, product, mocker):
 
     @param client: The Django test client object.
     @param product: The Product object to be updated.
-    @param mocker: The mocker object to patch the ProductAdminOnly permission class and notify_update_product method.
+    @param mocker: The mocker object to patch the ProductAdminOnly permission class.
     @return: None
     """
     data = {
@@ -190,16 +190,13 @@ def test_update_product(client, product, mocker):
 
     # Send a PATCH request to the 'products-detail' endpoint with the product data
     mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
-    notify_update_product = mocker.patch(
-        "store.serializers.product_change_notification.delay"
-    )
     response = client.patch(reverse("products-detail", args=(product.sku,)), data=data)
     received = [response.status_code, response.data]
 
     # Verify that the expected and received results match
     assert expected == received
-    assert notify_update_product.called
-    notify_update_product.assert_called_with(product.sku)
+    event = ProductChangeEvent.objects.get()
+    assert event.changes == {product.sku: ["name"]}
 
 
 def test_delete_product(client, mocker):
@@ -229,3 +226,61 @@ def test_delete_product(client, mocker):
     prod_set = set(prod_list)
     prod_set.remove(prod_to_delete)
     assert prod_set == objects
+
+
+def test_list_products_cursor_pagination():
+    """
+    Test that the products-list endpoint walks the whole catalog in SKU order by following
+    the opaque 'next' cursors.
+    """
+    products = ProductFactory.create_batch(5)
+    client = APIClient()
+
+    received = []
+    url = reverse("products-list") + "?page_size=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) <= 2
+        received.extend(item["sku"] for item in response.data["results"])
+        url = response.data["next"]
+
+    assert received == sorted(product.sku for product in products)
+
+
+def test_list_products_offset_pagination_opt_in():
+    """
+    Test that limit/offset pagination is used only when the client asks for it.
+    """
+    products = sorted(ProductFactory.create_batch(4), key=lambda product: product.sku)
+    client = APIClient()
+
+    response = client.get(reverse("products-list"), {"limit": 2, "offset": 1})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 4
+    assert [item["sku"] for item in response.data["results"]] == [
+        product.sku for product in products[1:3]
+    ]
+
+
+def test_create_product_duplicate_sku(client, product, mocker):
+    """
+    Test that a product cannot be created with the SKU of an existing one.
+
+    @param client: The Django test client object.
+    @param product: The existing product.
+    @param mocker: The mocker object to patch the ProductAdminOnly permission class.
+    """
+    data = {
+        "sku": product.sku,
+        "name": product.name,
+        "price": str(product.price),
+        "brand": product.brand,
+    }
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+
+    response = client.post(reverse("products-list"), data=data)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "sku" in response.data
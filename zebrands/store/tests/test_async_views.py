@@ -0,0 +1,119 @@
+import asyncio
+
+from django.test import AsyncClient
+from django.urls import reverse
+
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from store import async_views, counters
+from store.models import ProductStats
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+HEADERS = ("Content-Type", "Allow", "Vary", "ETag", "Last-Modified")
+
+
+def asgi_get(path, data=None, headers=None):
+    """
+    Sends a GET through the ASGI handler and waits for the background tasks it started.
+    """
+
+    async def get():
+        response = await AsyncClient().get(path, data, headers=headers)
+        await asyncio.gather(*async_views._background)
+        return response
+
+    return async_to_sync(get)()
+
+
+def assert_same_response(asgi, wsgi):
+    assert asgi.status_code == wsgi.status_code
+    assert asgi.content == wsgi.content
+    for header in HEADERS:
+        assert asgi.get(header) == wsgi.get(header), header
+
+
+def test_async_retrieve_matches_sync():
+    """
+    Test that the async retrieve responds like ProductViewSet.retrieve, from the cache or
+    the database, and records the view.
+    """
+    product = ProductFactory(name="Café ✓")
+    url = reverse("products-detail", args=[product.sku])
+
+    asgi = asgi_get(url)
+    wsgi = APIClient().get(url)
+
+    assert asgi.status_code == 200
+    assert asgi.resolver_match.func.__module__ == "store.async_views"
+    assert_same_response(asgi, wsgi)
+    counters.flush()
+    assert ProductStats.objects.get(product=product).view_count == 2
+
+    not_modified = asgi_get(url, headers={"If-None-Match": asgi["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified["Allow"] == asgi["Allow"]
+
+
+def test_async_retrieve_not_found():
+    """
+    Test that a missing product is a 404, like in ProductViewSet.retrieve.
+    """
+    url = reverse("products-detail", args=["MISSING"])
+
+    assert_same_response(asgi_get(url), APIClient().get(url))
+
+
+def test_async_list_matches_sync():
+    """
+    Test that the async list walks the cursor pages, forwards and backwards, like
+    ProductViewSet.list.
+    """
+    ProductFactory.create_batch(5)
+    url = reverse("products-list") + "?page_size=2"
+
+    pages = 0
+    while url:
+        asgi = asgi_get(url)
+        assert_same_response(asgi, APIClient().get(url))
+        url = asgi.json()["next"]
+        pages += 1
+    assert pages == 3
+
+    previous = asgi.json()["previous"]
+    assert_same_response(asgi_get(previous), APIClient().get(previous))
+
+
+def test_async_list_filters():
+    """
+    Test that the list filters are validated and applied by the async list.
+    """
+    ProductFactory.create_batch(2, brand="Acme")
+    ProductFactory(brand="Zeta")
+    url = reverse("products-list")
+
+    for params in ({"brand": "Acme"}, {"price_min": "x"}):
+        assert_same_response(asgi_get(url, params), APIClient().get(url, params))
+
+
+def test_sync_fallback(user):
+    """
+    Test that authenticated requests, offset pagination and the browsable API are left to
+    the DRF views.
+    """
+    product = ProductFactory()
+    token = Token.objects.create(user=user)
+    detail = reverse("products-detail", args=[product.sku])
+
+    for path, data, headers in (
+        (detail, None, {"Authorization": f"Token {token.key}"}),
+        (reverse("products-list"), {"limit": 1}, None),
+        (detail, None, {"Accept": "text/html"}),
+    ):
+        response = asgi_get(path, data, headers)
+        assert response.status_code == 200
+        assert response.resolver_match.func.__module__ == "store.async_views"
+        assert response.renderer_context["view"].__class__.__name__ == "ProductViewSet"
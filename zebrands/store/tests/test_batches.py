@@ -0,0 +1,244 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store import batches
+from store.batches import SKU_EXISTS, create_products, delete_products, update_products
+from store.models import Product, ProductChangeEvent, ProductStats, ProductViewsHourly
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def item(sku, price="10.00", brand="Acme"):
+    return {"sku": sku, "name": f"Product {sku}", "price": price, "brand": brand}
+
+
+def test_create_products(facet_counts):
+    """
+    Test that a batch create inserts the valid items and reports the others, in order.
+
+    @param facet_counts: The facet counts fixture.
+    """
+    existing = ProductFactory(sku="OLD-1", brand="Acme", price=Decimal("5.00"))
+
+    report = create_products(
+        [
+            item("NEW-1"),
+            item("NEW-2", price="not a price"),
+            item(existing.sku),
+            item("NEW-1"),
+            {"name": "No SKU"},
+            item("NEW-3", price="30", brand="Zeta"),
+        ]
+    ).as_dict()
+
+    assert (report["created"], report["failed"]) == (2, 4)
+    assert [(result["sku"], result["status"]) for result in report["results"]] == [
+        ("NEW-1", "created"),
+        ("NEW-2", "error"),
+        ("OLD-1", "error"),
+        ("NEW-1", "error"),
+        (None, "error"),
+        ("NEW-3", "created"),
+    ]
+    assert report["results"][1]["errors"] == {"price": ["A valid number is required."]}
+    assert Product.objects.get(sku="NEW-3").price == Decimal("30.00")
+    assert facet_counts() == {("Acme", 0): 1, ("Acme", 10): 1, ("Zeta", 25): 1}
+    fields = ["brand", "name", "price", "sku"]
+    assert ProductChangeEvent.objects.get().changes == {
+        "NEW-1": fields,
+        "NEW-3": fields,
+    }
+
+
+def test_create_products_reports_concurrent_creates(mocker):
+    """
+    Test that SKUs inserted by another request after the existence check are reported,
+    and the other products still created.
+    """
+    drop_existing = batches._drop_existing
+
+    def check_then_race(products, report):
+        dropped = drop_existing(products, report)
+        if not Product.objects.filter(sku="RACE-1").exists():
+            ProductFactory(sku="RACE-1")
+        return dropped
+
+    mocker.patch("store.batches._drop_existing", side_effect=check_then_race)
+
+    report = create_products([item("RACE-1"), item("NEW-1")]).as_dict()
+
+    assert report["results"] == [
+        {"sku": "RACE-1", "status": "error", "errors": SKU_EXISTS},
+        {"sku": "NEW-1", "status": "created"},
+    ]
+    assert ProductChangeEvent.objects.get().changes == {
+        "NEW-1": ["brand", "name", "price", "sku"]
+    }
+
+
+def test_update_products_records_single_event(
+    django_capture_on_commit_callbacks, facet_counts
+):
+    """
+    Test that a batch update changes the given fields only, moves the facets, records a
+    single outbox event and invalidates the cached products.
+
+    @param facet_counts: The facet counts fixture.
+    """
+    first = ProductFactory(sku="SKU-A", brand="Acme", price=Decimal("5.00"))
+    second = ProductFactory(sku="SKU-B", brand="Acme", price=Decimal("5.00"))
+    client = APIClient()
+    client.get(reverse("products-detail", args=[first.sku]))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report = update_products(
+            [
+                {"sku": "SKU-A", "price": "30.00"},
+                {"sku": "SKU-B", "name": second.name, "brand": "Zeta"},
+                {"sku": "MISSING", "price": "1.00"},
+                {"sku": "SKU-A", "price": "-"},
+            ]
+        ).as_dict()
+
+    assert report["updated"] == 2
+    assert report["results"][:3] == [
+        {"sku": "SKU-A", "status": "updated", "changed_fields": ["price"]},
+        {"sku": "SKU-B", "status": "updated", "changed_fields": ["brand"]},
+        {"sku": "MISSING", "status": "error", "errors": {"sku": ["Not found."]}},
+    ]
+    modified = first.modified
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.price, first.brand) == (Decimal("30.00"), "Acme")
+    assert second.brand == "Zeta"
+    assert first.modified > modified
+    event = ProductChangeEvent.objects.get()
+    assert event.changes == {"SKU-A": ["price"], "SKU-B": ["brand"]}
+    assert facet_counts()[("Acme", 25)] == 1
+    assert facet_counts()[("Zeta", 0)] == 1
+    cached = client.get(reverse("products-detail", args=[first.sku]))
+    assert cached.data["price"] == "30.00"
+
+
+def test_update_products_skips_unchanged_products(
+    mocker, django_capture_on_commit_callbacks
+):
+    """
+    Test that products whose values are unchanged are neither written, notified nor
+    invalidated.
+
+    @param mocker: The pytest-mock mocker fixture.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    product = ProductFactory(sku="SKU-A", price=Decimal("5.00"))
+    invalidate = mocker.patch("store.batches.product_cache.invalidate")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report = update_products(
+            [{"sku": "SKU-A", "name": product.name, "price": "5.00"}]
+        ).as_dict()
+
+    assert (report["updated"], report["unchanged"]) == (0, 1)
+    assert report["results"] == [
+        {"sku": "SKU-A", "status": "unchanged", "changed_fields": []}
+    ]
+    modified = product.modified
+    product.refresh_from_db()
+    assert product.modified == modified
+    assert not ProductChangeEvent.objects.exists()
+    invalidate.assert_not_called()
+
+
+def test_update_products_query_count():
+    """
+    Test that the number of queries of a batch update does not grow with its size.
+    """
+    products = ProductFactory.create_batch(30)
+
+    def queries(batch):
+        with CaptureQueriesContext(connection) as context:
+            update_products(
+                [{"sku": product.sku, "name": "Renamed"} for product in batch]
+            )
+        return len(context.captured_queries)
+
+    assert queries(products[:3]) == queries(products[3:])
+
+
+def test_delete_products_cascades(facet_counts):
+    """
+    Test that a batch delete removes the products and the rows referencing them, and
+    reports the missing SKUs.
+
+    @param facet_counts: The facet counts fixture.
+    """
+    products = ProductFactory.create_batch(3, brand="Acme", price=Decimal("5.00"))
+    ProductStats.objects.create(product=products[0], view_count=3)
+    ProductViewsHourly.objects.create(
+        product=products[1], hour=timezone.now().replace(minute=0, second=0), views=2
+    )
+
+    report = delete_products(
+        [{"sku": products[0].sku}, {"sku": "MISSING"}, {"sku": products[1].sku}]
+    ).as_dict()
+
+    assert (report["deleted"], report["failed"]) == (2, 1)
+    assert report["results"][1] == {
+        "sku": "MISSING",
+        "status": "error",
+        "errors": {"sku": ["Not found."]},
+    }
+    assert list(Product.objects.values_list("sku", flat=True)) == [products[2].sku]
+    assert not ProductStats.objects.exists()
+    assert not ProductViewsHourly.objects.exists()
+    assert facet_counts() == {("Acme", 0): 1}
+    assert ProductChangeEvent.objects.get().changes == {
+        products[0].sku: [],
+        products[1].sku: [],
+    }
+
+
+def test_batch_api(client, admin):
+    """
+    Test that the batch endpoint dispatches on the HTTP method.
+    """
+    url = reverse("products-batch")
+
+    response = client.post(url, [item("NEW-1"), item("NEW-2")], format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["created"] == 2
+
+    response = client.patch(url, [{"sku": "NEW-1", "price": "12.5"}], format="json")
+    assert response.data["updated"] == 1
+    assert Product.objects.get(sku="NEW-1").price == Decimal("12.50")
+
+    response = client.delete(url, [{"sku": "NEW-1"}, {"sku": "NEW-2"}], format="json")
+    assert response.data["deleted"] == 2
+    assert not Product.objects.exists()
+
+
+@pytest.mark.parametrize("data", [[], {"sku": "NEW-1"}, ["NEW-1"]])
+def test_batch_api_rejects_malformed_body(client, admin, data):
+    """
+    Test that the body must be a non-empty array of objects.
+    """
+    response = client.post(reverse("products-batch"), data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_batch_api_requires_admin(client):
+    """
+    Test that only product admins can write batches.
+    """
+    response = client.post(reverse("products-batch"), [item("NEW-1")], format="json")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
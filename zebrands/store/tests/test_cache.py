@@ -0,0 +1,170 @@
+import time
+
+from django.core.management import call_command
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store.cache import LocalLRUCache, product_cache
+from store.serializers import ProductSerializer
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_retrieve_product_is_cached(product, django_assert_num_queries):
+    """
+    Test that a product is only read from the database on the first retrieve, and that
+    following retrieves are served from the local tier.
+
+    @param product: The product to retrieve.
+    @param django_assert_num_queries: The pytest-django query counting fixture.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    expected = ProductSerializer(product).data
+
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+
+    assert first.data == second.data == expected
+    assert product_cache.stats == {"misses": 1, "local_hits": 1}
+
+
+def test_retrieve_product_from_shared_tier(product, django_assert_num_queries):
+    """
+    Test that a product cached by another process is served from the shared tier.
+
+    @param product: The product to retrieve.
+    @param django_assert_num_queries: The pytest-django query counting fixture.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    client.get(url)
+    # Simulate a different process, with an empty local tier.
+    product_cache.local.clear()
+
+    with django_assert_num_queries(0):
+        response = client.get(url)
+
+    assert response.data == ProductSerializer(product).data
+    assert product_cache.stats["shared_hits"] == 1
+
+
+def test_update_product_invalidates_cache(
+    client, product, mocker, django_capture_on_commit_callbacks
+):
+    """
+    Test that a product updated through the API is never served stale from the cache.
+
+    @param client: The authenticated test client.
+    @param product: The product to update.
+    @param mocker: The pytest-mock mocker fixture.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+    url = reverse("products-detail", args=(product.sku,))
+    APIClient().get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(url, data={"name": "new name"})
+    response = APIClient().get(url)
+
+    assert response.data["name"] == "new name"
+
+
+def test_delete_product_invalidates_cache(
+    client, product, mocker, django_capture_on_commit_callbacks
+):
+    """
+    Test that a deleted product is no longer served from the cache.
+
+    @param client: The authenticated test client.
+    @param product: The product to delete.
+    @param mocker: The pytest-mock mocker fixture.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+    url = reverse("products-detail", args=(product.sku,))
+    APIClient().get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.delete(url)
+    response = APIClient().get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_warm_product_cache(django_assert_num_queries):
+    """
+    Test that the warm_product_cache command fills the shared tier for every product.
+    """
+    products = ProductFactory.create_batch(3)
+    call_command("warm_product_cache", "--chunk-size", "2")
+    client = APIClient()
+
+    with django_assert_num_queries(0):
+        for product in products:
+            client.get(reverse("products-detail", args=(product.sku,)))
+
+    assert product_cache.stats == {"shared_hits": 3}
+
+
+def test_local_lru_cache_evicts_and_expires(mocker):
+    """
+    Test that the local tier evicts the least recently used entry and expires old entries.
+
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    monotonic = mocker.patch("store.cache.time.monotonic", return_value=0)
+    cache = LocalLRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert [cache.get("a"), cache.get("b"), cache.get("c")] == [1, None, 3]
+
+    monotonic.return_value = 11
+    assert cache.get("a") is None
+
+
+def test_renamed_product_old_sku_not_served(
+    client, product, mocker, django_capture_on_commit_callbacks
+):
+    """
+    Test that a product is no longer served from the cache under its previous SKU.
+
+    @param client: The authenticated test client.
+    @param product: The product to rename.
+    @param mocker: The pytest-mock mocker fixture.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+    url = reverse("products-detail", args=(product.sku,))
+    APIClient().get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(url, data={"sku": "RENAMED"})
+    response = APIClient().get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_unknown_sku_versions_expire(settings, mocker):
+    """
+    Test that the cache versions of SKUs that do not exist expire with the cache entries.
+
+    @param settings: The pytest-django settings fixture.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    settings.PRODUCT_CACHE_TIMEOUT = 60
+    response = APIClient().get(reverse("products-detail", args=("UNKNOWN",)))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert product_cache.shared.get("product:version:UNKNOWN") is not None
+
+    mocker.patch("time.time", return_value=time.time() + 61)
+
+    assert product_cache.shared.get("product:version:UNKNOWN") is None
@@ -0,0 +1,109 @@
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store.rollups import current_hour
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_retrieve_product_if_none_match(product, redis, django_assert_num_queries):
+    """
+    Test that a retrieve with a current ETag returns 304 without querying the database, and
+    still counts the anonymous view.
+
+    @param product: The product to retrieve.
+    @param redis: The in-memory Redis connection.
+    @param django_assert_num_queries: The pytest-django query counting fixture.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    first = client.get(url)
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == first["ETag"]
+    assert not response.content
+    field = f"{product.pk}:{current_hour()}"
+    assert redis.hget("store:views:pending", field) == b"2"
+
+
+def test_retrieve_product_if_modified_since(product):
+    """
+    Test that a retrieve with a current If-Modified-Since date returns 304.
+
+    @param product: The product to retrieve.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    first = client.get(url)
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_retrieve_product_etag_changes_on_save(
+    product, django_capture_on_commit_callbacks
+):
+    """
+    Test that saving a product, e.g. from the Django admin, changes its ETag.
+
+    @param product: The product to retrieve.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    first = client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name = "new name"
+        product.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != first["ETag"]
+    assert response.data["name"] == "new name"
+
+
+def test_list_products_if_none_match(django_assert_num_queries):
+    """
+    Test that a list request with a current ETag returns 304 without querying products.
+
+    @param django_assert_num_queries: The pytest-django query counting fixture.
+    """
+    ProductFactory.create_batch(3)
+    client = APIClient()
+    first = client.get(reverse("products-list"))
+
+    with django_assert_num_queries(0):
+        response = client.get(
+            reverse("products-list"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert "Last-Modified" in first
+
+
+def test_list_products_etag_changes(django_capture_on_commit_callbacks):
+    """
+    Test that the list ETag depends on the requested page and changes on catalog writes.
+
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    ProductFactory.create_batch(3)
+    client = APIClient()
+    first = client.get(reverse("products-list"))
+    other_page = client.get(reverse("products-list"), {"page_size": 1})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ProductFactory()
+    response = client.get(reverse("products-list"), HTTP_IF_NONE_MATCH=first["ETag"])
+
+    assert other_page["ETag"] != first["ETag"]
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 4
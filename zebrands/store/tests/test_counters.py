@@ -0,0 +1,120 @@
+from django.urls import reverse
+
+import pytest
+from rest_framework.test import APIClient
+from store import counters
+from store.models import ProductStats, ViewCounterBatch
+from store.rollups import current_hour
+from store.tasks import flush_view_counters, product_update_counter
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_anonymous_views_are_buffered(product, redis):
+    """
+    Test that anonymous retrieves only accumulate increments in Redis, without touching
+    ProductStats until the counters are flushed.
+
+    @param product: The product to retrieve.
+    @param redis: The in-memory Redis connection.
+    """
+    client = APIClient()
+    for _ in range(3):
+        client.get(reverse("products-detail", args=(product.sku,)))
+
+    field = f"{product.pk}:{current_hour()}"
+    assert redis.hget("store:views:pending", field) == b"3"
+    assert not ProductStats.objects.filter(product=product).exists()
+
+
+def test_flush_updates_and_creates_stats(product_stats):
+    """
+    Test that a flush adds the buffered views to existing stats rows and creates the missing
+    ones.
+
+    @param product_stats: A product with an existing ProductStats row.
+    """
+    initial = product_stats.view_count
+    new_product = ProductFactory()
+    for _ in range(2):
+        counters.record_view(product_stats.product_id)
+    counters.record_view(new_product.pk)
+
+    assert flush_view_counters() == 3
+
+    product_stats.refresh_from_db()
+    assert product_stats.view_count == initial + 2
+    assert new_product.stats.view_count == 1
+
+
+def test_flush_ignores_deleted_products(product):
+    """
+    Test that views buffered for a product deleted before the flush are dropped.
+
+    @param product: The product to view and delete.
+    """
+    counters.record_view(product.pk)
+    product.delete()
+
+    counters.flush()
+
+    assert not ProductStats.objects.exists()
+
+
+def test_flush_applies_batch_exactly_once(product_stats, redis):
+    """
+    Test that a batch left in Redis by a flush that committed but did not clean up is not
+    counted a second time.
+
+    @param product_stats: A product with an existing ProductStats row.
+    @param redis: The in-memory Redis connection.
+    """
+    initial = product_stats.view_count
+    counters.record_view(product_stats.product_id)
+    batch_id = counters.hand_off()
+    # Simulate a flush that died right after committing the batch.
+    ViewCounterBatch.objects.create(batch_id=batch_id)
+
+    assert counters.flush() == 0
+
+    product_stats.refresh_from_db()
+    assert product_stats.view_count == initial
+    assert not redis.smembers("store:views:batches")
+
+
+def test_views_recorded_during_flush_are_kept(product_stats, mocker):
+    """
+    Test that increments recorded after the hand-off are kept for the next flush.
+
+    @param product_stats: A product with an existing ProductStats row.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    initial = product_stats.view_count
+    apply_view_deltas = counters.apply_view_deltas
+
+    def record_while_applying(deltas):
+        counters.record_view(product_stats.product_id)
+        apply_view_deltas(deltas)
+
+    counters.record_view(product_stats.product_id)
+    mocker.patch("store.counters.apply_view_deltas", side_effect=record_while_applying)
+    counters.flush()
+    mocker.stopall()
+    counters.flush()
+
+    product_stats.refresh_from_db()
+    assert product_stats.view_count == initial + 2
+
+
+def test_product_update_counter_buffers_view(product, redis):
+    """
+    Test that the legacy product_update_counter task feeds the buffered counters.
+
+    @param product: The viewed product.
+    @param redis: The in-memory Redis connection.
+    """
+    product_update_counter(product.sku)
+
+    field = f"{product.pk}:{current_hour()}"
+    assert redis.hget("store:views:pending", field) == b"1"
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+from store.delivery import DeliveryEngine, SendGridTransport, TransportResponse
+from store.fake_sendgrid import FakeSendGridServer
+
+from zebrands.redis import TokenBucket
+
+PAYLOAD = {"personalizations": [{"to": [{"email": "admin@example.com"}]}]}
+
+
+@pytest.fixture()
+def server():
+    """
+    Fixture to run a fake SendGrid server on a free local port.
+    """
+    server = FakeSendGridServer(retry_after=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def engine_for(server, **kwargs):
+    transport = SendGridTransport(server.url, api_key="test", timeout=5)
+    return DeliveryEngine(transport, backoff=0.001, **{"max_retries": 3, **kwargs})
+
+
+def test_send_retries_transient_failures(server):
+    """
+    Test that rate limited and failed requests are retried until accepted.
+
+    @param server: The fake SendGrid server.
+    """
+    server.outcomes.extend([429, 503])
+
+    result = engine_for(server).send(PAYLOAD)
+
+    assert result.ok
+    assert result.attempts == 3
+    assert server.accepted == [PAYLOAD]
+
+
+def test_send_gives_up_after_max_retries(server):
+    """
+    Test that a message is reported as failed once its retries are exhausted.
+
+    @param server: The fake SendGrid server.
+    """
+    server.outcomes.extend([500] * 10)
+
+    result = engine_for(server, max_retries=2).send(PAYLOAD)
+
+    assert not result.ok
+    assert result.status == 500
+    assert result.attempts == 3
+    assert server.requests == 3
+
+
+def test_send_does_not_retry_client_errors(server):
+    """
+    Test that rejected messages are not retried.
+
+    @param server: The fake SendGrid server.
+    """
+    server.outcomes.append(400)
+
+    result = engine_for(server).send(PAYLOAD)
+
+    assert result.status == 400
+    assert result.attempts == 1
+
+
+def test_send_many_reuses_connections_concurrently(server):
+    """
+    Test that messages are sent concurrently over at most one connection per sending
+    thread.
+
+    @param server: The fake SendGrid server.
+    """
+    server.latency = 0.1
+    engine = engine_for(server, max_concurrency=8)
+
+    start = time.perf_counter()
+    results = engine.send_many([PAYLOAD] * 16)
+    elapsed = time.perf_counter() - start
+
+    assert all(result.ok for result in results)
+    assert elapsed < 1.0
+    assert server.connections <= 8
+
+
+def test_token_bucket_allows_bursts_then_limits_rate():
+    """
+    Test that a token bucket hands out its burst right away, then one token per 1/rate
+    seconds, reserved in order.
+    """
+    bucket = TokenBucket("test:rate", rate=10, burst=3)
+
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3] == pytest.approx(0.1, abs=0.02)
+    assert waits[4] == pytest.approx(0.2, abs=0.02)
+    assert TokenBucket("test:other", rate=10).reserve() == 0
+
+
+def test_send_waits_for_rate_limiter(server):
+    """
+    Test that every attempt, retries included, takes a token of the rate limiter.
+
+    @param server: The fake SendGrid server.
+    """
+    server.outcomes.append(429)
+    engine = engine_for(server, rate_limiter=TokenBucket("test:rate", rate=20))
+
+    start = time.perf_counter()
+    results = engine.send_many([PAYLOAD] * 2)
+    elapsed = time.perf_counter() - start
+
+    assert all(result.ok for result in results)
+    assert server.requests == 3
+    assert elapsed >= 0.09
+
+
+def test_delay_ignores_malformed_retry_after():
+    """
+    Test that a malformed Retry-After header falls back to the exponential backoff, and
+    that a date in the past does not wait.
+    """
+    engine = DeliveryEngine(None, backoff=1, max_backoff=30)
+
+    for value in ("garbage", "Mon, 99 Foo 20xx", "nan"):
+        delay = engine.delay(2, TransportResponse(429, {"Retry-After": value}, b""))
+        assert 1 <= delay <= 3
+    past = TransportResponse(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, b"")
+    assert engine.delay(1, past) == 0
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from store import endpoint_benchmarks
+
+
+@pytest.mark.django_db
+def test_endpoints_within_query_budgets():
+    """
+    Test that every endpoint runs without errors and within its query budget.
+
+    Latency, throughput and memory depend on the machine, they are only compared by
+    `benchmark_endpoints --compare`.
+    """
+    results = endpoint_benchmarks.run(products=30, requests=2, profiled=2, warmup=1)
+    budgets = json.loads(endpoint_benchmarks.BUDGETS_PATH.read_text())
+
+    assert set(results["endpoints"]) == set(budgets)
+    assert (
+        endpoint_benchmarks.compare(results, budgets, metrics=("queries", "errors"))
+        == []
+    )
+
+
+def test_compare():
+    """
+    Test that compare reports the metrics over their budget and the throughput below it.
+    """
+    results = {
+        "endpoints": {
+            "product-list": {"queries": 2, "p95_ms": 10.0, "requests_per_second": 50},
+            "product-retrieve": {"queries": 1, "requests_per_second": 500},
+        }
+    }
+    budgets = {
+        "product-list": {"queries": 1, "p95_ms": 20, "requests_per_second": 100},
+        "product-retrieve": {"queries": 1, "requests_per_second": 100},
+        "user-create": {"queries": 4},
+    }
+
+    assert endpoint_benchmarks.compare(results, budgets) == [
+        "product-list: queries 2 over 1",
+        "product-list: requests_per_second 50 below 100",
+    ]
+    assert endpoint_benchmarks.compare(results, budgets, metrics=("p95_ms",)) == []
@@ -0,0 +1,150 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+from rest_framework import status
+from store.exporters import EXPORT_FIELDS, accepts_gzip, export_products
+from store.importers import import_products
+from store.models import Product
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def content(response):
+    return b"".join(response.streaming_content)
+
+
+def test_export_products_jsonl():
+    """
+    Test that the JSON Lines export writes one object per product, in primary key order,
+    with prices as decimal strings, across several chunks.
+    """
+    products = ProductFactory.create_batch(5)
+
+    lines = b"".join(export_products("jsonl", chunk_size=2)).splitlines()
+
+    rows = [json.loads(line) for line in lines]
+    assert [row["sku"] for row in rows] == [product.sku for product in products]
+    assert rows[0] == {
+        "sku": products[0].sku,
+        "name": products[0].name,
+        "price": f"{products[0].price:.2f}",
+        "brand": products[0].brand,
+        "modified": products[0].modified.isoformat().replace("+00:00", "Z"),
+    }
+
+
+def test_export_products_csv_round_trip():
+    """
+    Test that a CSV export can be imported back without changes.
+    """
+    products = ProductFactory.create_batch(3)
+
+    exported = b"".join(export_products("csv", chunk_size=2)).decode()
+
+    rows = list(csv.DictReader(io.StringIO(exported)))
+    assert tuple(rows[0]) == EXPORT_FIELDS
+    assert [row["sku"] for row in rows] == [product.sku for product in products]
+    report = import_products(io.StringIO(exported), "csv", notify=False)
+    assert (report.rows, report.updated, report.failed) == (3, 3, 0)
+    assert Product.objects.count() == 3
+
+
+def test_export_products_since():
+    """
+    Test that incremental exports only include the products modified since the given time.
+    """
+    old, recent = ProductFactory.create_batch(2)
+    since = timezone.now() - timedelta(hours=1)
+    Product.objects.filter(pk=old.pk).update(modified=since - timedelta(minutes=1))
+
+    lines = b"".join(export_products("jsonl", since=since)).splitlines()
+
+    assert [json.loads(line)["sku"] for line in lines] == [recent.sku]
+
+
+def test_export_products_api(client, admin):
+    """
+    Test that the export endpoint streams an attachment in the requested format.
+    """
+    product = ProductFactory()
+
+    response = client.get(reverse("products-export-products"), {"file_format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert response["Content-Disposition"].startswith('attachment; filename="products-')
+    assert response["Content-Disposition"].endswith('.csv"')
+    rows = list(csv.DictReader(io.StringIO(content(response).decode())))
+    assert [row["sku"] for row in rows] == [product.sku]
+
+
+def test_export_products_api_gzip(client, admin):
+    """
+    Test that the export is gzip compressed on the fly when the client accepts it.
+    """
+    products = ProductFactory.create_batch(3)
+
+    response = client.get(
+        reverse("products-export-products"), HTTP_ACCEPT_ENCODING="gzip, deflate"
+    )
+
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    lines = gzip.decompress(content(response)).splitlines()
+    assert [json.loads(line)["sku"] for line in lines] == [p.sku for p in products]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding",
+    ["gzip;q=0", "br, deflate", "notgzip", "identity, *;q=0", "gzip;q=0, *"],
+)
+def test_export_products_api_without_gzip(client, admin, accept_encoding):
+    """
+    Test that the export is not compressed for clients that refuse or do not list gzip.
+    """
+    ProductFactory()
+
+    response = client.get(
+        reverse("products-export-products"), HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+
+    assert not response.has_header("Content-Encoding")
+    assert "Accept-Encoding" in response["Vary"]
+    assert json.loads(content(response).splitlines()[0])
+
+
+@pytest.mark.parametrize(
+    "accept_encoding", ["GZIP", "deflate, gzip;q=0.5", "br;q=1, *;q=0.1", "x-gzip"]
+)
+def test_accepts_gzip(accept_encoding):
+    """
+    Test that gzip is accepted when listed or covered by '*' with a non-zero quality.
+    """
+    assert accepts_gzip(accept_encoding)
+
+
+def test_export_products_api_requires_admin(client):
+    """
+    Test that only product admins can export the catalog.
+    """
+    response = client.get(reverse("products-export-products"))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_export_products_api_invalid_since(client, admin):
+    """
+    Test that an invalid 'since' parameter is rejected.
+    """
+    response = client.get(reverse("products-export-products"), {"since": "yesterday"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,121 @@
+import io
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+from rest_framework.test import APIClient
+from store import facets, importers
+from store.importers import import_products
+from store.models import Product
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_facets_follow_product_changes(facet_counts):
+    """
+    Test that creating, updating and deleting products moves them between facets.
+
+    @param facet_counts: The facet counts fixture.
+    """
+    first = ProductFactory(brand="Acme", price=Decimal("5.00"))
+    second = ProductFactory(brand="Acme", price=Decimal("30.00"))
+    assert facet_counts() == {("Acme", 0): 1, ("Acme", 25): 1}
+
+    first.price = Decimal("40.00")
+    first.save()
+    second.brand = "Zeta"
+    second.save()
+    assert facet_counts() == {("Acme", 25): 1, ("Zeta", 25): 1}
+
+    first.delete()
+    assert facet_counts() == {("Zeta", 25): 1}
+    assert facets.rebuild() == 1
+    assert facet_counts() == {("Zeta", 25): 1}
+
+
+def test_import_moves_facets(facet_counts):
+    """
+    Test that imported rows, which are written without signals, update the facets.
+
+    @param facet_counts: The facet counts fixture.
+    """
+    ProductFactory(sku="SKU-1", brand="Acme", price=Decimal("5.00"))
+    stream = io.StringIO(
+        "sku,name,price,brand\nSKU-1,Mug,12.00,Acme\nSKU-2,Cup,3.00,Zeta\n"
+    )
+
+    import_products(stream, "csv", notify=False)
+
+    assert facet_counts() == {("Acme", 10): 1, ("Zeta", 0): 1}
+
+
+def test_import_updates_products_created_concurrently(mocker, facet_counts):
+    """
+    Test that a product created by another writer after the import locked the existing
+    ones is updated, and moved out of its facet, instead of failing the chunk.
+
+    @param mocker: The pytest-mock mocker fixture.
+    @param facet_counts: The facet counts fixture.
+    """
+    lock_existing = importers._lock_existing
+
+    def create_concurrently(skus):
+        locked = lock_existing(skus)
+        if not Product.objects.filter(sku="RACE-1").exists():
+            ProductFactory(sku="RACE-1", brand="Acme", price=Decimal("5.00"))
+        return locked
+
+    mocker.patch("store.importers._lock_existing", side_effect=create_concurrently)
+    stream = io.StringIO("sku,name,price,brand\nRACE-1,Mug,30.00,Zeta\n")
+
+    report = import_products(stream, "csv", notify=False)
+
+    assert (report.created, report.updated) == (0, 1)
+    assert Product.objects.get(sku="RACE-1").brand == "Zeta"
+    assert facet_counts() == {("Zeta", 25): 1}
+
+
+def test_list_filters_by_brand_and_price():
+    """
+    Test that the product list can be filtered by brands and a price range.
+    """
+    ProductFactory(sku="A-1", brand="Acme", price=Decimal("5.00"))
+    ProductFactory(sku="A-2", brand="Acme", price=Decimal("50.00"))
+    ProductFactory(sku="B-1", brand="Beta", price=Decimal("20.00"))
+    ProductFactory(sku="C-1", brand="Ceta", price=Decimal("20.00"))
+    url = reverse("products-list")
+
+    response = APIClient().get(
+        url, {"brand": ["Acme", "Beta"], "price_min": "10", "price_max": "60"}
+    )
+
+    assert [product["sku"] for product in response.data["results"]] == ["A-2", "B-1"]
+    assert APIClient().get(url, {"price_min": "abc"}).status_code == 400
+
+
+def test_facets_endpoint_reads_counts_only():
+    """
+    Test that the facets are served from the facet counts, without querying products.
+    """
+    ProductFactory(brand="Acme", price=Decimal("5.00"))
+    ProductFactory(brand="Acme", price=Decimal("7000.00"))
+    ProductFactory(brand="Beta", price=Decimal("5.00"))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(reverse("products-facets"), {"brand": "Acme"})
+
+    assert not any('"store_product"' in query["sql"] for query in queries)
+    assert response.data["brands"] == [
+        {"brand": "Acme", "count": 2},
+        {"brand": "Beta", "count": 1},
+    ]
+    prices = {
+        bucket["price_min"]: bucket["count"] for bucket in response.data["prices"]
+    }
+    assert prices[0] == 1 and prices[5000] == 1 and sum(prices.values()) == 2
+    assert response.data["prices"][-1]["price_max"] is None
+    assert response["ETag"]
@@ -0,0 +1,203 @@
+import csv
+import io
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store.importers import UnreadableImportFile, import_products
+from store.models import Product, ProductChangeEvent
+
+pytestmark = pytest.mark.django_db
+
+CSV = """sku,name,price,brand
+NEW-1,New one,10.50,Acme
+{sku},Renamed,99.99,Acme
+BAD-1,Bad price,not a price,Acme
+NEW-2,New two,5,Acme
+"""
+
+
+def import_summaries():
+    """
+    Returns the import summaries recorded in the outbox.
+    """
+    return list(
+        ProductChangeEvent.objects.filter(summary__isnull=False).values_list(
+            "summary", flat=True
+        )
+    )
+
+
+def test_import_products_csv(product, django_capture_on_commit_callbacks):
+    """
+    Test that a CSV import creates new products, updates existing ones by SKU, reports invalid
+    rows and records a single summary notification in the outbox.
+
+    @param product: An existing product, updated by the import.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    stream = io.StringIO(CSV.format(sku=product.sku))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report = import_products(stream, "csv", chunk_size=2)
+
+    assert (report.rows, report.created, report.updated, report.failed) == (4, 2, 1, 1)
+    assert report.errors == [
+        {"row": 3, "errors": {"price": ["A valid number is required."]}}
+    ]
+    product.refresh_from_db()
+    assert (product.name, product.price) == ("Renamed", Decimal("99.99"))
+    assert Product.objects.get(sku="NEW-2").price == Decimal("5.00")
+    assert import_summaries() == [report.summary()]
+
+
+def test_import_products_jsonl():
+    """
+    Test that a JSON Lines import reports malformed lines and keeps the last row of a
+    repeated SKU.
+
+    """
+    stream = io.StringIO(
+        '{"sku": "J-1", "name": "First", "price": "1.00", "brand": "Acme"}\n'
+        "{not json\n"
+        '{"sku": "J-1", "name": "Last", "price": "2.00", "brand": "Acme"}\n'
+    )
+
+    report = import_products(stream, "jsonl")
+
+    assert (report.created, report.failed) == (1, 1)
+    assert report.errors[0]["row"] == 2
+    assert Product.objects.get(sku="J-1").name == "Last"
+
+
+def test_import_products_without_changes_does_not_notify():
+    """
+    Test that an import that writes nothing does not notify the admins.
+
+    """
+    import_products(io.StringIO("sku,name,price,brand\n"), "csv")
+
+    assert not import_summaries()
+
+
+def test_import_products_api(client, product, admin):
+    """
+    Test that a product admin can upload a catalog file and gets the import report.
+
+    @param client: The authenticated test client.
+    @param product: An existing product, updated by the import.
+    @param admin: The product admin permission fixture.
+    """
+    upload = SimpleUploadedFile("catalog.csv", CSV.format(sku=product.sku).encode())
+
+    response = client.post(
+        reverse("products-import-products"), {"file": upload}, format="multipart"
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert (response.data["created"], response.data["updated"]) == (2, 1)
+    assert response.data["errors"][0]["row"] == 3
+    assert "rows_per_second" in response.data
+
+
+def test_import_products_api_requires_admin(client):
+    """
+    Test that users outside the product admin group cannot import products.
+
+    @param client: The authenticated test client.
+    """
+    upload = SimpleUploadedFile("catalog.csv", b"sku,name,price,brand\n")
+
+    response = client.post(
+        reverse("products-import-products"), {"file": upload}, format="multipart"
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_import_products_command(tmp_path):
+    """
+    Test the import_products management command.
+
+    @param tmp_path: The pytest temporary directory fixture.
+    """
+    path = tmp_path / "catalog.jsonl"
+    path.write_text('{"sku": "C-1", "name": "One", "price": "1.00", "brand": "Acme"}\n')
+    stdout = io.StringIO()
+
+    call_command("import_products", str(path), "--no-notify", stdout=stdout)
+
+    assert Product.objects.filter(sku="C-1").exists()
+    assert "1 created" in stdout.getvalue()
+    assert not import_summaries()
+
+
+def test_import_products_invalidates_cache(product, django_capture_on_commit_callbacks):
+    """
+    Test that products updated by an import are not served stale from the product cache.
+
+    @param product: An existing product, updated by the import.
+    @param django_capture_on_commit_callbacks: The pytest-django on_commit fixture.
+    """
+    client = APIClient()
+    url = reverse("products-detail", args=(product.sku,))
+    client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        import_products(io.StringIO(CSV.format(sku=product.sku)), "csv")
+
+    assert client.get(url).data["name"] == "Renamed"
+
+
+def test_import_products_api_rejects_unreadable_files(client, admin):
+    """
+    Test that an uploaded file that is not UTF-8 text is rejected.
+
+    @param client: The authenticated test client.
+    @param admin: The product admin permission fixture.
+    """
+    upload = SimpleUploadedFile(
+        "catalog.csv", "sku,name,price,brand\nÑ-1".encode("latin-1")
+    )
+
+    response = client.post(
+        reverse("products-import-products"), {"file": upload}, format="multipart"
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "file" in response.data
+
+
+def test_import_products_command_rejects_unreadable_files(tmp_path):
+    """
+    Test that the import_products command fails cleanly on a file that is not UTF-8 text.
+
+    @param tmp_path: The pytest temporary directory fixture.
+    """
+    path = tmp_path / "catalog.csv"
+    path.write_bytes("sku,name,price,brand\nÑ-1,One,1.00,Acme\n".encode("latin-1"))
+
+    with pytest.raises(CommandError, match="Cannot read"):
+        call_command("import_products", str(path), "--no-notify")
+
+
+def test_import_products_reports_rows_before_invalid_csv():
+    """
+    Test that the chunks read before a malformed CSV row are imported and notified.
+    """
+    stream = io.StringIO(
+        "sku,name,price,brand\nOK-1,One,1.00,Acme\nBAD-1,%s,1.00,Acme\n"
+        % ("x" * (csv.field_size_limit() + 1))
+    )
+
+    with pytest.raises(UnreadableImportFile) as raised:
+        import_products(stream, "csv", chunk_size=1)
+
+    assert raised.value.report.created == 1
+    assert Product.objects.filter(sku="OK-1").exists()
+    assert import_summaries() == [raised.value.report.summary()]
@@ -0,0 +1,143 @@
+import time
+
+from django.urls import reverse
+
+import pytest
+from prometheus_client import REGISTRY, Counter, values
+from rest_framework.test import APIClient
+from store.tests.factories import ProductFactory
+from store.tests.test_async_views import asgi_get
+
+from zebrands import metrics
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(name, **labels):
+    """
+    Returns the value of a sample of the default registry, flushing the pending requests.
+    """
+    metrics.flush_requests()
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics():
+    """
+    Test that requests are recorded by URL name, method and status, with their size and
+    database queries.
+    """
+    product = ProductFactory()
+    labels = {"view": "products-detail", "method": "GET", "status": "200"}
+    count = sample("http_request_duration_seconds_count", **labels)
+    queries = sample("http_request_db_queries_sum", view="products-detail")
+    size = sample("http_response_size_bytes_sum", view="products-detail")
+    misses = sample(
+        "cache_requests_total", view="products-detail", cache="product", result="misses"
+    )
+
+    response = APIClient().get(reverse("products-detail", args=[product.sku]))
+    APIClient().get(reverse("products-detail", args=["MISSING"]))
+
+    assert sample("http_request_duration_seconds_count", **labels) == count + 1
+    assert sample("http_request_db_queries_sum", view="products-detail") == queries + 2
+    assert sample("http_response_size_bytes_sum", view="products-detail") == size + len(
+        response.content
+    ) + len(b'{"detail":"Not found."}')
+    assert (
+        sample(
+            "cache_requests_total",
+            view="products-detail",
+            cache="product",
+            result="misses",
+        )
+        == misses + 2
+    )
+    assert sample(
+        "http_request_duration_seconds_count",
+        view="products-detail",
+        method="GET",
+        status="404",
+    )
+
+
+def test_async_request_metrics():
+    """
+    Test that the queries run by async views in another thread are recorded.
+    """
+    product = ProductFactory()
+    queries = sample("http_request_db_queries_sum", view="products-detail")
+
+    assert asgi_get(reverse("products-detail", args=[product.sku])).status_code == 200
+    assert sample("http_request_db_queries_sum", view="products-detail") == queries + 1
+
+
+def test_metrics_endpoint():
+    """
+    Test that /metrics exposes the metrics in the Prometheus text format.
+    """
+    APIClient().get(reverse("products-list"))
+
+    response = APIClient().get(reverse("metrics"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{method="GET",status="200",'
+        'view="products-list"}' in response.content.decode()
+    )
+
+
+def test_idle_worker_flushes_requests(settings):
+    """
+    Test that the pending requests are added to the metrics without further requests.
+    """
+    settings.METRICS_FLUSH_INTERVAL = 0.05
+    labels = {"view": "products-list", "method": "GET", "status": "200"}
+    metrics.flush_requests()
+    count = (
+        REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+    )
+
+    APIClient().get(reverse("products-list"))
+    time.sleep(0.2)
+
+    assert (
+        REGISTRY.get_sample_value("http_request_duration_seconds_count", labels)
+        == count + 1
+    )
+
+
+def test_metrics_endpoint_is_restricted(settings):
+    """
+    Test that /metrics only answers the allowed networks and the holders of the token.
+    """
+    settings.METRICS_ALLOWED_NETWORKS = ["10.6.0.0/24"]
+    settings.METRICS_TOKEN = "scraper"
+    client = APIClient()
+
+    assert client.get(reverse("metrics")).status_code == 403
+    assert client.get(reverse("metrics"), REMOTE_ADDR="10.6.0.9").status_code == 200
+    assert (
+        client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code
+        == 403
+    )
+    assert (
+        client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scraper").status_code
+        == 200
+    )
+
+
+def test_metrics_endpoint_aggregates_workers(monkeypatch, tmp_path):
+    """
+    Test that in multiprocess mode /metrics adds up the samples of every worker.
+    """
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for pid, amount in ((1001, 2), (1002, 3)):
+        monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda: pid))
+        Counter(
+            "worker_test", "A counter incremented by two workers.", registry=None
+        ).inc(amount)
+
+    response = APIClient().get(reverse("metrics"))
+
+    assert "worker_test_total 5.0" in response.content.decode()
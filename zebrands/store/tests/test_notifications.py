@@ -0,0 +1,132 @@
+import pytest
+from store import notifications
+from store.tasks import flush_product_notifications, notify_product_changes
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def schedule(mocker):
+    """
+    Fixture to mock the scheduling of the notification window flush.
+    """
+    return mocker.patch("store.tasks.flush_product_notifications.apply_async")
+
+
+@pytest.fixture()
+def notify_admins(mocker):
+    """
+    Fixture to mock the delivery of notifications to the product admins.
+    """
+    return mocker.patch("store.tasks.notify_product_admins", return_value={})
+
+
+def test_changes_are_coalesced_per_window(schedule):
+    """
+    Test that only the first change of a window schedules a flush, and that repeated changes
+    of a SKU are collapsed.
+
+    @param schedule: The mocked flush scheduling.
+    """
+    for _ in range(20):
+        notify_product_changes({"SKU-1": ["price"]})
+    notify_product_changes({"SKU-1": ["name"], "SKU-2": []})
+
+    schedule.assert_called_once_with(countdown=60)
+    batch_id = notifications.hand_off()
+    assert notifications.read_batch(batch_id) == {
+        "SKU-1": {"price", "name"},
+        "SKU-2": set(),
+    }
+
+
+def test_hand_off_opens_a_new_window(schedule):
+    """
+    Test that the first change after a window was handed off schedules a new flush.
+
+    @param schedule: The mocked flush scheduling.
+    """
+    notify_product_changes({"SKU-1": ["price"]})
+    notifications.hand_off()
+    notify_product_changes({"SKU-1": ["price"]})
+
+    assert schedule.call_count == 2
+
+
+def test_flush_sends_a_single_digest(schedule, notify_admins, settings):
+    """
+    Test that a window with several products is notified with a single digest listing the
+    final state and changed fields of each product.
+
+    @param schedule: The mocked flush scheduling.
+    @param notify_admins: The mocked delivery to the product admins.
+    @param settings: The pytest-django settings fixture.
+    """
+    settings.PRODUCT_DIGEST_EMAIL_ID = "d-digest"
+    first, second = ProductFactory.create_batch(2)
+    for _ in range(5):
+        notify_product_changes({first.sku: ["price"]})
+    notify_product_changes({second.sku: ["name"], "DELETED": []})
+
+    flush_product_notifications()
+
+    notify_admins.assert_called_once()
+    template_id, template_data = notify_admins.call_args.args
+    assert template_id == "d-digest"
+    assert template_data["count"] == 3
+    assert template_data["products"][0] == {
+        "sku": "DELETED",
+        "name": None,
+        "brand": None,
+        "price": None,
+        "changed_fields": [],
+        "deleted": True,
+    }
+    assert template_data["products"][1] == {
+        "sku": first.sku,
+        "name": first.name,
+        "brand": first.brand,
+        "price": str(first.price),
+        "changed_fields": ["price"],
+        "deleted": False,
+    }
+    assert not notifications.pending_batches()
+
+
+def test_flush_single_product_uses_update_template(
+    product, schedule, notify_admins, settings
+):
+    """
+    Test that a window with a single product is notified with the product update template.
+
+    @param product: The changed product.
+    @param schedule: The mocked flush scheduling.
+    @param notify_admins: The mocked delivery to the product admins.
+    @param settings: The pytest-django settings fixture.
+    """
+    notify_product_changes({product.sku: ["price"]})
+
+    flush_product_notifications()
+
+    notify_admins.assert_called_once_with(
+        settings.PRODUCT_UPDATE_EMAIL_ID,
+        {"name": product.name, "brand": product.brand, "sku": product.sku},
+    )
+
+
+def test_flush_retries_interrupted_batches(product, schedule, notify_admins):
+    """
+    Test that a batch handed off by a flush that died before notifying is sent by the next
+    flush.
+
+    @param product: The changed product.
+    @param schedule: The mocked flush scheduling.
+    @param notify_admins: The mocked delivery to the product admins.
+    """
+    notify_product_changes({product.sku: ["price"]})
+    notifications.hand_off()
+
+    flush_product_notifications()
+
+    notify_admins.assert_called_once()
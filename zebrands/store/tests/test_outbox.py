@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+import pytest
+from store.models import ProductChangeEvent
+from store.outbox import record_import_summary, record_product_change, relay
+from store.serializers import ProductSerializer
+from store.tasks import product_change_notification, relay_product_change_events
+
+pytestmark = pytest.mark.django_db
+
+
+def test_rolled_back_update_records_no_event(product):
+    """
+    Test that a product change rolled back after the serializer update leaves no event.
+
+    @param product: The product to update.
+    """
+    serializer = ProductSerializer(product, data={"name": "new name"}, partial=True)
+    serializer.is_valid(raise_exception=True)
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            serializer.save()
+            raise RuntimeError()
+
+    assert not ProductChangeEvent.objects.exists()
+
+
+def test_relay_publishes_batches_and_marks_delivered(django_assert_num_queries):
+    """
+    Test that pending events are coalesced per SKU, published once per batch and marked
+    delivered with a single update.
+
+    @param django_assert_num_queries: The pytest-django query counting fixture.
+    """
+    record_product_change("SKU-1", ["name"])
+    record_product_change("SKU-2", ["price"])
+    record_product_change("SKU-1", ["brand"])
+    published = []
+
+    # Per batch: SAVEPOINT, SELECT ... FOR UPDATE, UPDATE (claim), RELEASE, UPDATE.
+    with django_assert_num_queries(5 * 2 + 1):
+        assert relay(published.append, None, batch_size=2) == 3
+
+    assert published == [
+        {"SKU-1": ["name"], "SKU-2": ["price"]},
+        {"SKU-1": ["brand"]},
+    ]
+    assert not ProductChangeEvent.objects.filter(delivered__isnull=True).exists()
+    assert relay(published.append, None) == 0
+    assert len(published) == 2
+
+
+def test_relay_keeps_events_when_publishing_fails():
+    """
+    Test that events whose publication fails stay pending for the next relay.
+    """
+    record_product_change("SKU-1", ["name"])
+
+    def fail(changes):
+        raise ConnectionError()
+
+    with pytest.raises(ConnectionError):
+        relay(fail, None)
+
+    assert (
+        ProductChangeEvent.objects.filter(
+            delivered__isnull=True, claimed__isnull=True
+        ).count()
+        == 1
+    )
+
+
+def test_relay_skips_claimed_events(settings):
+    """
+    Test that events claimed by an overlapping relay are not published again, until their
+    claim expires.
+
+    @param settings: The pytest-django settings fixture.
+    """
+    claimed = record_product_change("SKU-1", ["name"])
+    record_product_change("SKU-2", ["price"])
+    claimed_at = timezone.now() - timedelta(seconds=10)
+    ProductChangeEvent.objects.filter(pk=claimed.pk).update(claimed=claimed_at)
+    published = []
+
+    assert relay(published.append, None) == 1
+    assert published == [{"SKU-2": ["price"]}]
+
+    settings.PRODUCT_EVENT_CLAIM_SECONDS = 5
+    assert relay(published.append, None) == 1
+    assert published[-1] == {"SKU-1": ["name"]}
+    assert not ProductChangeEvent.objects.filter(delivered__isnull=True).exists()
+
+
+def test_relay_task_queues_digest(mocker):
+    """
+    Test that the relay task hands the events to the notification digest.
+
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    notify = mocker.patch("store.tasks.notify_product_changes")
+    record_product_change("SKU-1", ["price"])
+
+    assert relay_product_change_events() == 1
+    notify.assert_called_once_with({"SKU-1": ["price"]})
+
+
+def test_relay_task_queues_import_notification(mocker):
+    """
+    Test that the relay task queues the notification of an import summary, apart from the
+    product changes.
+
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    notify = mocker.patch("store.tasks.notify_product_changes")
+    notification = mocker.patch("store.tasks.product_import_notification.delay")
+    record_import_summary({"rows": 2, "created": 2})
+    record_product_change("SKU-1", ["price"])
+
+    assert relay_product_change_events() == 2
+    notification.assert_called_once_with({"rows": 2, "created": 2})
+    notify.assert_called_once_with({"SKU-1": ["price"]})
+    assert relay_product_change_events() == 0
+
+
+def test_legacy_change_notification_task_records_event(product):
+    """
+    Test that the legacy product_change_notification task, for messages enqueued before the
+    outbox, writes the change to the outbox.
+
+    @param product: The updated product.
+    """
+    product_change_notification(product.sku)
+
+    event = ProductChangeEvent.objects.get()
+    assert (event.changes, event.delivered) == ({product.sku: []}, None)
@@ -0,0 +1,86 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from store.serializers import ProductListSerializer, ProductSerializer
+from store.tests.factories import ProductFactory
+
+from zebrands.renderers import FastJSONRenderer
+
+DATA = {
+    "text": 'Café “olé” \u2028\u2029 ✓ "quoted" \\ \n',
+    "decimal": Decimal("1234.50"),
+    "integers": [0, -1, 2**63 - 1],
+    "floats": [0.1, 2.5, 1234.5678],
+    "datetime": datetime.datetime(
+        2023, 5, 1, 12, 30, 15, 123456, datetime.timezone.utc
+    ),
+    "naive": datetime.datetime(2023, 5, 1, 12, 30),
+    "date": datetime.date(2023, 5, 1),
+    "time": datetime.time(8, 15),
+    "timedelta": datetime.timedelta(minutes=90),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "lazy": _("Invalid token."),
+    "nested": {"empty": [], "none": None, "flags": (True, False), 1: "key"},
+}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        DATA,
+        {"big": 2**70},
+        [],
+        "",
+    ],
+)
+def test_fast_renderer_is_byte_compatible(data):
+    """
+    Test that FastJSONRenderer renders the same bytes as JSONRenderer.
+    """
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_fast_renderer_indent():
+    """
+    Test that indented output is left to JSONRenderer.
+    """
+    media_type = "application/json; indent=4"
+
+    rendered = FastJSONRenderer().render(DATA["nested"], media_type)
+
+    assert rendered == JSONRenderer().render(DATA["nested"], media_type)
+    assert b"\n    " in rendered
+
+
+@pytest.mark.django_db
+def test_list_and_detail_are_byte_compatible():
+    """
+    Test that the product list and detail responses match the serializers' output rendered
+    by JSONRenderer.
+    """
+    products = sorted(ProductFactory.create_batch(3), key=lambda product: product.sku)
+    products[0].name = "Café ✓ \u2028"
+    products[0].save()
+    client = APIClient()
+
+    response = client.get(reverse("products-list"), {"limit": 10})
+    assert response.content == JSONRenderer().render(
+        {
+            "count": 3,
+            "next": None,
+            "previous": None,
+            "results": ProductListSerializer(products, many=True).data,
+        }
+    )
+
+    response = client.get(reverse("products-detail", args=[products[0].sku]))
+    assert response.content == JSONRenderer().render(
+        ProductSerializer(products[0]).data
+    )
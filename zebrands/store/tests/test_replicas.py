@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+from rest_framework.test import APIClient
+from store.models import Product
+from store.tasks import product_import_notification
+from store.tests.factories import ProductFactory
+
+from zebrands import db
+
+# The router keeps the reads of transactions on the primary, tests must not run in one.
+pytestmark = pytest.mark.django_db(
+    transaction=True, databases=[DEFAULT_DB_ALIAS, "replica"]
+)
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings, monkeypatch):
+    """
+    Fixture to route reads to the 'replica' alias, with every replica healthy.
+    """
+    settings.REPLICA_DATABASES = ["replica"]
+    monkeypatch.setattr(db, "_down_until", {})
+
+
+def queried(call):
+    """
+    Returns the aliases queried by a call.
+    """
+    contexts = {
+        alias: CaptureQueriesContext(connections[alias])
+        for alias in (DEFAULT_DB_ALIAS, "replica")
+    }
+    for context in contexts.values():
+        context.__enter__()
+    try:
+        call()
+    finally:
+        for context in contexts.values():
+            context.__exit__(None, None, None)
+    return {alias for alias, context in contexts.items() if context.captured_queries}
+
+
+@contextmanager
+def lagging_replica():
+    """
+    Makes the 'replica' alias serve the products as they are when the block starts.
+    """
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("CREATE TABLE lagging_product AS SELECT * FROM store_product")
+
+    def lag(execute, sql, params, many, context):
+        sql = sql.replace('"store_product"', '"lagging_product"')
+        return execute(sql, params, many, context)
+
+    try:
+        with connections["replica"].execute_wrapper(lag):
+            yield
+    finally:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute("DROP TABLE lagging_product")
+
+
+def test_router_outside_scopes_uses_primary():
+    """
+    Test that queries outside replica_reads scopes go to the primary.
+    """
+    assert Product.objects.all().db == DEFAULT_DB_ALIAS
+    with db.replica_reads(enabled=False):
+        assert Product.objects.all().db == DEFAULT_DB_ALIAS
+
+
+def test_router_sticks_to_primary_after_write():
+    """
+    Test that a scope reads from a replica until it writes or opens a transaction.
+    """
+    with db.replica_reads() as state:
+        assert Product.objects.all().db == "replica"
+        with transaction.atomic():
+            assert Product.objects.all().db == DEFAULT_DB_ALIAS
+        assert Product.objects.all().db == "replica"
+        ProductFactory()
+        assert state.wrote
+        assert Product.objects.all().db == DEFAULT_DB_ALIAS
+
+
+def test_router_fails_over_to_primary(mocker):
+    """
+    Test that a replica that cannot connect is skipped for REPLICA_RETRY_SECONDS.
+    """
+    ensure_connection = mocker.patch.object(
+        connections["replica"], "ensure_connection", side_effect=OperationalError
+    )
+    with db.replica_reads():
+        assert Product.objects.all().db == DEFAULT_DB_ALIAS
+    with db.replica_reads():
+        assert Product.objects.all().db == DEFAULT_DB_ALIAS
+    assert ensure_connection.call_count == 1
+
+    db._down_until["replica"] = 0
+    ensure_connection.side_effect = None
+    with db.replica_reads():
+        assert Product.objects.all().db == "replica"
+
+
+def test_anonymous_reads_use_replica():
+    """
+    Test that the anonymous product list is read from a replica, and that the product cache
+    is filled from the primary.
+    """
+    product = ProductFactory()
+    client = APIClient()
+    url = reverse("products-detail", args=[product.sku])
+
+    assert queried(lambda: client.get(reverse("products-list"))) == {"replica"}
+    assert queried(lambda: client.get(url)) == {DEFAULT_DB_ALIAS}
+    assert queried(lambda: client.get(url)) == set()
+
+
+def test_lagging_replica_is_not_cached(client, admin, settings):
+    """
+    Test that after a write the product cache and the validators of the list do not pick
+    up the stale rows of a lagging replica.
+    """
+    product = ProductFactory(name="Old")
+    url = reverse("products-detail", args=[product.sku])
+    anonymous = APIClient()
+
+    with lagging_replica():
+        assert anonymous.get(reverse("products-list")).data["results"]
+        client.patch(url, {"name": "New"})
+
+        response = anonymous.get(url)
+        assert response.data["name"] == "New"
+        assert (
+            anonymous.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+        )
+
+        response = anonymous.get(reverse("products-list"))
+        assert response.data["results"][0]["name"] == "Old"
+        assert not response.has_header("ETag")
+
+        settings.REPLICA_PIN_SECONDS = 0
+        assert anonymous.get(reverse("products-list")).has_header("ETag")
+
+
+def test_writers_are_pinned_to_primary(client, user, admin):
+    """
+    Test that a user who wrote reads from the primary for REPLICA_PIN_SECONDS.
+    """
+    product = ProductFactory()
+    url = reverse("products-detail", args=[product.sku])
+
+    assert "replica" in queried(lambda: client.get(reverse("products-list")))
+    assert queried(lambda: client.patch(url, {"name": "New"})) == {DEFAULT_DB_ALIAS}
+    assert db.is_pinned(f"user:{user.pk}")
+    assert queried(lambda: client.get(url)) == {DEFAULT_DB_ALIAS}
+    assert client.get(url).data["name"] == "New"
+
+    db.caches["default"].delete(db._pin_key(f"user:{user.pk}"))
+    assert "replica" in queried(lambda: client.get(reverse("products-list")))
+
+
+def test_read_only_tasks_use_replica(mocker, settings):
+    """
+    Test that the read-only notification tasks read from a replica.
+    """
+    settings.PRODUCT_IMPORT_EMAIL_ID = "d-import"
+    send = mocker.patch("store.tasks.send_batches", return_value={})
+    mocker.patch(
+        "store.tasks.admin_recipients",
+        side_effect=lambda: iter(Product.objects.values("sku")[:1]),
+    )
+    ProductFactory()
+
+    assert queried(lambda: product_import_notification({"rows": 1})) == {"replica"}
+    send.assert_called_once()
@@ -0,0 +1,125 @@
+from datetime import date, datetime, timedelta, timezone
+
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from store import counters, rollups
+from store.models import ProductViewsDaily, ProductViewsHourly
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+HOUR = 490000  # 2025-11-24 16:00 UTC
+
+
+def test_flush_maintains_hourly_rollups(product, redis):
+    """
+    Test that a flush adds the buffered views to their hourly rollups, counting views
+    buffered without an hour in the current hour.
+
+    @param product: The viewed product.
+    @param redis: The in-memory Redis connection.
+    """
+    redis.hset(
+        "store:views:pending",
+        mapping={f"{product.pk}:{HOUR}": 2, f"{product.pk}:{HOUR + 1}": 1},
+    )
+    counters.flush()
+    redis.hset("store:views:pending", f"{product.pk}:{HOUR}", 3)
+    redis.hset("store:views:pending", product.pk, 4)
+    counters.flush()
+
+    rows = dict(
+        ProductViewsHourly.objects.filter(product=product).values_list("hour", "views")
+    )
+    assert rows == {
+        rollups.hour_start(HOUR): 5,
+        rollups.hour_start(HOUR + 1): 1,
+        rollups.hour_start(rollups.current_hour()): 4,
+    }
+    assert product.stats.view_count == 10
+
+
+def test_compact_folds_old_hours_into_days(product):
+    """
+    Test that hourly rollups older than the retention are folded into daily rollups, adding
+    to the days already compacted.
+
+    @param product: The viewed product.
+    """
+    now = datetime(2026, 3, 20, 12, tzinfo=timezone.utc)
+    old = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    ProductViewsDaily.objects.create(product=product, day=date(2026, 3, 1), views=10)
+    for hour, views in ((old, 1), (old + timedelta(hours=23), 2), (now, 5)):
+        ProductViewsHourly.objects.create(product=product, hour=hour, views=views)
+
+    assert rollups.compact(now) == 2
+
+    assert ProductViewsDaily.objects.get(product=product).views == 13
+    assert list(ProductViewsHourly.objects.values_list("hour", flat=True)) == [now]
+
+
+def test_views_report(client, mocker, django_assert_max_num_queries):
+    """
+    Test that the report combines daily and hourly rollups, per product and per brand.
+
+    @param client: The authenticated test client.
+    @param mocker: The pytest-mock mocker fixture.
+    @param django_assert_max_num_queries: The pytest-django query counting fixture.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+    first, second = ProductFactory(brand="Acme"), ProductFactory(brand="Acme")
+    ProductViewsDaily.objects.create(product=first, day=date(2026, 3, 1), views=10)
+    ProductViewsHourly.objects.create(
+        product=first, hour=datetime(2026, 3, 1, 20, tzinfo=timezone.utc), views=1
+    )
+    ProductViewsHourly.objects.create(
+        product=second, hour=datetime(2026, 3, 2, 8, tzinfo=timezone.utc), views=4
+    )
+    url = reverse("products-views-report")
+    params = {"start": "2026-03-01T10:00:00Z", "end": "2026-03-03T00:00:00Z"}
+
+    # The daily and hourly rollups, and the product ids of the unique visitors sketches.
+    with django_assert_max_num_queries(3):
+        response = client.get(url, params)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["series"] == [
+        {
+            "key": first.sku,
+            "total": 11,
+            "unique_visitors": 0,
+            "points": [{"bucket": date(2026, 3, 1), "views": 11, "unique_visitors": 0}],
+        },
+        {
+            "key": second.sku,
+            "total": 4,
+            "unique_visitors": 0,
+            "points": [{"bucket": date(2026, 3, 2), "views": 4, "unique_visitors": 0}],
+        },
+    ]
+
+    response = client.get(url, {**params, "group_by": "brand", "granularity": "hour"})
+
+    assert response.data["series"] == [
+        {
+            "key": "Acme",
+            "total": 5,
+            "points": [
+                {"bucket": datetime(2026, 3, 1, 20, tzinfo=timezone.utc), "views": 1},
+                {"bucket": datetime(2026, 3, 2, 8, tzinfo=timezone.utc), "views": 4},
+            ],
+        }
+    ]
+
+
+def test_views_report_admin_only(client):
+    """
+    Test that users outside the 'ProductAdmin' group cannot read the views report.
+
+    @param client: The authenticated test client.
+    """
+    response = client.get(reverse("products-views-report"))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
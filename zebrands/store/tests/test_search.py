@@ -0,0 +1,85 @@
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store.search import word_similarity
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def catalog():
+    """
+    Fixture to generate a small catalog with overlapping names and brands.
+    """
+    return {
+        "sneaker": ProductFactory(sku="ZB-100", name="Running Sneaker", brand="Zapato"),
+        "boot": ProductFactory(sku="ZB-200", name="Hiking Boot", brand="Zapato"),
+        "mug": ProductFactory(sku="MG-100", name="Coffee Mug", brand="Taza Co"),
+    }
+
+
+def search(query, **params):
+    response = APIClient().get(reverse("products-search"), {"q": query, **params})
+    assert response.status_code == status.HTTP_200_OK
+    return response
+
+
+def skus(response):
+    return [result["sku"] for result in response.data["results"]]
+
+
+def test_search_matches_prefixes_and_substrings(catalog):
+    """
+    Test that SKU prefixes, brand prefixes and name substrings match, exact SKUs first.
+
+    @param catalog: The products to search.
+    """
+    assert skus(search("ZB-")) == ["ZB-100", "ZB-200"]
+    assert skus(search("ZB-200"))[0] == "ZB-200"
+    assert skus(search("zapa")) == ["ZB-100", "ZB-200"]
+    assert skus(search("fee")) == ["MG-100"]
+
+
+def test_search_tolerates_typos(catalog):
+    """
+    Test that misspelled words still find the product.
+
+    @param catalog: The products to search.
+    """
+    assert skus(search("sneakr")) == ["ZB-100"]
+    assert skus(search("hikng boot"))[0] == "ZB-200"
+    assert not skus(search("umbrella"))
+
+
+def test_search_is_paginated(catalog):
+    """
+    Test that search results are paginated with limit and offset.
+
+    @param catalog: The products to search.
+    """
+    response = search("zapato", limit=1, offset=1)
+
+    assert response.data["count"] == 2
+    assert skus(response) == ["ZB-200"]
+    assert response.data["results"][0]["score"] > 0
+
+
+def test_search_requires_a_query():
+    """
+    Test that a search without terms is rejected.
+    """
+    response = APIClient().get(reverse("products-search"))
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_word_similarity_matches_the_best_words():
+    """
+    Test that the word similarity compares the query against the closest run of words.
+    """
+    assert word_similarity("boot", "Hiking Boot") == 1.0
+    assert word_similarity("bot", "Hiking Boot") < 1.0
+    assert word_similarity("mug", "Hiking Boot") == 0.0
@@ -1,4 +1,5 @@
 import pytest
+from store.models import Product
 from store.serializers import ProductListSerializer, ProductSerializer
 from store.tests.factories import ProductFactory
 
@@ -44,3 +45,17 @@ def test_product_list_serializer():
 
     # Assert that the serialized data matches the expected output.
     assert serialized == expected
+
+
+def test_product_list_fast_path():
+    """
+    Test that ProductListSerializer.represent matches the serializer's output, including
+    non-ASCII names.
+    """
+    ProductFactory.create_batch(3)
+    ProductFactory(name="Café “olé” \u2028 ✓")
+    queryset = Product.objects.order_by("sku")
+
+    rows = ProductListSerializer.represent(ProductListSerializer.values(queryset))
+
+    assert rows == ProductListSerializer(queryset, many=True).data
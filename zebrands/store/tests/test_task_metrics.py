@@ -0,0 +1,87 @@
+import time
+from types import SimpleNamespace
+
+from django.utils import timezone
+
+import pytest
+from prometheus_client import REGISTRY
+from store.tasks import product_update_counter
+
+from zebrands import celery_app, task_metrics
+from zebrands.metrics import WORKER_METRICS
+
+pytestmark = pytest.mark.django_db
+
+
+def sample(name, **labels):
+    """
+    Returns the value of a sample of the worker metrics, flushing the pending ones.
+    """
+    WORKER_METRICS.flush()
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_task_runtime_and_queries(product):
+    """
+    Test that the runtime, final state and database queries of tasks are recorded.
+    """
+    name = product_update_counter.name
+    task_metrics.install_recorder()
+
+    product_update_counter.apply(args=[product.sku])
+
+    labels = {"task": name, "state": "SUCCESS"}
+    assert sample("celery_task_runtime_seconds_count", **labels) == 1
+    assert sample("celery_task_runtime_seconds_sum", **labels) > 0
+    assert sample("celery_task_db_queries_sum", task=name) == 1
+    assert sample("celery_task_db_queries_bucket", task=name, le="0.0") == 0
+    assert sample("celery_task_db_queries_bucket", task=name, le="1.0") == 1
+
+
+def test_task_queue_wait():
+    """
+    Test that the wait of a task is measured from its publication, or from its ETA, and
+    that failures are told apart.
+    """
+    headers = {}
+    task_metrics.stamp_publication(headers=headers)
+    assert headers[task_metrics.PUBLISHED_AT] <= time.time()
+
+    now = time.time()
+    eta = timezone.now() - timezone.timedelta(seconds=2)
+    runs = (("1", now - 10, None, "SUCCESS"), ("2", now - 60, eta, "FAILURE"))
+    for task_id, published, eta, state in runs:
+        request = SimpleNamespace(published_at=published, eta=eta and eta.isoformat())
+        task = SimpleNamespace(name="waiting", request=request)
+        task_metrics.task_started(task_id=task_id, task=task)
+        task_metrics.task_finished(task_id=task_id, task=task, state=state)
+
+    assert sample("celery_task_queue_wait_seconds_count", task="waiting") == 2
+    assert 12 <= sample("celery_task_queue_wait_seconds_sum", task="waiting") < 13
+    assert (
+        sample("celery_task_queue_wait_seconds_bucket", task="waiting", le="5.0") == 1
+    )
+    for state in ("SUCCESS", "FAILURE"):
+        assert (
+            sample("celery_task_runtime_seconds_count", task="waiting", state=state)
+            == 1
+        )
+
+
+def test_queue_length(settings):
+    """
+    Test that the length of the Celery queues is sampled from the broker.
+    """
+    settings.CELERY_METRICS_QUEUES = ["counters", "missing"]
+    product_update_counter.delay("SKU")
+    product_update_counter.delay("SKU")
+    try:
+        assert (
+            REGISTRY.get_sample_value("celery_queue_length", {"queue": "counters"}) == 2
+        )
+        assert (
+            REGISTRY.get_sample_value("celery_queue_length", {"queue": "missing"}) == 0
+        )
+    finally:
+        with celery_app.connection_for_write() as connection:
+            connection.default_channel.queue_purge("counters")
@@ -0,0 +1,148 @@
+from django.contrib.auth.models import Group
+
+import pytest
+from store.delivery import DeliveryEngine, TransportResponse
+from store.models import PRODUCT_ADMIN_GROUP
+from store.tasks import (
+    compact_view_rollups,
+    flush_product_notifications,
+    product_import_notification,
+    product_update_counter,
+    send_product_digest,
+)
+from store.tests.factories import UserFactory
+
+from zebrands import celery_app
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def admins():
+    """
+    Fixture to generate three users in the 'Product Admin' group.
+    """
+    group = Group.objects.create(name=PRODUCT_ADMIN_GROUP)
+    users = UserFactory.create_batch(3)
+    group.user_set.add(*users)
+    return users
+
+
+class RecordingTransport:
+    """
+    Delivery transport that records the sent payloads and answers with a fixed status.
+    """
+
+    def __init__(self):
+        self.status = 202
+        self.payloads = []
+
+    def send(self, payload):
+        self.payloads.append(payload)
+        return TransportResponse(self.status, {}, b"")
+
+
+@pytest.fixture()
+def sendgrid(mocker):
+    """
+    Fixture to replace the SendGrid transport used by the notification tasks.
+    """
+    transport = RecordingTransport()
+    engine = DeliveryEngine(transport, max_concurrency=2, max_retries=0)
+    mocker.patch("store.tasks.get_delivery_engine", return_value=engine)
+    return transport
+
+
+def test_product_digest_single_request(
+    product, admins, sendgrid, django_assert_max_num_queries
+):
+    """
+    Test that all admins are notified with a single SendGrid request, with one
+    personalization per admin.
+
+    @param product: The updated product.
+    @param admins: The users in the 'Product Admin' group.
+    @param sendgrid: The recording SendGrid transport.
+    @param django_assert_max_num_queries: The pytest-django query counting fixture.
+    """
+    with django_assert_max_num_queries(2):
+        result = send_product_digest({product.sku: {"name"}})
+
+    assert result == {admin.email: True for admin in admins}
+    assert len(sendgrid.payloads) == 1
+    personalizations = sendgrid.payloads[0]["personalizations"]
+    assert [p["to"][0]["email"] for p in personalizations] == [a.email for a in admins]
+    assert personalizations[0]["dynamic_template_data"] == {
+        "username": f"{admins[0].first_name} {admins[0].last_name}",
+        "name": product.name,
+        "brand": product.brand,
+        "sku": product.sku,
+    }
+
+
+def test_product_digest_chunks_large_groups(
+    product, admins, sendgrid, mocker, settings
+):
+    """
+    Test that large admin groups are split in chunks, the first ones sent right away and
+    concurrently, and the others by parallel subtasks.
+
+    @param product: The updated product.
+    @param admins: The users in the 'Product Admin' group.
+    @param sendgrid: The recording SendGrid transport.
+    @param mocker: The pytest-mock mocker fixture.
+    @param settings: The pytest-django settings fixture.
+    """
+    settings.SENDGRID_MAX_PERSONALIZATIONS = 1
+    settings.NOTIFICATION_MAX_CONCURRENCY = 2
+    subtask = mocker.patch("store.tasks.send_admin_batch.delay")
+
+    result = send_product_digest({product.sku: {"name"}})
+
+    assert result == {admins[0].email: True, admins[1].email: True}
+    assert len(sendgrid.payloads) == 2
+    subtask.assert_called_once()
+    assert [r["email"] for r in subtask.call_args.args[2]] == [admins[2].email]
+
+
+def test_product_digest_reports_failures(product, admins, sendgrid):
+    """
+    Test that every recipient of a rejected request is reported as failed.
+
+    @param product: The updated product.
+    @param admins: The users in the 'Product Admin' group.
+    @param sendgrid: The recording SendGrid transport.
+    """
+    sendgrid.status = 400
+
+    result = send_product_digest({product.sku: {"name"}})
+
+    assert result == {admin.email: False for admin in admins}
+
+
+def test_tasks_are_routed_to_their_queues():
+    """
+    Test that every group of tasks is sent to its own queue, and that product changes are
+    notified before bulk emails.
+    """
+    router = celery_app.amqp.router
+    routes = {
+        task: router.route({}, task.name)
+        for task in (
+            product_update_counter,
+            flush_product_notifications,
+            product_import_notification,
+            compact_view_rollups,
+        )
+    }
+
+    assert {task: route["queue"].name for task, route in routes.items()} == {
+        product_update_counter: "counters",
+        flush_product_notifications: "notifications",
+        product_import_notification: "notifications",
+        compact_view_rollups: "reports",
+    }
+    assert (
+        routes[flush_product_notifications]["priority"]
+        < routes[product_import_notification]["priority"]
+    )
@@ -0,0 +1,99 @@
+from django.urls import reverse
+
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from store import counters, trending
+from store.tests.factories import ProductFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_trending_ranks_anonymous_views():
+    """
+    Test that products viewed by anonymous users are ranked by views, with exact bounds while
+    the buckets have free slots.
+    """
+    first, second = ProductFactory.create_batch(2)
+    client = APIClient()
+    for product, views in ((first, 1), (second, 3)):
+        for _ in range(views):
+            client.get(reverse("products-detail", args=(product.sku,)))
+
+    response = client.get(reverse("products-trending"), {"limit": 5})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["results"] == [
+        {
+            "sku": product.sku,
+            "name": product.name,
+            "views": views,
+            "min_views": views,
+            "max_views": views,
+        }
+        for product, views in ((second, 3), (first, 1))
+    ]
+    assert response.data["max_unlisted_views"] == 0
+
+
+def test_trending_buckets_have_fixed_capacity(settings, redis):
+    """
+    Test that a full bucket evicts its least viewed product, and that the error bounds still
+    hold the exact counts.
+
+    @param settings: The pytest-django settings fixture.
+    @param redis: The in-memory Redis connection.
+    """
+    settings.TRENDING_CAPACITY = 2
+    exact = {1: 5, 2: 2, 3: 1}
+    for product_id, views in exact.items():
+        for _ in range(views):
+            counters.record_view(product_id)
+
+    ranking, unlisted = trending.top(10)
+
+    bucket = f"store:trending:{trending.current_minute()}"
+    assert redis.zcard(bucket) == 2
+    assert [item["product_id"] for item in ranking] == [1, 3]
+    for item in ranking:
+        assert item["min_views"] <= exact[item["product_id"]] <= item["max_views"]
+    assert ranking[1]["views"] == 3
+    assert exact[2] <= unlisted
+
+
+def test_views_are_counted_by_script_digest(redis, mocker):
+    """
+    Test that views run the loaded trending script by its digest, and are still counted
+    once when Redis lost its scripts.
+
+    @param redis: The in-memory Redis connection.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    counters.record_view(1)
+    assert redis.script_exists(trending._record_script().sha) == [True]
+    record = mocker.spy(trending, "record")
+    counters.record_view(1)
+    assert not record.called
+
+    redis.script_flush()
+    counters.record_view(1)
+
+    assert record.call_count == 1
+    ranking, _ = trending.top(10)
+    assert [(item["product_id"], item["views"]) for item in ranking] == [(1, 3)]
+    assert sum(int(views) for views in redis.hvals("store:views:pending")) == 3
+
+
+def test_trending_script_is_registered_once(redis, mocker):
+    """
+    Test that the trending script is registered once per connection, not once per view.
+
+    @param redis: The in-memory Redis connection.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    register = mocker.spy(redis, "register_script")
+
+    for _ in range(3):
+        counters.record_view(1)
+
+    register.assert_called_once_with(trending.RECORD_SCRIPT)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+from rest_framework.test import APIClient
+from store import counters, uniques
+from store.tests.factories import ProductFactory, ProductStatsFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_retrieve_counts_unique_visitors(product):
+    """
+    Test that repeated anonymous views of the same visitor count once, per product and per
+    brand.
+
+    @param product: The viewed product.
+    """
+    other = ProductFactory(brand=product.brand)
+    url = reverse("products-detail", args=(product.sku,))
+    for address in ("10.0.0.1", "10.0.0.1", "10.0.0.2"):
+        APIClient().get(url, REMOTE_ADDR=address)
+    APIClient().get(
+        reverse("products-detail", args=(other.sku,)), REMOTE_ADDR="10.0.0.3"
+    )
+
+    today = [timezone.now().date()]
+    assert uniques.product_uniques([product.pk, other.pk], today) == {
+        product.pk: 2,
+        other.pk: 1,
+    }
+    assert uniques.count_many([[uniques.brand_key(product.brand, today[0])]]) == [3]
+
+
+def test_unique_visitors_merge_across_days(product, redis):
+    """
+    Test that a visitor seen on several days counts once over the range.
+
+    @param product: The viewed product.
+    @param redis: The in-memory Redis connection.
+    """
+    today = timezone.now().date()
+    yesterday = today - timedelta(days=1)
+    redis.pfadd(uniques.product_key(product.pk, yesterday), "a", "b")
+    counters.record_view(product.pk, brand=product.brand, visitor="a")
+
+    assert uniques.product_uniques([product.pk], [yesterday, today]) == {product.pk: 2}
+    assert redis.ttl(uniques.product_key(product.pk, today)) > 0
+
+
+def test_views_report_includes_unique_visitors(client, product, mocker):
+    """
+    Test that daily views series carry the unique visitors of every day and of the range.
+
+    @param client: The authenticated test client.
+    @param product: The viewed product.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    mocker.patch("store.views.ProductAdminOnly.has_permission", return_value=True)
+    for visitor in ("a", "b", "a"):
+        counters.record_view(product.pk, brand=product.brand, visitor=visitor)
+    counters.flush()
+
+    response = client.get(reverse("products-views-report"), {"group_by": "brand"})
+
+    [series] = response.data["series"]
+    assert (series["key"], series["total"], series["unique_visitors"]) == (
+        product.brand,
+        3,
+        2,
+    )
+    assert series["points"][0]["unique_visitors"] == 2
+
+
+def test_stats_admin_counts_page_uniques_at_once(admin_client, mocker):
+    """
+    Test that the product stats changelist estimates the unique visitors of the whole page
+    with a single lookup.
+
+    @param admin_client: The pytest-django superuser client fixture.
+    @param mocker: The pytest-mock mocker fixture.
+    """
+    stats = ProductStatsFactory.create_batch(3)
+    lookup = mocker.patch(
+        "store.admin.product_uniques",
+        return_value={obj.product_id: index for index, obj in enumerate(stats, 1)},
+    )
+
+    response = admin_client.get(reverse("admin:store_productstats_changelist"))
+
+    assert response.status_code == 200
+    lookup.assert_called_once()
+    assert sorted(lookup.call_args.args[0]) == sorted(obj.product_id for obj in stats)
+    assert all(
+        f'<td class="field-unique_visitors">{index}</td>' in response.content.decode()
+        for index in (1, 2, 3)
+    )
@@ -0,0 +1,148 @@
+import time
+from uuid import uuid4
+
+from django.conf import settings
+
+from zebrands.redis import get_redis, get_script
+
+# Space-Saving update of one minute bucket: a product already counted, or a bucket with free
+# slots, is simply incremented. Otherwise the product replaces the least viewed one and
+# inherits its count as the overestimation error, so the bucket never exceeds its capacity.
+RECORD_SCRIPT = """
+local member, capacity = ARGV[1], tonumber(ARGV[2])
+if redis.call('ZSCORE', KEYS[1], member) or redis.call('ZCARD', KEYS[1]) < capacity then
+    redis.call('ZINCRBY', KEYS[1], 1, member)
+else
+    local smallest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local floor = tonumber(smallest[2])
+    redis.call('ZREM', KEYS[1], smallest[1])
+    redis.call('HDEL', KEYS[2], smallest[1])
+    redis.call('ZADD', KEYS[1], floor + 1, member)
+    redis.call('HSET', KEYS[2], member, floor)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+"""
+
+
+def _key(name):
+    return f"{settings.TRENDING_KEY_PREFIX}:{name}"
+
+
+def _errors_key(minute):
+    return _key(f"{minute}:errors")
+
+
+def current_minute():
+    """
+    Returns the number of minutes since the epoch, the bucket of a view recorded now.
+    """
+    return int(time.time()) // 60
+
+
+def _record_script():
+    return get_script(RECORD_SCRIPT)
+
+
+def _record_arguments(product_id):
+    minute = current_minute()
+    ttl = (settings.TRENDING_WINDOW_MINUTES + 1) * 60
+    keys = [_key(minute), _errors_key(minute)]
+    return keys, [product_id, settings.TRENDING_CAPACITY, ttl]
+
+
+def track(pipe, product_id):
+    """
+    Queues the commands counting one view in the current minute bucket.
+
+    Every bucket is a Space-Saving sketch of at most TRENDING_CAPACITY products, kept as a
+    sorted set with a hash of the overestimation errors, so memory is fixed whatever the
+    size of the catalog. Buckets expire once they leave the trending window.
+
+    The script is run with EVALSHA, by its digest rather than its source. A pipeline would
+    check that the script is loaded before every execution, so it is not registered on the
+    pipeline: if Redis lost its script cache, the pipeline fails with NoScriptError and the
+    view is counted again with record, which loads the script.
+
+    @param pipe: A redis-py client or pipeline.
+    @param product_id: The primary key of the viewed product.
+
+    @return: The pipeline.
+    """
+    keys, args = _record_arguments(product_id)
+    pipe.evalsha(_record_script().sha, len(keys), *keys, *args)
+    return pipe
+
+
+def record(product_id):
+    """
+    Counts one view in the current minute bucket, loading the script when Redis lacks it.
+
+    @param product_id: The primary key of the viewed product.
+    """
+    keys, args = _record_arguments(product_id)
+    _record_script()(keys=keys, args=args)
+
+
+def top(limit, minutes=None):
+    """
+    Returns the most viewed products of the last minutes, with their error bounds.
+
+    The minute buckets of the window are merged with ZUNIONSTORE, so the cost depends on the
+    window and the bucket capacity, never on the size of the catalog. A product missing from
+    a full bucket may have been viewed there as much as the bucket's smallest count, and a
+    product that replaced another one is overestimated by at most the inherited count.
+
+    @param limit: The maximum number of products to return.
+    @param minutes: The length of the window, defaults to TRENDING_WINDOW_MINUTES.
+
+    @return: A tuple with a list of dictionaries with the 'product_id' and its estimated,
+    minimum and maximum 'views', and the maximum number of views of any unlisted product.
+    """
+    minutes = minutes or settings.TRENDING_WINDOW_MINUTES
+    now = current_minute()
+    buckets = [now - offset for offset in range(minutes)]
+    union = _key(f"union:{uuid4().hex}")
+
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zunionstore(union, [_key(minute) for minute in buckets])
+    pipe.zrevrange(union, 0, limit - 1, withscores=True)
+    pipe.delete(union)
+    for minute in buckets:
+        pipe.zcard(_key(minute))
+        pipe.zrange(_key(minute), 0, 0, withscores=True)
+    _, ranking, _, *bucket_replies = pipe.execute()
+
+    capacity = settings.TRENDING_CAPACITY
+    floors = [
+        smallest[0][1] if size >= capacity else 0
+        for size, smallest in zip(bucket_replies[::2], bucket_replies[1::2])
+    ]
+    unlisted = sum(floors) + (ranking[-1][1] if len(ranking) == limit else 0)
+    if not ranking:
+        return [], int(unlisted)
+
+    members = [member for member, _ in ranking]
+    pipe = get_redis().pipeline(transaction=False)
+    for minute in buckets:
+        pipe.zmscore(_key(minute), members)
+        pipe.hmget(_errors_key(minute), members)
+    replies = pipe.execute()
+
+    results = []
+    for index, (member, views) in enumerate(ranking):
+        overestimate = underestimate = 0
+        for floor, scores, errors in zip(floors, replies[::2], replies[1::2]):
+            if scores[index] is None:
+                underestimate += floor
+            else:
+                overestimate += int(errors[index] or 0)
+        results.append(
+            {
+                "product_id": int(member),
+                "views": int(views),
+                "min_views": int(views) - overestimate,
+                "max_views": int(views) + underestimate,
+            }
+        )
+    return results, int(unlisted)
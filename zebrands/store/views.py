@@ -1,9 +1,54 @@
+import io
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, BasePermission, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from store.batches import create_products, delete_products, update_products
+from store.cache import product_cache, product_entry
+from store.conditional import (
+    catalog_validators,
+    not_modified,
+    product_validators,
+    set_validators,
+)
+from store.counters import record_view
+from store.exporters import CONTENT_TYPES, accepts_gzip, export_products
+from store.facets import facet_summary
+from store.importers import UnreadableImportFile, detect_format, import_products
 from store.models import PRODUCT_ADMIN_GROUP, Product
-from store.serializers import ProductListSerializer, ProductSerializer
-from store.tasks import product_update_counter
+from store.pagination import (
+    ProductCursorPagination,
+    ProductOffsetPagination,
+    ProductSearchPagination,
+)
+from store.rollups import view_series
+from store.search import search_products
+from store.serializers import (
+    ProductBatchSerializer,
+    ProductExportQuerySerializer,
+    ProductFilterSerializer,
+    ProductImportUploadSerializer,
+    ProductListSerializer,
+    ProductSearchQuerySerializer,
+    ProductSearchResultSerializer,
+    ProductSerializer,
+    TrendingQuerySerializer,
+    ViewReportQuerySerializer,
+)
+from store.trending import top
+from store.uniques import annotate_series, days_between, fingerprint
+from users.auth import user_groups
+
+from zebrands.db import ReplicaReadsMixin, primary_reads, replica_may_lag
 
 
 class ProductAdminOnly(BasePermission):
@@ -20,13 +65,39 @@ class ProductAdminOnly(BasePermission):
 
         @return: True if the user is a member of the 'ProductAdmin' group, False otherwise.
         """
-        user = request.user
-        return user.groups.filter(name=PRODUCT_ADMIN_GROUP).exists()
+        return PRODUCT_ADMIN_GROUP in user_groups(request.user)
 
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(ReplicaReadsMixin, ModelViewSet):
+    queryset = Product.objects.order_by("sku")
     lookup_field = "sku"
+    pagination_class = ProductCursorPagination
+
+    @property
+    def paginator(self):
+        """
+        Returns the paginator instance for the list action.
+
+        Products are paginated with SKU cursors, unless the client explicitly opts in to
+        limit/offset pagination by sending one of its query parameters.
+        """
+        if not hasattr(self, "_paginator"):
+            if ProductOffsetPagination.requested(self.request):
+                self._paginator = ProductOffsetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        """
+        Returns the products, filtered by brand and price range when listing them.
+        """
+        queryset = super().get_queryset()
+        if self.action == "list":
+            filters = ProductFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            queryset = filters.filter_queryset(queryset)
+        return queryset
 
     def get_serializer_class(self):
         """
@@ -37,18 +108,33 @@ class ProductViewSet(ModelViewSet):
         """
         if self.action == "list":
             return ProductListSerializer
+        if self.action == "import_products":
+            return ProductImportUploadSerializer
+        if self.action == "batch":
+            return ProductBatchSerializer
+        if self.action == "export_products":
+            return ProductExportQuerySerializer
+        if self.action == "views_report":
+            return ViewReportQuerySerializer
+        if self.action == "trending":
+            return TrendingQuerySerializer
+        if self.action == "search":
+            return ProductSearchQuerySerializer
+        if self.action == "facets":
+            return ProductFilterSerializer
         return ProductSerializer
 
     def get_permissions(self):
         """
         Obtains a list of permissions that are required to perform the current action.
 
-        For non-authenticated users, the 'list' and 'retrieve' actions are allowed.
+        For non-authenticated users, the 'list', 'retrieve', 'search', 'facets' and 'trending'
+        actions are allowed.
         For authenticated users, only those in the 'ProductAdmin' group are allowed to access other actions.
 
         @return: A list of permission objects.
         """
-        if self.action in ("retrieve", "list"):
+        if self.action in ("retrieve", "list", "search", "facets", "trending"):
             # Allow anonymous users to access the retrieve method
             permission_classes = [AllowAny]
         else:
@@ -60,13 +146,261 @@ class ProductViewSet(ModelViewSet):
         """
         Retrieves a single product instance.
 
-        If the user is not authenticated, updates the product's view counter by scheduling a task using Celery.
+        The serialized product is served from the two-tier product cache, the database is only
+        queried on a miss. If the user is not authenticated, buffers a view of the product for
+        its ProductStats and its unique visitors, also when the client's copy is current and a
+        304 is returned.
 
         @return: A response object containing the serialized product instance data.
         """
-        instance = self.get_object()
+        sku = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        entry = product_cache.get_or_load(sku, self.load_cache_entry)
         is_authenticated = request.user.is_authenticated
         if not is_authenticated:
-            product_update_counter.delay(instance.sku)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+            record_view(
+                entry["pk"], brand=entry["data"]["brand"], visitor=fingerprint(request)
+            )
+        etag, last_modified = product_validators(
+            entry, request.accepted_renderer.format
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = set_validators(Response(entry["data"]), etag, last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lists the products, one page at a time.
+
+        The response carries validators derived from the catalog-wide version, and a 304 is
+        returned before querying products if the client's copy of the page is current.
+        Products are fetched as tuples of the listed fields and represented without
+        instantiating models, see ProductListSerializer.represent.
+
+        @return: A response object containing a page of serialized products.
+        """
+        state = product_cache.catalog_state()
+        etag, last_modified = catalog_validators(state, request)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            serializer_class = self.get_serializer_class()
+            queryset = serializer_class.values(
+                self.filter_queryset(self.get_queryset())
+            )
+            page = self.paginate_queryset(queryset)
+            response = self.get_paginated_response(serializer_class.represent(page))
+            # A lagging replica would pair the new catalog version with stale products.
+            if not replica_may_lag(state["modified"]):
+                set_validators(response, etag, last_modified)
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_products(self, request, *args, **kwargs):
+        """
+        Imports an uploaded CSV or JSON Lines catalog file, upserting products by SKU.
+
+        The file is streamed and written in chunks, see store.importers.import_products.
+        A file that cannot be read, e.g. because it is not UTF-8 text, is rejected.
+
+        @return: A response object with the import totals, rows/sec and per-row errors.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get("format") or detect_format(
+            upload.name
+        )
+        if file_format is None:
+            raise ValidationError({"format": ["Cannot detect the file format."]})
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        try:
+            report = import_products(stream, file_format)
+        except UnreadableImportFile as error:
+            raise ValidationError({"file": [str(error)]})
+        return Response(report.as_dict())
+
+    @action(detail=False, methods=["post", "patch", "delete"])
+    def batch(self, request, *args, **kwargs):
+        """
+        Creates (POST), partially updates (PATCH) or deletes (DELETE) many products at once.
+
+        The body is an array of products keyed by SKU, for deletes only the SKU is needed.
+        The items are validated in one pass and the valid ones written in bulk in a single
+        transaction, see store.batches.
+
+        @return: A response object with the totals and the result of every item, in order.
+        """
+        serializer = self.get_serializer(data={"items": request.data})
+        serializer.is_valid(raise_exception=True)
+        write = {
+            "POST": create_products,
+            "PATCH": update_products,
+            "DELETE": delete_products,
+        }[request.method]
+        report = write(serializer.validated_data["items"])
+        return Response(report.as_dict())
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export_products(self, request, *args, **kwargs):
+        """
+        Streams the whole catalog, or the products modified since a given time, as a JSON
+        Lines or CSV file.
+
+        Rows are read with a server-side cursor and encoded chunk by chunk, see
+        store.exporters.export_products, and gzip compressed on the fly when the client
+        accepts it, so memory stays flat whatever the size of the catalog.
+
+        @return: A streaming response with the exported file.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        file_format = serializer.validated_data["file_format"]
+        content = export_products(file_format, serializer.validated_data.get("since"))
+        gzip = accepts_gzip(request.headers.get("Accept-Encoding", ""))
+        response = StreamingHttpResponse(
+            compress_sequence(content) if gzip else content,
+            content_type=CONTENT_TYPES[file_format],
+        )
+        if gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        filename = f"products-{timezone.now():%Y%m%dT%H%M%SZ}.{file_format}"
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=["get"], url_path="reports/views")
+    def views_report(self, request, *args, **kwargs):
+        """
+        Reports the anonymous views of products or brands as time series.
+
+        Answered from the hourly and daily view rollups, see store.rollups.view_series. Daily
+        series also carry the estimated unique visitors of every day and of the whole range.
+
+        @return: A response object with the range, the granularity and one series per product
+        or brand.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        series = view_series(
+            query["start"],
+            query["end"],
+            granularity=query["granularity"],
+            group_by=query["group_by"],
+            skus=query.get("sku"),
+            brands=query.get("brand"),
+        )
+        if query["granularity"] == "day":
+            last = query["end"] - timedelta(microseconds=1)
+            days = days_between(query["start"].date(), last.date())
+            annotate_series(series, query["group_by"], days)
+        return Response(
+            {
+                "start": query["start"],
+                "end": query["end"],
+                "granularity": query["granularity"],
+                "group_by": query["group_by"],
+                "series": series,
+            }
+        )
+
+    @action(detail=False, methods=["get"])
+    def search(self, request, *args, **kwargs):
+        """
+        Searches products by SKU, name and brand, ranked by relevance.
+
+        Matches SKU, name or brand prefixes and substrings, and tolerates typos through
+        trigram word similarity, see store.search.search_products.
+
+        @return: A response object with a page of matching products and their scores.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        results = search_products(serializer.validated_data["q"])
+        paginator = ProductSearchPagination()
+        page = paginator.paginate_queryset(results, request, view=self)
+        return paginator.get_paginated_response(
+            ProductSearchResultSerializer(page, many=True).data
+        )
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request, *args, **kwargs):
+        """
+        Returns the product count of every brand and the price histogram of the catalog.
+
+        Served from the incrementally maintained facet counts, see store.facets, with the
+        same catalog-wide validators as the list. The histogram is restricted to the given
+        brands, if any.
+
+        @return: A response object with the 'brands' and 'prices' facets.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        state = product_cache.catalog_state()
+        etag, last_modified = catalog_validators(state, request)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            response = Response(facet_summary(serializer.validated_data.get("brand")))
+            if not replica_may_lag(state["modified"]):
+                set_validators(response, etag, last_modified)
+        return response
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request, *args, **kwargs):
+        """
+        Lists the products most viewed by anonymous users in the last minutes.
+
+        Ranked from the fixed-size trending sketches, see store.trending.top. The view counts
+        are estimates, 'min_views' and 'max_views' bound the exact count, and
+        'max_unlisted_views' bounds the views of any product not listed.
+
+        @return: A response object with the ranked products and their error bounds.
+        """
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        ranking, unlisted = top(query["limit"], query["minutes"])
+        products = {
+            product["pk"]: product
+            for product in Product.objects.filter(
+                pk__in=[item["product_id"] for item in ranking]
+            ).values("pk", "sku", "name")
+        }
+        results = [
+            {
+                "sku": products[item["product_id"]]["sku"],
+                "name": products[item["product_id"]]["name"],
+                "views": item["views"],
+                "min_views": item["min_views"],
+                "max_views": item["max_views"],
+            }
+            for item in ranking
+            if item["product_id"] in products
+        ]
+        return Response(
+            {
+                "minutes": query["minutes"],
+                "results": results,
+                "max_unlisted_views": unlisted,
+            }
+        )
+
+    def load_cache_entry(self):
+        """
+        Loads the product of the current request and builds its cache entry.
+
+        The entry is shared by every client and cached under the version published by the
+        last write, so it is loaded from the primary rather than a lagging replica.
+
+        @return: A dictionary with the product's primary key and serialized data.
+        """
+        with primary_reads():
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+        return product_entry(instance, data)
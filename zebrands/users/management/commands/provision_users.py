@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importers import FORMATS, detect_format, read_rows
+from users.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates admin users in bulk from a CSV or JSON Lines file with the username, "
+        "email, password, first_name and last_name of every user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="The file format, detected from the extension by default.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot detect the file format, use --format.")
+
+        with open(options["path"], newline="", encoding="utf-8") as stream:
+            numbers, items = [], []
+            for number, row in read_rows(stream, file_format):
+                if isinstance(row, Exception):
+                    self.stderr.write(f"Row {number}: {row}")
+                else:
+                    numbers.append(number)
+                    items.append(row)
+
+        report = provision_users(items)
+        for number, result in zip(numbers, report.results):
+            if result["status"] == "error":
+                self.stderr.write(f"Row {number}: {json.dumps(result['errors'])}")
+        totals = report.as_dict()
+        self.stdout.write(
+            f"{len(items)} users in {report.seconds:.2f}s "
+            f"({report.users_per_second:.0f} users/sec): {totals['created']} created, "
+            f"{totals['failed']} failed"
+        )
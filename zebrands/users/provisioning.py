@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from users.serializers import UserSerializer, admin_groups
+
+from zebrands.bulk import BulkReport, drop_existing, insert_new, validate_items
+
+USERNAME_REPEATED = {"username": ["This username is repeated in the batch."]}
+USERNAME_EXISTS = {"username": ["A user with that username already exists."]}
+
+
+@dataclass
+class ProvisioningReport(BulkReport):
+    """
+    Totals and per-item results of a provisioning, the results are in the order of the items.
+    """
+
+    key = "username"
+
+    seconds: float = 0.0
+
+    @property
+    def created(self):
+        return self.counts()["created"]
+
+    @property
+    def users_per_second(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        counts = self.counts()
+        return {
+            "created": counts["created"],
+            "failed": counts["error"],
+            "seconds": round(self.seconds, 3),
+            "users_per_second": round(self.users_per_second, 1),
+            "results": self.results,
+        }
+
+
+def hashing_processes():
+    """
+    Returns the number of processes hashing passwords, every core by default.
+    """
+    return settings.USER_PROVISIONING_PROCESSES or os.cpu_count() or 1
+
+
+def hash_passwords(passwords):
+    """
+    Hashes passwords with the default hasher, across every core.
+
+    Password hashers are deliberately slow and hold the GIL, so threads would not help: the
+    passwords are hashed by a pool of processes instead, in a few chunks per process. The
+    pool is started for the call and shut down with it. Its processes are spawned rather
+    than forked, since forking the threaded web and Celery workers is unsafe.
+
+    @param passwords: A list of raw passwords.
+
+    @return: The list of encoded passwords, in the same order.
+    """
+    if len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    processes = min(hashing_processes(), len(passwords))
+    chunksize = max(1, len(passwords) // (processes * 4))
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _normalize(validated):
+    validated["username"] = User.normalize_username(validated["username"])
+    validated["email"] = User.objects.normalize_email(validated["email"])
+    return validated["username"]
+
+
+def _drop_existing(users, report):
+    """
+    Fails the users whose username exists, and removes them from 'users'.
+
+    @return: The number of users removed.
+    """
+    return drop_existing(
+        users,
+        report,
+        User.objects.all(),
+        USERNAME_EXISTS,
+        settings.USER_PROVISIONING_CHUNK_SIZE,
+    )
+
+
+def _insert(users, groups):
+    """
+    Inserts the users and their memberships of the groups.
+    """
+    created = User.objects.bulk_create(
+        [User(**validated) for _, validated in users.values()],
+        batch_size=settings.USER_PROVISIONING_CHUNK_SIZE,
+    )
+    # bulk_create sends no signals, new users have no cached tokens to invalidate.
+    Membership = User.groups.through
+    Membership.objects.bulk_create(
+        [
+            Membership(user_id=user.pk, group_id=group.pk)
+            for group in groups
+            for user in created
+        ],
+        batch_size=settings.USER_PROVISIONING_CHUNK_SIZE,
+    )
+
+
+def provision_users(items):
+    """
+    Creates admin users in bulk.
+
+    The items are validated in one pass, the users whose username exists are failed, and
+    the passwords of the others hashed in parallel, see hash_passwords. The users are then
+    inserted with bulk_create in a single transaction, and added to the admin groups with a
+    bulk insert into the membership table, the groups being resolved once. Users created
+    concurrently in the meantime are failed and the others inserted again. Items that fail
+    are reported and skipped.
+
+    @param items: A list of dictionaries with the 'username', 'email', 'password' and,
+    optionally, the 'first_name' and 'last_name' of the new users.
+
+    @return: A ProvisioningReport.
+    """
+    report = ProvisioningReport.for_items(items)
+    start = time.perf_counter()
+    groups = admin_groups()
+    users = validate_items(
+        items, report, UserSerializer(), USERNAME_REPEATED, normalize=_normalize
+    )
+    _drop_existing(users, report)
+    passwords = hash_passwords(
+        [validated["password"] for _, validated in users.values()]
+    )
+    for (_, validated), password in zip(users.values(), passwords):
+        validated["password"] = password
+
+    insert_new(lambda: _insert(users, groups), lambda: _drop_existing(users, report))
+
+    for username, (index, _) in users.items():
+        report.set(index, username, "created")
+    report.seconds = time.perf_counter() - start
+    return report
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth.models import Group, User
 
 from rest_framework import serializers
@@ -5,6 +6,22 @@ from store.models import PRODUCT_ADMIN_GROUP
 from users.models import USER_ADMIN_GROUP
 
 
+def admin_groups():
+    """
+    Returns the groups every new user is added to, failing if one of them is missing.
+
+    @return: A list with the USER_ADMIN_GROUP and PRODUCT_ADMIN_GROUP groups.
+    """
+    names = (USER_ADMIN_GROUP, PRODUCT_ADMIN_GROUP)
+    groups = list(Group.objects.filter(name__in=names))
+    missing = set(names) - {group.name for group in groups}
+    if missing:
+        raise Group.DoesNotExist(
+            f"Group matching query does not exist: {sorted(missing)}"
+        )
+    return groups
+
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=True)
     password = serializers.CharField(required=True, max_length=128)
@@ -19,7 +36,19 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
-        for group_name in (USER_ADMIN_GROUP, PRODUCT_ADMIN_GROUP):
-            group = Group.objects.get(name=group_name)
-            group.user_set.add(user)
+        user.groups.add(*admin_groups())
         return user
+
+
+class UserProvisioningSerializer(serializers.Serializer):
+    """
+    Serializer class for the users of a bulk provisioning.
+
+    The users are validated by users.provisioning, in one pass.
+    """
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=settings.USER_PROVISIONING_MAX_SIZE,
+    )
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+from users.auth import invalidate_tokens, invalidate_users, token_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Drops a deleted token from the authentication cache once the deletion is committed.
+    """
+    keys = [token_cache_key(instance.key)]
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user(sender, instance, created, **kwargs):
+    """
+    Drops the cached tokens of a changed user, e.g. deactivated, once the change is committed.
+    """
+    if not created:
+        transaction.on_commit(lambda: invalidate_users([instance.pk]))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drops the cached tokens of users added to or removed from groups, from either side of
+    the relation.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    else:
+        user_ids = list(pk_set)
+    transaction.on_commit(lambda: invalidate_users(user_ids))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    """
+    Drops the cached tokens of the members of a renamed or deleted group.
+    """
+    user_ids = list(instance.user_set.values_list("pk", flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_users(user_ids))
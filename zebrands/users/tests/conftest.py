@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.cache import caches
+
+import pytest
+from store.tests.factories import UserFactory
+from users import auth
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Fixture to start every test with empty authentication caches.
+    """
+    caches[settings.AUTH_CACHE_ALIAS].clear()
+    auth.local_cache.clear()
+
+
+@pytest.fixture
+def user() -> settings.AUTH_USER_MODEL:
+    """
+    Fixture to generate a User instance for testing purposes.
+    """
+    return UserFactory()
@@ -0,0 +1,183 @@
+from django.contrib.auth.models import Group
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from store.models import PRODUCT_ADMIN_GROUP
+from users import auth
+from users.models import USER_ADMIN_GROUP
+
+REPORT_URL = "/products/reports/views/"
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def product_admin(user):
+    user.groups.add(Group.objects.create(name=PRODUCT_ADMIN_GROUP))
+    return user
+
+
+@pytest.fixture
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def authenticate(token):
+    user, _ = auth.CachedTokenAuthentication().authenticate_credentials(token.key)
+    return user
+
+
+@pytest.mark.django_db
+def test_authentication_is_cached(token, django_assert_num_queries):
+    group = Group.objects.create(name=PRODUCT_ADMIN_GROUP)
+    token.user.groups.add(group)
+
+    with django_assert_num_queries(2):
+        user = authenticate(token)
+    assert user.pk == token.user_id
+    assert auth.user_groups(user) == {PRODUCT_ADMIN_GROUP}
+
+    # The second request hits the local cache, the third the shared one.
+    with django_assert_num_queries(0):
+        assert authenticate(token).pk == token.user_id
+    auth.local_cache.clear()
+    with django_assert_num_queries(0):
+        user = authenticate(token)
+    assert user.username == token.user.username
+    assert auth.user_groups(user) == {PRODUCT_ADMIN_GROUP}
+
+
+@pytest.mark.django_db
+def test_cached_user_fields(token, django_assert_num_queries):
+    """
+    Test that every field of a cached user but its password is read without queries.
+    """
+    authenticate(token)
+    auth.local_cache.clear()
+
+    with django_assert_num_queries(0):
+        user = authenticate(token)
+        assert user.email == token.user.email
+        assert user.first_name == token.user.first_name
+        assert user.date_joined == token.user.date_joined
+    with django_assert_num_queries(1):
+        assert user.password == token.user.password
+
+
+@pytest.mark.django_db
+def test_invalid_token(token_client):
+    token_client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+    response = token_client.get(REPORT_URL)
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_deleted_token_is_invalidated(
+    token, token_client, product_admin, django_capture_on_commit_callbacks
+):
+    assert token_client.get(REPORT_URL).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.delete()
+
+    assert token_client.get(REPORT_URL).status_code == 401
+
+
+@pytest.mark.django_db
+def test_inactive_user_is_invalidated(
+    token, token_client, product_admin, django_capture_on_commit_callbacks
+):
+    assert token_client.get(REPORT_URL).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.user.is_active = False
+        token.user.save()
+
+    assert token_client.get(REPORT_URL).status_code == 401
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("reverse", [False, True])
+def test_group_changes_are_invalidated(
+    token, token_client, reverse, django_capture_on_commit_callbacks
+):
+    group = Group.objects.create(name=PRODUCT_ADMIN_GROUP)
+    assert token_client.get(REPORT_URL).status_code == 403
+
+    with django_capture_on_commit_callbacks(execute=True):
+        if reverse:
+            group.user_set.add(token.user)
+        else:
+            token.user.groups.add(group)
+    assert token_client.get(REPORT_URL).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        if reverse:
+            group.user_set.clear()
+        else:
+            token.user.groups.clear()
+    assert token_client.get(REPORT_URL).status_code == 403
+
+
+@pytest.mark.django_db
+def test_deleted_group_is_invalidated(
+    token, token_client, django_capture_on_commit_callbacks
+):
+    group = Group.objects.create(name=PRODUCT_ADMIN_GROUP)
+    token.user.groups.add(group)
+    assert token_client.get(REPORT_URL).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        group.delete()
+
+    assert token_client.get(REPORT_URL).status_code == 403
+
+
+@pytest.mark.django_db
+def test_admin_endpoints_query_count(token, token_client, django_assert_num_queries):
+    token.user.groups.add(
+        Group.objects.create(name=PRODUCT_ADMIN_GROUP),
+        Group.objects.create(name=USER_ADMIN_GROUP),
+    )
+    authenticate(token)
+
+    # Only the report queries themselves, the permission check uses the cached groups.
+    with django_assert_num_queries(2):
+        response = token_client.get(REPORT_URL)
+    assert response.status_code == 200
+
+    # The admin group check, the insert and the queries adding the user to the groups.
+    with django_assert_num_queries(5):
+        response = token_client.post(
+            "/users/",
+            {
+                "username": "new@example.com",
+                "email": "new@example.com",
+                "password": "secret",
+            },
+        )
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_create_user_requires_admin_groups(
+    token, token_client, django_capture_on_commit_callbacks
+):
+    """
+    Test that users cannot be created until the admin groups exist.
+    """
+    data = {"username": "new", "email": "new@example.com", "password": "secret"}
+
+    assert token_client.post("/users/", data).status_code == 404
+
+    with django_capture_on_commit_callbacks(execute=True):
+        token.user.groups.add(Group.objects.create(name=USER_ADMIN_GROUP))
+    with pytest.raises(Group.DoesNotExist):
+        token_client.post("/users/", data)
@@ -0,0 +1,173 @@
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+
+import pytest
+from rest_framework.test import APIClient
+from store.models import PRODUCT_ADMIN_GROUP
+from users.models import USER_ADMIN_GROUP
+from users.provisioning import USERNAME_EXISTS, hash_passwords, provision_users
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def processes(settings):
+    settings.USER_PROVISIONING_PROCESSES = 2
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def groups():
+    return [
+        Group.objects.create(name=name)
+        for name in (USER_ADMIN_GROUP, PRODUCT_ADMIN_GROUP)
+    ]
+
+
+def new_user(username, **fields):
+    return {
+        "username": username,
+        "email": f"{username}@EXAMPLE.com",
+        "password": f"{username}-password",
+        **fields,
+    }
+
+
+def test_hash_passwords_in_parallel():
+    """
+    Test that passwords hashed by the process pool are salted and keep their order.
+    """
+    encoded = hash_passwords(["first", "second", "first"])
+
+    assert len(set(encoded)) == 3
+    user = User()
+    for password, hashed in zip(["first", "second", "first"], encoded):
+        user.password = hashed
+        assert user.check_password(password)
+
+
+def test_provision_users(groups, user, django_assert_max_num_queries):
+    """
+    Test that valid users are created in bulk and added to the admin groups, and that
+    invalid, repeated and existing usernames are reported.
+    """
+    items = [
+        new_user("ana", first_name="Ana"),
+        new_user("bob"),
+        {"username": "carl", "password": "secret"},
+        new_user("ana"),
+        new_user(user.username),
+    ]
+
+    with django_assert_max_num_queries(6):
+        report = provision_users(items)
+
+    assert [result["status"] for result in report.results] == [
+        "created",
+        "created",
+        "error",
+        "error",
+        "error",
+    ]
+    assert report.results[2]["errors"] == {"email": ["This field is required."]}
+    assert report.as_dict()["created"] == 2
+    assert report.users_per_second > 0
+    ana = User.objects.get(username="ana")
+    assert ana.check_password("ana-password")
+    assert ana.email == "ana@example.com"
+    assert ana.first_name == "Ana"
+    assert set(ana.groups.all()) == set(groups)
+    assert set(User.objects.get(username="bob").groups.all()) == set(groups)
+    assert not user.groups.exists()
+
+
+def test_existing_users_are_not_hashed(groups, mocker):
+    """
+    Test that only the passwords of the users that do not exist yet are hashed.
+    """
+    hash_passwords = mocker.patch(
+        "users.provisioning.hash_passwords", side_effect=lambda passwords: passwords
+    )
+
+    User.objects.create(username="bob")
+
+    report = provision_users([new_user("bob"), new_user("ana")])
+
+    hash_passwords.assert_called_once_with(["ana-password"])
+    assert report.results[0]["errors"] == USERNAME_EXISTS
+
+
+def test_concurrently_created_users_are_reported(groups, mocker):
+    """
+    Test that users created by another request while hashing are reported as existing,
+    and the others still created.
+    """
+
+    def create_concurrently(passwords):
+        User.objects.create(username="bob")
+        return passwords
+
+    mocker.patch("users.provisioning.hash_passwords", side_effect=create_concurrently)
+
+    report = provision_users([new_user("ana"), new_user("bob")])
+
+    assert [result["status"] for result in report.results] == ["created", "error"]
+    assert report.results[1]["errors"] == USERNAME_EXISTS
+    assert set(User.objects.get(username="ana").groups.all()) == set(groups)
+    assert not User.objects.get(username="bob").groups.exists()
+
+
+def test_provision_requires_admin_groups():
+    """
+    Test that nothing is provisioned while the admin groups are missing.
+    """
+    with pytest.raises(Group.DoesNotExist):
+        provision_users([new_user("ana")])
+    assert not User.objects.filter(username="ana").exists()
+
+
+def test_provision_endpoint(client, user, groups):
+    """
+    Test that only user admins can provision users.
+    """
+    url = "/users/provision/"
+    items = [new_user("ana"), new_user("bob")]
+
+    assert client.post(url, items, format="json").status_code == 403
+
+    user.groups.add(groups[0])
+    client.force_authenticate(user=User.objects.get(pk=user.pk))
+    response = client.post(url, items, format="json")
+
+    assert response.status_code == 200
+    assert response.data["created"] == 2
+    assert [result["username"] for result in response.data["results"]] == [
+        "ana",
+        "bob",
+    ]
+    assert APIClient().post(url, items, format="json").status_code == 401
+
+
+def test_provision_users_command(tmp_path, groups, capsys):
+    """
+    Test that the command provisions the users of a CSV file and reports users/sec.
+    """
+    path = tmp_path / "admins.csv"
+    path.write_text(
+        "username,email,password,first_name,last_name\n"
+        "ana,ana@example.com,ana-password,Ana,Gomez\n"
+        "bob,not-an-email,bob-password,Bob,Smith\n"
+    )
+
+    call_command("provision_users", str(path))
+
+    out, err = capsys.readouterr()
+    assert "2 users in" in out and "users/sec): 1 created, 1 failed" in out
+    assert "Row 2:" in err
+    assert User.objects.filter(username="ana", groups__in=groups).count() == 2
@@ -2,6 +2,7 @@ from django.contrib.auth.models import Group, User
 from django.shortcuts import get_object_or_404
 
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.mixins import (
     CreateModelMixin,
@@ -10,8 +11,11 @@ from rest_framework.mixins import (
     UpdateModelMixin,
 )
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from users.auth import user_groups
 from users.models import USER_ADMIN_GROUP
-from users.serializers import UserSerializer
+from users.provisioning import provision_users
+from users.serializers import UserProvisioningSerializer, UserSerializer
 
 
 class UserViewSet(
@@ -26,10 +30,33 @@ class UserViewSet(
     permission_classes = (IsAuthenticated,)
     lookup_field = "username"
 
-    def perform_create(self, serializer):
-        user = self.request.user
+    def get_serializer_class(self):
+        if self.action == "provision":
+            return UserProvisioningSerializer
+        return super().get_serializer_class()
+
+    def check_user_admin(self):
         get_object_or_404(Group, name=USER_ADMIN_GROUP)
-        if user.groups.filter(name=USER_ADMIN_GROUP).exists():
-            serializer.save()
-        else:
+        if USER_ADMIN_GROUP not in user_groups(self.request.user):
             raise PermissionDenied("Don't have permission to create users")
+
+    def perform_create(self, serializer):
+        self.check_user_admin()
+        serializer.save()
+
+    @action(detail=False, methods=["post"])
+    def provision(self, request, *args, **kwargs):
+        """
+        Creates many admin users at once.
+
+        The body is an array of users, like the ones created one at a time. Their passwords
+        are hashed in parallel and the valid ones inserted in bulk, see users.provisioning.
+
+        @return: A response object with the totals, users/sec and the result of every user,
+        in order.
+        """
+        self.check_user_admin()
+        serializer = self.get_serializer(data={"items": request.data})
+        serializer.is_valid(raise_exception=True)
+        report = provision_users(serializer.validated_data["items"])
+        return Response(report.as_dict())
@@ -0,0 +1,146 @@
+"""
+Building blocks of the bulk writes, shared by the product batches and the user provisioning.
+
+Items are validated in one pass and reported one by one, in their order: the rows that
+already exist are failed before inserting, and the rows created concurrently in the
+meantime are failed when the insert runs into them, the others being inserted again.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, transaction
+
+from rest_framework import serializers
+
+REQUIRED = ["This field is required."]
+
+
+@dataclass
+class BulkReport:
+    """
+    Per-item results of a bulk write, the results are in the order of the items.
+
+    Subclasses name the field identifying the items in 'key'.
+    """
+
+    key = "id"
+
+    results: list = field(default_factory=list)
+
+    @classmethod
+    def for_items(cls, items):
+        return cls(results=[None] * len(items))
+
+    def counts(self):
+        return Counter(result["status"] for result in self.results)
+
+    def set(self, index, value, status, **details):
+        self.results[index] = {self.key: value, "status": status, **details}
+
+    def add_error(self, index, value, errors):
+        self.set(index, value, "error", errors=errors)
+
+
+def chunks(values, size):
+    """
+    Splits a list into lists of at most 'size' values.
+    """
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def index_items(items, report, repeated):
+    """
+    Returns the index of the item of every key, failing the items without a key and the
+    repeated ones.
+
+    @param items: A list of dictionaries.
+    @param report: The BulkReport of the items, its 'key' names the key field.
+    @param repeated: The errors of a repeated key.
+
+    @return: A dictionary mapping every key to the index of its item.
+    """
+    indexes = {}
+    for index, item in enumerate(items):
+        value = item.get(report.key) if isinstance(item, dict) else None
+        if not isinstance(value, str) or not value:
+            report.add_error(index, value, {report.key: REQUIRED})
+        elif value in indexes:
+            report.add_error(index, value, repeated)
+        else:
+            indexes[value] = index
+    return indexes
+
+
+def validate_items(items, report, validator, repeated, normalize=None):
+    """
+    Validates the items in one pass and returns the valid ones, keyed by their key.
+
+    A single serializer instance validates every item, so the field machinery is built once.
+
+    @param items: A list of dictionaries.
+    @param report: The BulkReport of the items, its 'key' names the key field.
+    @param validator: The serializer validating every item.
+    @param repeated: The errors of a repeated key.
+    @param normalize: Optionally, a callable normalizing the validated data of an item in
+    place and returning its normalized key, which must not be repeated either.
+
+    @return: A dictionary mapping every key to the index and validated data of its item.
+    """
+    valid = {}
+    for value, index in index_items(items, report, repeated).items():
+        try:
+            validated = validator.run_validation(items[index])
+        except serializers.ValidationError as error:
+            report.add_error(index, value, error.detail)
+            continue
+        if normalize is not None:
+            value = normalize(validated)
+            if value in valid:
+                report.add_error(index, value, repeated)
+                continue
+        valid[value] = (index, validated)
+    return valid
+
+
+def drop_existing(items, report, queryset, exists, chunk_size):
+    """
+    Fails the items whose key exists, and removes them from 'items'.
+
+    @param items: A dictionary mapping keys to the index and validated data of their item.
+    @param report: The BulkReport of the items, its 'key' names the key field.
+    @param queryset: The queryset of the model the items are inserted into.
+    @param exists: The errors of an existing key.
+    @param chunk_size: The number of keys looked up together.
+
+    @return: The number of items removed.
+    """
+    existing = 0
+    for chunk in chunks(list(items), chunk_size):
+        for value in queryset.filter(**{f"{report.key}__in": chunk}).values_list(
+            report.key, flat=True
+        ):
+            index, _ = items.pop(value)
+            report.add_error(index, value, exists)
+            existing += 1
+    return existing
+
+
+def insert_new(insert, drop_conflicts):
+    """
+    Inserts items that did not exist when checked, failing those created concurrently since.
+
+    @param insert: A callable inserting the remaining items, run in a savepoint.
+    @param drop_conflicts: A callable failing the items that exist now, and returning their
+    number.
+
+    @return: The return value of 'insert'.
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                return insert()
+        except IntegrityError:
+            # Only retry once the conflicting items are failed, other errors are raised.
+            if not drop_conflicts():
+                raise
@@ -16,6 +16,9 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Connects the receivers recording the metrics of every task.
+from zebrands import task_metrics  # noqa: E402, F401
+
 
 @app.task(bind=True)
 def debug_task(self):
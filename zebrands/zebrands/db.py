@@ -0,0 +1,245 @@
+"""
+Routing of database queries between the primary and its read replicas.
+
+Queries go to the primary unless they run in a replica_reads scope, opened by the read-only
+requests of ReplicaReadsMixin views and by the tasks decorated with reads_from_replicas. A
+scope sticks to a single healthy replica, and moves back to the primary for the rest of the
+scope as soon as it writes or opens a transaction. Clients that wrote are pinned to the
+primary for REPLICA_PIN_SECONDS, so they read their own writes while the replicas catch up.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from rest_framework.permissions import SAFE_METHODS
+
+log = logging.getLogger()
+
+# Replicas that failed to connect are skipped until the monotonic time they are mapped to.
+_down_until = {}
+
+
+@dataclass
+class Routing:
+    """
+    Routing state of a replica_reads scope.
+
+    The state is mutated rather than replaced, so it is shared with the threads the scope
+    hands queries to with sync_to_async.
+    """
+
+    replicas: bool = True
+    wrote: bool = False
+    alias: str = None
+
+
+_routing = ContextVar("db_routing", default=None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Opens a scope whose reads go to a replica, when enabled and one is healthy.
+
+    @param enabled: Whether the reads of the scope may go to a replica, it can be enabled
+    later on with use_replicas.
+
+    @return: The Routing state of the scope.
+    """
+    state = Routing(replicas=enabled)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def use_replicas(enabled=True):
+    """
+    Enables or disables the replica reads of the current scope, if any.
+    """
+    state = _routing.get()
+    if state is not None:
+        state.replicas = enabled
+
+
+@contextmanager
+def primary_reads():
+    """
+    Sends the reads of the current scope, if any, to the primary within the block.
+
+    Used to load the data cached for every client, which must not be older than the
+    versions the writes published.
+    """
+    state = _routing.get()
+    if state is None:
+        yield
+        return
+    replicas, state.replicas = state.replicas, False
+    try:
+        yield
+    finally:
+        state.replicas = replicas
+
+
+def replica_may_lag(since):
+    """
+    Returns True if the reads of the current scope go to a replica that may not have
+    replicated the writes made at the given time yet, i.e. less than REPLICA_PIN_SECONDS ago.
+
+    @param since: The time of the last write, an aware datetime.
+    """
+    state = _routing.get()
+    if (
+        state is None
+        or not state.replicas
+        or state.wrote
+        or state.alias == DEFAULT_DB_ALIAS
+        or not settings.REPLICA_DATABASES
+    ):
+        return False
+    return (timezone.now() - since).total_seconds() < settings.REPLICA_PIN_SECONDS
+
+
+def reads_from_replicas(func):
+    """
+    Decorator running a function, e.g. a read-only Celery task, in a replica_reads scope.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def healthy_replica():
+    """
+    Returns the alias of a random replica that accepts connections, or None.
+
+    Replicas that fail to connect are skipped for REPLICA_RETRY_SECONDS.
+    """
+    now = time.monotonic()
+    aliases = [
+        alias
+        for alias in settings.REPLICA_DATABASES
+        if _down_until.get(alias, 0) <= now
+    ]
+    random.shuffle(aliases)
+    for alias in aliases:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as error:
+            log.warning(f"Database replica {alias} is unavailable: {error}")
+            _down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+        else:
+            return alias
+    return None
+
+
+def _pin_key(key):
+    return f"{settings.REPLICA_PIN_KEY_PREFIX}:{key}"
+
+
+def client_key(request):
+    """
+    Returns the key pinning a client to the primary, its user or session, or None.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        return f"session:{session.session_key}"
+    return None
+
+
+def pin_to_primary(key):
+    """
+    Sends the reads of a client to the primary for the next REPLICA_PIN_SECONDS.
+
+    @param key: The client, see client_key.
+    """
+    caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+        _pin_key(key), 1, settings.REPLICA_PIN_SECONDS
+    )
+
+
+def is_pinned(key):
+    """
+    Returns True if the client wrote during the last REPLICA_PIN_SECONDS.
+
+    @param key: The client, see client_key, None for anonymous clients.
+    """
+    if key is None:
+        return False
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS].get(_pin_key(key)) is not None
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of replica_reads scopes to a replica, and every other
+    query to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is None
+            or not state.replicas
+            or state.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        if state.alias is None:
+            state.alias = healthy_replica() or DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaReadsMixin:
+    """
+    View mixin serving the read-only requests from a replica.
+
+    Safe requests of clients that did not write in the last REPLICA_PIN_SECONDS read from a
+    replica, any other request reads from the primary, and the clients of requests that
+    wrote are pinned to it.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(enabled=False):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(client_key(request)):
+            use_replicas()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = client_key(request)
+        if _routing.get().wrote and key is not None:
+            pin_to_primary(key)
+        return response
@@ -0,0 +1,489 @@
+"""
+Prometheus metrics of the API, exposed in the Prometheus text format on /metrics.
+
+Every process keeps its own samples, requests are added to them in batches every
+METRICS_FLUSH_INTERVAL seconds. When PROMETHEUS_MULTIPROC_DIR is set, as it is for the
+gunicorn workers (see gunicorn.conf.py), the samples are written to files in that directory
+and /metrics aggregates the files of every worker, whichever worker answers the scrape.
+
+The Celery workers add up their metrics in Redis instead, see SharedHistograms, and /metrics
+also samples the length of the Celery queues.
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from kombu.exceptions import ChannelError, OperationalError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.utils import floatToGoString
+from redis.exceptions import RedisError
+
+from zebrands.redis import get_redis
+
+log = logging.getLogger()
+
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent answering requests, by URL name, method and status code.",
+    ["view", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of the response bodies, streaming responses excluded.",
+    ["view"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time a request spent waiting on the database.",
+    ["view"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Lookups of the application caches, by URL name, cache and result.",
+    ["view", "cache", "result"],
+)
+# View label of the cache lookups made outside requests, e.g. by tasks.
+NO_VIEW = "none"
+
+
+class RequestStats:
+    """
+    Database queries and time, and cache lookups of the current request.
+
+    The instance is mutated rather than replaced, so the queries that Django runs in
+    another thread for async views are counted too.
+    """
+
+    __slots__ = ("queries", "db_seconds", "cache_lookups")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # Created on the first lookup, most requests do not use the caches.
+        self.cache_lookups = None
+
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the queries of the current request, if any.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def _install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorder():
+    """
+    Installs record_query on the open database connections and every future one.
+    """
+    connection_created.connect(_install, dispatch_uid="zebrands.metrics.record_query")
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+class CacheCounters:
+    """
+    Counts the lookups of a cache by result, labelled with the URL name of the request.
+
+    The lookups of a request are recorded with the rest of its metrics, see RequestMetrics,
+    the other ones are counted right away under the view 'none'.
+
+    @param cache: The name of the cache, e.g. 'product'.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def inc(self, result):
+        """
+        Counts a lookup.
+
+        @param result: The result of the lookup, e.g. 'local_hits' or 'misses'.
+        """
+        stats = _request_stats.get()
+        if stats is None:
+            CACHE_REQUESTS.labels(NO_VIEW, self.cache, result).inc()
+            return
+        if stats.cache_lookups is None:
+            stats.cache_lookups = defaultdict(int)
+        stats.cache_lookups[self.cache, result] += 1
+
+
+class PendingHistogram:
+    """
+    Observations of a labelled histogram not added to it yet, see RequestMetrics.
+    """
+
+    __slots__ = ("child", "bounds", "buckets", "sum")
+
+    def __init__(self, child):
+        self.child = child
+        self.bounds = child._upper_bounds
+        self.buckets = [0] * len(self.bounds)
+        self.sum = 0.0
+
+    def observe(self, value):
+        # Same bucket as Histogram.observe, the first bound greater than or equal to value.
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def flush(self):
+        # Histograms have no bulk observe, the totals are added to the child's values.
+        for index, count in enumerate(self.buckets):
+            if count:
+                self.child._buckets[index].inc(count)
+                self.buckets[index] = 0
+        if self.sum:
+            self.child._sum.inc(self.sum)
+            self.sum = 0.0
+
+
+# Live RequestMetrics of the process, flushed before every scrape.
+_recorders = weakref.WeakSet()
+
+
+class RequestMetrics:
+    """
+    Records the metrics of requests.
+
+    Observing a Prometheus histogram takes microseconds, more so in multiprocess mode, so
+    requests are accumulated in PendingHistograms instead, and added to the metrics by a
+    timer METRICS_FLUSH_INTERVAL seconds after the first pending request, before every
+    scrape and when the worker exits, so an idle worker does not hold back its last
+    requests.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._cache_lookups = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flush_interval = settings.METRICS_FLUSH_INTERVAL
+        self._timer = None
+        _recorders.add(self)
+
+    def start(self):
+        """
+        Starts recording a request.
+
+        @return: The start time of the request and the token resetting its RequestStats.
+        """
+        return time.perf_counter(), _request_stats.set(RequestStats())
+
+    def finish(self, request, response, started):
+        """
+        Records a request that started with start.
+
+        @param request: The request.
+        @param response: Its response.
+        @param started: The value returned by start.
+        """
+        start, token = started
+        now = time.perf_counter()
+        stats = _request_stats.get()
+        _request_stats.reset(token)
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+        key = (view, method, response.status_code)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = (
+                    PendingHistogram(REQUEST_DURATION.labels(*key)),
+                    PendingHistogram(RESPONSE_SIZE.labels(view)),
+                    PendingHistogram(REQUEST_QUERIES.labels(view)),
+                    PendingHistogram(REQUEST_DB_DURATION.labels(view)),
+                )
+            request_duration, response_size, queries, db_duration = pending
+            request_duration.observe(now - start)
+            if not response.streaming:
+                response_size.observe(len(response.content))
+            queries.observe(stats.queries)
+            db_duration.observe(stats.db_seconds)
+            if stats.cache_lookups:
+                for (cache, result), count in stats.cache_lookups.items():
+                    self._cache_lookups[view, cache, result] += count
+            if self._timer is None:
+                self._timer = threading.Timer(self._flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Adds the pending requests to the metrics.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            for pending in self._pending.values():
+                for histogram in pending:
+                    histogram.flush()
+            lookups, self._cache_lookups = self._cache_lookups, defaultdict(int)
+        for labels, count in lookups.items():
+            CACHE_REQUESTS.labels(*labels).inc(count)
+
+
+def flush_requests():
+    """
+    Adds the pending requests of every RequestMetrics of the process to the metrics.
+    """
+    for recorder in list(_recorders):
+        recorder.flush()
+
+
+class SharedHistograms:
+    """
+    Histograms observed by processes that do not serve /metrics, e.g. the Celery workers.
+
+    Observations are accumulated in the process and added to a Redis hash, at most every
+    METRICS_FLUSH_INTERVAL seconds, with a single pipelined round trip. The hash adds up
+    every process of every host, and is exposed by the /metrics of the web tier, which
+    registers the instance as a Prometheus collector.
+
+    @param key: The Redis hash.
+    @param histograms: A dictionary mapping the metric names to their documentation,
+    label names and bucket bounds.
+    """
+
+    def __init__(self, key, histograms):
+        self.key = key
+        self.histograms = {
+            name: (documentation, labelnames, (*buckets, float("inf")))
+            for name, (documentation, labelnames, buckets) in histograms.items()
+        }
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def observe(self, name, labels, value):
+        """
+        Observes a value.
+
+        @param name: The name of the histogram.
+        @param labels: The tuple of its label values, which cannot contain '|'.
+        @param value: The observed value.
+        """
+        prefix = "|".join((name, *labels))
+        bucket = bisect_left(self.histograms[name][2], value)
+        with self._lock:
+            self._pending[f"{prefix}|{bucket}"] += 1
+            self._pending[f"{prefix}|sum"] += value
+            if self._timer is None:
+                self._timer = threading.Timer(
+                    settings.METRICS_FLUSH_INTERVAL, self.flush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Adds the pending observations to the Redis hash.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for field, amount in pending.items():
+                pipe.hincrbyfloat(self.key, field, amount)
+            pipe.execute()
+        except RedisError as error:
+            log.warning(f"Could not flush the metrics to {self.key}: {error}")
+
+    def describe(self):
+        # Registering a collector without describe would collect it, reading Redis.
+        for name, (documentation, labelnames, _) in self.histograms.items():
+            yield HistogramMetricFamily(name, documentation, labels=labelnames)
+
+    def collect(self):
+        try:
+            fields = get_redis().hgetall(self.key)
+        except RedisError as error:
+            log.warning(f"Could not read the metrics of {self.key}: {error}")
+            return
+        series = defaultdict(dict)
+        for field, amount in fields.items():
+            name, *labels, part = field.decode().split("|")
+            series[name][(*labels, part)] = float(amount)
+        for name, (documentation, labelnames, buckets) in self.histograms.items():
+            family = HistogramMetricFamily(name, documentation, labels=labelnames)
+            parts = series[name]
+            for labels in {key[:-1] for key in parts}:
+                cumulative, counts = 0, []
+                for index, bound in enumerate(buckets):
+                    cumulative += parts.get((*labels, str(index)), 0)
+                    counts.append((floatToGoString(bound), cumulative))
+                family.add_metric(labels, counts, parts.get((*labels, "sum"), 0))
+            yield family
+
+
+WORKER_METRICS = SharedHistograms(
+    "metrics:workers",
+    {
+        "celery_task_queue_wait_seconds": (
+            "Time tasks waited in the broker, from their publication or ETA to their start.",
+            ["task"],
+            (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+        ),
+        "celery_task_runtime_seconds": (
+            "Time spent running tasks, by task and final state (SUCCESS, FAILURE, RETRY).",
+            ["task", "state"],
+            (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+        ),
+        "celery_task_db_queries": (
+            "Database queries run by a task.",
+            ["task"],
+            (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000),
+        ),
+        "celery_task_db_duration_seconds": (
+            "Time a task spent waiting on the database.",
+            ["task"],
+            (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0),
+        ),
+        "sendgrid_request_duration_seconds": (
+            "Time spent on SendGrid mail send requests, by response status.",
+            ["status"],
+            (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+        ),
+    },
+)
+
+
+class QueueLengthCollector:
+    """
+    Samples the number of messages waiting in every queue of CELERY_METRICS_QUEUES, on
+    every scrape.
+    """
+
+    @staticmethod
+    def _family():
+        return GaugeMetricFamily(
+            "celery_queue_length",
+            "Messages waiting in the broker, by queue.",
+            labels=["queue"],
+        )
+
+    def describe(self):
+        yield self._family()
+
+    def collect(self):
+        from zebrands import celery_app
+
+        family = self._family()
+        try:
+            with celery_app.connection_for_read() as connection:
+                connection.ensure_connection(max_retries=1)
+                channel = connection.default_channel
+                for queue in settings.CELERY_METRICS_QUEUES:
+                    try:
+                        declared = channel.queue_declare(queue=queue, passive=True)
+                    except ChannelError:
+                        # Queues are declared by their first consumer or message.
+                        family.add_metric([queue], 0)
+                    else:
+                        family.add_metric([queue], declared.message_count)
+        except (OSError, OperationalError) as error:
+            log.warning(f"Could not sample the Celery queues: {error}")
+            return
+        yield family
+
+
+QUEUE_LENGTHS = QueueLengthCollector()
+REGISTRY.register(WORKER_METRICS)
+REGISTRY.register(QUEUE_LENGTHS)
+
+
+def registry():
+    """
+    Returns the registry to expose, aggregating every worker in multiprocess mode.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    collector_registry.register(WORKER_METRICS)
+    collector_registry.register(QUEUE_LENGTHS)
+    return collector_registry
+
+
+def scrape_allowed(request):
+    """
+    Returns True if the request comes from METRICS_ALLOWED_NETWORKS or carries the
+    METRICS_TOKEN as a bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        authorization = request.META.get("HTTP_AUTHORIZATION", "")
+        if hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics_view(request):
+    """
+    Exposes the metrics in the Prometheus text format to the scrapers allowed by
+    scrape_allowed.
+    """
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    flush_requests()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.deprecation import MiddlewareMixin
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from zebrands.metrics import RequestMetrics, install_query_recorder
+
+
+class ASGIURLConfMiddleware(MiddlewareMixin):
+    """
+    Resolves the requests served by the ASGI handler with settings.ASGI_URLCONF.
+
+    Under WSGI every view stays sync, running async views there would start an event loop
+    per request.
+    """
+
+    def process_request(self, request):
+        if isinstance(request, ASGIRequest):
+            request.urlconf = settings.ASGI_URLCONF
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, response size, status code and database queries of every request,
+    labelled by URL name, see zebrands.metrics.
+
+    It runs natively in sync and async chains, so async views are never moved to a thread
+    because of it. It should be the first middleware, to time the whole chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics = RequestMetrics()
+        install_query_recorder()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = self.metrics.start()
+        response = self.get_response(request)
+        self.metrics.finish(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = self.metrics.start()
+        response = await self.get_response(request)
+        self.metrics.finish(request, response, started)
+        return response
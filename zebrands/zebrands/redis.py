@@ -0,0 +1,122 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+import redis
+
+# Field written into a hash before it is handed off, so RENAME always has a source key.
+HAND_OFF_MARKER = b"__batch__"
+
+# Refills a token bucket at 'rate' tokens per second up to 'burst', then takes one token.
+# The bucket may go negative: the caller reserves the next token and waits until it is due,
+# so concurrent callers queue up fairly instead of polling. Returns the wait in seconds.
+# Uses the clock of Redis, so workers on different hosts share the same time.
+TOKEN_BUCKET_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "at")
+local tokens = tonumber(bucket[1]) or burst
+local at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate) - 1
+redis.call("HSET", KEYS[1], "tokens", tokens, "at", now)
+redis.call("EXPIRE", KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+return tostring(math.max(0, -tokens) / rate)
+"""
+
+_connection = None
+
+
+def get_redis():
+    """
+    Returns the Redis connection shared by the application for counters and other shared state.
+
+    The connection (and its pool) is created lazily on first use, so importing this module
+    does not require Redis to be reachable. redis-py resets the pool after a fork, which makes
+    it safe to share the same connection object across Celery prefork workers.
+
+    @return: A redis.Redis client bound to settings.REDIS_URL.
+    """
+    global _connection
+    if _connection is None:
+        _connection = redis.Redis.from_url(settings.REDIS_URL)
+    return _connection
+
+
+@lru_cache(maxsize=32)
+def _register_script(client, source):
+    return client.register_script(source)
+
+
+def get_script(source):
+    """
+    Returns the Lua script of the given source, registered on the shared Redis connection.
+
+    Scripts are registered once per connection, which hashes their source once, and are run
+    with EVALSHA, by that digest.
+
+    @param source: The Lua source of the script.
+
+    @return: A redis-py Script.
+    """
+    return _register_script(get_redis(), source)
+
+
+def hand_off_hash(pipe, source, destination, batch_id):
+    """
+    Queues the commands that move a hash to a new key on a MULTI pipeline.
+
+    Writers keep incrementing the source hash, so the commands must run in a transaction:
+    every write lands either in the handed-off hash or in a fresh one, never in between. The
+    marker field guarantees the source exists, readers of the handed-off hash must skip it.
+
+    @param pipe: A redis-py pipeline created with transaction=True.
+    @param source: The key of the hash being written to.
+    @param destination: The key the hash is moved to.
+    @param batch_id: The id of the batch, stored under the marker field.
+
+    @return: The pipeline.
+    """
+    pipe.hset(source, HAND_OFF_MARKER, batch_id)
+    pipe.rename(source, destination)
+    return pipe
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter shared by every process through Redis.
+
+    Allows 'burst' calls at once, then 'rate' calls per second on average, across all the
+    processes using the same key.
+    """
+
+    def __init__(self, key, rate, burst=1):
+        """
+        @param key: The Redis key of the bucket.
+        @param rate: The number of tokens added per second.
+        @param burst: The maximum number of tokens in the bucket.
+        """
+        self.key = key
+        self.rate = rate
+        self.burst = max(burst, 1)
+
+    def reserve(self):
+        """
+        Takes the next token of the bucket.
+
+        @return: The seconds to wait before the token is due, 0 if it is available now.
+        """
+        script = get_script(TOKEN_BUCKET_SCRIPT)
+        return float(script(keys=[self.key], args=[self.rate, self.burst]))
+
+    def acquire(self):
+        """
+        Takes the next token of the bucket, sleeping until it is due.
+
+        @return: The seconds slept.
+        """
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
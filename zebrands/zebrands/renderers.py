@@ -0,0 +1,55 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson writes U+2028 and U+2029 verbatim, DRF escapes them to stay a JavaScript subset.
+LINE_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-compatible with JSONRenderer's compact UTF-8 output. Dates, times and
+    every type orjson does not encode natively, such as Decimal, lazy translations or
+    generators, go through DRF's encoder. Indented output (the browsable API or
+    'application/json; indent=4') and data orjson rejects, like integers above 64 bits, are
+    rendered by JSONRenderer itself.
+
+    The one difference is in floats: those below 1e-4 or from 1e16 on are written as '1e16'
+    instead of '1e+16', which parses to the same number, and NaN and infinities as null.
+    """
+
+    def __init__(self):
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON, returning a bytestring.
+        """
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for character, escaped in LINE_SEPARATORS:
+            if character in ret:
+                ret = ret.replace(character, escaped)
+        return ret
@@ -62,6 +62,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    "zebrands.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -69,9 +70,12 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "zebrands.middleware.ASGIURLConfMiddleware",
 ]
 
 ROOT_URLCONF = "zebrands.urls"
+# Used instead of ROOT_URLCONF under ASGI, where anonymous product reads are async.
+ASGI_URLCONF = "zebrands.urls_asgi"
 
 TEMPLATES = [
     {
@@ -106,6 +110,23 @@ DATABASES = {
     }
 }
 
+# Read replicas, as a comma-separated list of hosts sharing the primary's credentials. Reads
+# of anonymous and read-only requests are routed to them, see zebrands.db.ReplicaRouter.
+DB_REPLICA_HOSTS = env.list("DB_REPLICA_HOSTS", default=[])
+REPLICA_DATABASES = [f"replica_{index}" for index in range(len(DB_REPLICA_HOSTS))]
+DATABASES.update(
+    (alias, {**DATABASES["default"], "HOST": host})
+    for alias, host in zip(REPLICA_DATABASES, DB_REPLICA_HOSTS)
+)
+
+DATABASE_ROUTERS = ["zebrands.db.ReplicaRouter"]
+# Clients that wrote read from the primary this many seconds, longer than the replica lag.
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=10)
+REPLICA_PIN_CACHE_ALIAS = "default"
+REPLICA_PIN_KEY_PREFIX = "db:pinned"
+# A replica that fails to connect is skipped this many seconds.
+REPLICA_RETRY_SECONDS = env.float("REPLICA_RETRY_SECONDS", default=30.0)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -149,11 +170,20 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication"
+    "DEFAULT_AUTHENTICATION_CLASSES": ["users.auth.CachedTokenAuthentication"],
+    "DEFAULT_RENDERER_CLASSES": [
+        "zebrands.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
+PRODUCT_PAGE_SIZE = env.int("PRODUCT_PAGE_SIZE", default=100)
+PRODUCT_MAX_PAGE_SIZE = env.int("PRODUCT_MAX_PAGE_SIZE", default=1000)
+PRODUCT_SEARCH_PAGE_SIZE = env.int("PRODUCT_SEARCH_PAGE_SIZE", default=20)
+# Lower bounds of the price facet buckets, the last one is open ended. Run
+# `manage.py rebuild_product_facets` after changing them.
+PRODUCT_PRICE_BUCKETS = [0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
 REDIS_HOST = env("REDIS_HOST", default="zebrands-redis")
 REDIS_PORT = env("REDIS_PORT", default="6379")
 CELERY_BROKER_URL = env(
@@ -162,15 +192,167 @@ CELERY_BROKER_URL = env(
 CELERY_RESULT_BACKEND = env(
     "CELERY_BROKER_URL", default=f"redis://{REDIS_HOST}:{REDIS_PORT}/0"
 )
+# Every group of tasks has its own queue, consumed by its own workers (see run_celery.sh),
+# so a burst of view counters does not delay notifications and the other way around.
+# Within the notifications queue, product changes are sent before bulk emails, the Redis
+# broker consumes priority 0 first.
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_ROUTES = {
+    "store.tasks.product_update_counter": {"queue": "counters"},
+    "store.tasks.flush_view_counters": {"queue": "counters"},
+    "store.tasks.relay_product_change_events": {
+        "queue": "notifications",
+        "priority": 0,
+    },
+    "store.tasks.product_change_notification": {
+        "queue": "notifications",
+        "priority": 0,
+    },
+    "store.tasks.flush_product_notifications": {
+        "queue": "notifications",
+        "priority": 0,
+    },
+    "store.tasks.send_admin_batch": {"queue": "notifications", "priority": 6},
+    "store.tasks.product_import_notification": {
+        "queue": "notifications",
+        "priority": 6,
+    },
+    "store.tasks.compact_view_rollups": {"queue": "reports"},
+}
+CELERY_BEAT_SCHEDULE = {
+    "flush-view-counters": {
+        "task": "store.tasks.flush_view_counters",
+        "schedule": env.float("VIEW_COUNTER_FLUSH_INTERVAL", default=10.0),
+    },
+    "compact-view-rollups": {
+        "task": "store.tasks.compact_view_rollups",
+        "schedule": env.float("VIEW_ROLLUP_COMPACT_INTERVAL", default=3600.0),
+    },
+    "relay-product-change-events": {
+        "task": "store.tasks.relay_product_change_events",
+        "schedule": env.float("PRODUCT_EVENT_RELAY_INTERVAL", default=2.0),
+    },
+}
+
+# Redis database used for application state (counters, etc.), kept apart from the broker.
+REDIS_URL = env("REDIS_URL", default=f"redis://{REDIS_HOST}:{REDIS_PORT}/1")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+# Metrics
+
+# Requests are added to the Prometheus metrics of a process this many seconds after the
+# first pending one, see zebrands.metrics.RequestMetrics.
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=1.0)
+# /metrics answers the scrapers of these networks, and the ones sending the token as
+# "Authorization: Bearer <METRICS_TOKEN>". Behind a proxy REMOTE_ADDR is the proxy's.
+METRICS_ALLOWED_NETWORKS = env.list(
+    "METRICS_ALLOWED_NETWORKS", default=["127.0.0.1/32", "::1/128"]
+)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# Celery queues whose length is sampled on every scrape of /metrics.
+CELERY_METRICS_QUEUES = env.list(
+    "CELERY_METRICS_QUEUES", default=["celery", "counters", "notifications", "reports"]
+)
+
+# Authentication cache
+
+# Resolved API tokens, with their user's groups, are cached this many seconds.
+AUTH_CACHE_ALIAS = "default"
+AUTH_CACHE_TIMEOUT = env.int("AUTH_CACHE_TIMEOUT", default=300)
+AUTH_CACHE_LOCAL_MAXSIZE = env.int("AUTH_CACHE_LOCAL_MAXSIZE", default=1024)
+AUTH_CACHE_LOCAL_TTL = env.float("AUTH_CACHE_LOCAL_TTL", default=5.0)
+
+# Product cache
+
+PRODUCT_CACHE_ALIAS = "default"
+PRODUCT_CACHE_TIMEOUT = env.int("PRODUCT_CACHE_TIMEOUT", default=3600)
+PRODUCT_CACHE_LOCAL_MAXSIZE = env.int("PRODUCT_CACHE_LOCAL_MAXSIZE", default=1024)
+PRODUCT_CACHE_LOCAL_TTL = env.float("PRODUCT_CACHE_LOCAL_TTL", default=30.0)
+
+# Product import
+
+PRODUCT_IMPORT_CHUNK_SIZE = env.int("PRODUCT_IMPORT_CHUNK_SIZE", default=1000)
+PRODUCT_IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# Product batch writes
+
+PRODUCT_BATCH_MAX_SIZE = env.int("PRODUCT_BATCH_MAX_SIZE", default=10000)
+PRODUCT_BATCH_CHUNK_SIZE = env.int("PRODUCT_BATCH_CHUNK_SIZE", default=1000)
+
+# User provisioning
+
+USER_PROVISIONING_MAX_SIZE = env.int("USER_PROVISIONING_MAX_SIZE", default=10000)
+USER_PROVISIONING_CHUNK_SIZE = env.int("USER_PROVISIONING_CHUNK_SIZE", default=1000)
+# Processes hashing the passwords of a provisioning, 0 uses every core.
+USER_PROVISIONING_PROCESSES = env.int("USER_PROVISIONING_PROCESSES", default=0)
+
+# Product export
+
+PRODUCT_EXPORT_CHUNK_SIZE = env.int("PRODUCT_EXPORT_CHUNK_SIZE", default=2000)
+
+# View counters
+
+VIEW_COUNTER_KEY_PREFIX = "store:views"
+VIEW_COUNTER_FLUSH_CHUNK_SIZE = env.int("VIEW_COUNTER_FLUSH_CHUNK_SIZE", default=500)
+VIEW_COUNTER_BATCH_RETENTION_DAYS = env.int(
+    "VIEW_COUNTER_BATCH_RETENTION_DAYS", default=7
+)
+# Trending products are ranked over this many one-minute buckets of at most
+# TRENDING_CAPACITY products each.
+TRENDING_KEY_PREFIX = "store:trending"
+TRENDING_WINDOW_MINUTES = env.int("TRENDING_WINDOW_MINUTES", default=60)
+TRENDING_CAPACITY = env.int("TRENDING_CAPACITY", default=1000)
+TRENDING_MAX_LIMIT = 100
+# Daily unique visitors sketches (HyperLogLog) are kept this many days.
+UNIQUE_VISITORS_KEY_PREFIX = "store:uniques"
+UNIQUE_VISITORS_RETENTION_DAYS = env.int("UNIQUE_VISITORS_RETENTION_DAYS", default=90)
+# Hourly view rollups older than this are folded into daily rollups.
+VIEW_ROLLUP_HOURLY_RETENTION_DAYS = env.int(
+    "VIEW_ROLLUP_HOURLY_RETENTION_DAYS", default=7
+)
 
 # Sendgrid Config
 
 SENDGRID_FROM_EMAIL = env("SENDGRID_FROM_EMAIL")
 SENDGRID_REPLY_TO = env("SENDGRID_REPLY_TO")
 SENDGRID_API_KEY = env("SENDGRID_API_KEY")
+# SendGrid accepts up to 1000 personalizations per request.
+SENDGRID_MAX_PERSONALIZATIONS = env.int("SENDGRID_MAX_PERSONALIZATIONS", default=1000)
 PRODUCT_UPDATE_EMAIL_ID = env(
     "PRODUCT_UPDATE_EMAIL_ID", default="d-8d088bf3a7a44788b0662ba99699cf16"
 )
+PRODUCT_IMPORT_EMAIL_ID = env("PRODUCT_IMPORT_EMAIL_ID", default="")
+PRODUCT_DIGEST_EMAIL_ID = env("PRODUCT_DIGEST_EMAIL_ID", default="")
+
+# Product change notifications are coalesced per SKU during this many seconds.
+PRODUCT_NOTIFICATION_WINDOW = env.int("PRODUCT_NOTIFICATION_WINDOW", default=60)
+PRODUCT_NOTIFICATION_KEY_PREFIX = "store:notifications"
+# Product change events are relayed from the outbox table in batches of this size.
+PRODUCT_EVENT_RELAY_BATCH_SIZE = env.int("PRODUCT_EVENT_RELAY_BATCH_SIZE", default=500)
+PRODUCT_EVENT_RETENTION_DAYS = env.int("PRODUCT_EVENT_RETENTION_DAYS", default=7)
+# Events claimed by a relay that did not deliver them in this time, e.g. because its worker
+# died, are relayed again. Must exceed the time a relay takes to publish a batch.
+PRODUCT_EVENT_CLAIM_SECONDS = env.int("PRODUCT_EVENT_CLAIM_SECONDS", default=300)
+
+# Notification delivery, point SENDGRID_API_URL to `manage.py fake_sendgrid` to test locally.
+SENDGRID_API_URL = env("SENDGRID_API_URL", default="https://api.sendgrid.com")
+NOTIFICATION_TRANSPORT = "store.delivery.SendGridTransport"
+NOTIFICATION_MAX_CONCURRENCY = env.int("NOTIFICATION_MAX_CONCURRENCY", default=8)
+NOTIFICATION_MAX_RETRIES = env.int("NOTIFICATION_MAX_RETRIES", default=5)
+NOTIFICATION_RETRY_BACKOFF = env.float("NOTIFICATION_RETRY_BACKOFF", default=0.5)
+NOTIFICATION_MAX_BACKOFF = env.float("NOTIFICATION_MAX_BACKOFF", default=30.0)
+NOTIFICATION_TIMEOUT = env.float("NOTIFICATION_TIMEOUT", default=10.0)
+# Requests per second to the provider shared by every worker, 0 disables the limit. Up to
+# NOTIFICATION_RATE_BURST requests are sent at once before the rate applies.
+NOTIFICATION_RATE_LIMIT = env.float("NOTIFICATION_RATE_LIMIT", default=10.0)
+NOTIFICATION_RATE_BURST = env.int("NOTIFICATION_RATE_BURST", default=20)
+NOTIFICATION_RATE_LIMIT_KEY = "store:notifications:rate"
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Product List API",
@@ -0,0 +1,76 @@
+"""
+Celery signal receivers recording the metrics of every task, see zebrands.metrics.
+
+Tasks are stamped with their publication time, so the time they waited in the broker is
+told apart from their runtime, and their database queries are counted like those of
+requests.
+"""
+import time
+
+from django.utils.dateparse import parse_datetime
+
+from celery import signals
+
+from zebrands.metrics import (
+    WORKER_METRICS,
+    RequestStats,
+    _request_stats,
+    install_query_recorder,
+)
+
+# Message header carrying the publication time of a task, as a UNIX timestamp.
+PUBLISHED_AT = "published_at"
+
+# Start time and RequestStats token of the running tasks, by task id.
+_running = {}
+
+
+@signals.before_task_publish.connect
+def stamp_publication(headers=None, **kwargs):
+    headers.setdefault(PUBLISHED_AT, time.time())
+
+
+@signals.worker_init.connect
+def install_recorder(**kwargs):
+    # Prefork children inherit the receiver installed in the main process.
+    install_query_recorder()
+
+
+@signals.task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    published = getattr(task.request, PUBLISHED_AT, None)
+    if published is not None:
+        eta = task.request.eta
+        if eta:
+            # Countdowns and ETAs are not waits, the task could not start earlier.
+            published = max(published, parse_datetime(eta).timestamp())
+        WORKER_METRICS.observe(
+            "celery_task_queue_wait_seconds",
+            (task.name,),
+            max(time.time() - published, 0.0),
+        )
+    _running[task_id] = (time.perf_counter(), _request_stats.set(RequestStats()))
+
+
+@signals.task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _running.pop(task_id, None)
+    if started is None:
+        return
+    start, token = started
+    runtime = time.perf_counter() - start
+    stats = _request_stats.get()
+    _request_stats.reset(token)
+    WORKER_METRICS.observe(
+        "celery_task_runtime_seconds", (task.name, state or "UNKNOWN"), runtime
+    )
+    WORKER_METRICS.observe("celery_task_db_queries", (task.name,), stats.queries)
+    WORKER_METRICS.observe(
+        "celery_task_db_duration_seconds", (task.name,), stats.db_seconds
+    )
+
+
+@signals.worker_process_shutdown.connect
+@signals.worker_shutdown.connect
+def flush_metrics(**kwargs):
+    WORKER_METRICS.flush()
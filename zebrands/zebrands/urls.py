@@ -26,6 +26,8 @@ from rest_framework.authtoken.views import obtain_auth_token
 from store.views import ProductViewSet
 from users.views import UserViewSet
 
+from zebrands.metrics import metrics_view
+
 router = routers.DefaultRouter()
 router.register(r"products", ProductViewSet, basename="products")
 router.register(r"users", UserViewSet, basename="users")
@@ -49,4 +51,6 @@ urlpatterns = router.urls + [
     path("token/", obtain_auth_token, name="api_token_auth"),
     # Django admin
     path("admin/", admin.site.urls),
+    # Prometheus metrics, see METRICS_ALLOWED_NETWORKS and METRICS_TOKEN
+    path("metrics", metrics_view, name="metrics"),
 ]
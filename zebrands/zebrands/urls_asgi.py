@@ -0,0 +1,26 @@
+"""
+URL configuration of the requests served by the ASGI handler, see ASGIURLConfMiddleware.
+
+Same routes as zebrands.urls, with the product list and detail served by async views for
+anonymous clients, see store.async_views.
+"""
+from django.urls import URLPattern
+
+from store.async_views import product_detail_view, product_list_view
+
+from zebrands.urls import urlpatterns as wsgi_urlpatterns
+
+ASYNC_VIEWS = {
+    "products-list": product_list_view,
+    "products-detail": product_detail_view,
+}
+
+
+def _async(pattern):
+    if isinstance(pattern, URLPattern) and pattern.name in ASYNC_VIEWS:
+        view = ASYNC_VIEWS[pattern.name](pattern.callback)
+        return URLPattern(pattern.pattern, view, pattern.default_args, pattern.name)
+    return pattern
+
+
+urlpatterns = [_async(pattern) for pattern in wsgi_urlpatterns]